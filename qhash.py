@@ -1,8 +1,15 @@
 import math
+import os
+import numpy as np
 from qiskit import QuantumCircuit
 from qiskit.circuit import Parameter
+from qiskit.circuit.library import RYGate, RZGate
 from qiskit.quantum_info import Statevector
-from qiskit.quantum_info.operators import Pauli
+from qsim import deterministic
+from qsim.circuit import compile_circuit, gate_matrix, product_state
+from qsim.estimator import batch_expectations
+from qsim.mps import DEFAULT_MAX_BOND, MPSCircuit
+from qsim.readout import pauli_expectations
 
 TOTAL_BITS = 16
 FRACTION_BITS = 15
@@ -35,26 +42,156 @@ for l in range(NUM_LAYERS):
         qc.cx(i, i + 1)
 num_params = len(params)
 
-# Quantum simulation portion of the qhash
-# x - 256-bit byte array
-# returns the hash value as a 256-bit byte array
-def qhash(x: bytes) -> bytes:
-    # create a dictionary mapping each parameter to its value.
-    param_values = {}
-    for i in range(num_params):
-        # extract a nibble (4 bits) from the input 
-        nibble = (x[i // 2] >> (4 * (1 - (i % 2)))) & 0x0F
-        # scale it to use as a rotation angle parameter
-        value = nibble * math.pi / 8
-        param_values[params[i]] = value
-
-    # bind the parameters to the circuit.
-    bound_qc = qc.assign_parameters(param_values)
-
-    # prepare the state vector from the bound circuit
-    sv = Statevector.from_instruction(bound_qc)
+# the same circuit compiled once into a kernel that takes the angles as an
+# array, in params order, and creates no Qiskit objects per hash
+kernel = compile_circuit(qc, params)
+
+DEFAULT_ENGINE = "mps"
+
+
+def qhash_nibbles(x: bytes) -> np.ndarray:
+    """The num_params input nibbles (4 bits), high one first, in params order."""
+    if len(x) < num_params // 2:
+        raise ValueError(f"qhash needs at least {num_params // 2} input bytes, got {len(x)}")
+    data = np.frombuffer(bytes(x[:num_params // 2]), dtype=np.uint8)
+    return np.stack([data >> 4, data & 0x0F], axis=1).ravel()
+
+
+def qhash_angles(x: bytes) -> np.ndarray:
+    """The num_params rotation angles for input x, in params order."""
+    # scale the nibbles to use as rotation angle parameters
+    return qhash_nibbles(x) * math.pi / 8
+
+
+def _z_expectations(sv) -> np.ndarray:
     # calculate the qubit expectations on the Z axis
-    exps = [sv.expectation_value(Pauli("Z"), [i]).real for i in range(NUM_QUBITS)]
+    return pauli_expectations(sv, range(NUM_QUBITS), "Z", exact_near=near_fixed_edge)[:, 0]
+
+
+def _expectations_qiskit(nibbles: np.ndarray) -> np.ndarray:
+    # bind the parameters to the circuit and prepare the state vector from it
+    bound_qc = qc.assign_parameters(dict(zip(params, (nibbles * math.pi / 8).tolist())))
+    return _z_expectations(Statevector.from_instruction(bound_qc))
+
+
+def _expectations_kernel(nibbles: np.ndarray) -> np.ndarray:
+    return _z_expectations(kernel.run(nibbles * math.pi / 8))
+
+
+# --- product-state table ----------------------------------------------------
+# Before the first CX ladder every qubit only sees ry(theta) then rz(phi) from
+# |0>, both nibble multiples of pi/8, so the first layer leaves a product of 16
+# single-qubit states out of 256. The table holds them keyed by the
+# (RY nibble << 4 | RZ nibble) byte and the first layer becomes one outer-product
+# pass. Its amplitudes round differently from the gate-by-gate layer (the
+# expectations move by ~1e-15), so when a value lands within FIXED_MARGIN of a
+# toFixed rounding edge that hash is redone with the exact kernel.
+
+PRODUCT_TABLE_VERSION = 1
+# set to share one precomputed table file across processes
+PRODUCT_TABLE_PATH = os.environ.get("QHASH_PRODUCT_TABLE")
+FIXED_MARGIN = 1e-6  # in fixed-point units
+FIRST_LAYER_OPS = 2 * NUM_QUBITS  # kernel.ops of the first RY and RZ layers
+
+
+def build_product_table() -> np.ndarray:
+    """RZ(phi) RY(theta)|0> for every (theta, phi) nibble pair, shape (256, 2)."""
+    table = np.empty((256, 2), dtype=complex)
+    for key in range(256):
+        ry = gate_matrix(RYGate, ((key >> 4) * math.pi / 8,))
+        rz = gate_matrix(RZGate, ((key & 0x0F) * math.pi / 8,))
+        table[key] = rz @ ry[:, 0]
+    return table
+
+
+def save_product_table(path: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, version=PRODUCT_TABLE_VERSION, states=build_product_table())
+    os.replace(tmp, path)  # concurrent writers never leave a partial file
+
+
+def load_product_table(path: str) -> np.ndarray:
+    with np.load(path) as table:
+        if int(table["version"]) != PRODUCT_TABLE_VERSION:
+            raise ValueError(f"Product table {path} has version {int(table['version'])}, "
+                             f"expected {PRODUCT_TABLE_VERSION}")
+        states = table["states"]
+    if states.shape != (256, 2):
+        raise ValueError(f"Product table {path} does not have 256 single-qubit states")
+    return states
+
+
+if PRODUCT_TABLE_PATH:
+    if not os.path.exists(PRODUCT_TABLE_PATH):
+        save_product_table(PRODUCT_TABLE_PATH)
+    PRODUCT_STATES = load_product_table(PRODUCT_TABLE_PATH)
+else:
+    PRODUCT_STATES = build_product_table()
+
+
+def near_fixed_edge(exps: np.ndarray, margin: float = None) -> bool:
+    """True if any toFixed(exp) could flip under a ~1e-15 change of exp (or margin fixed-point units)."""
+    margin = FIXED_MARGIN if margin is None else margin
+    scaled = exps * (1 << FRACTION_BITS) + np.where(exps >= 0, 0.5, -0.5)
+    return bool((np.abs(scaled - np.round(scaled)) < margin).any())
+
+
+def _expectations_table(nibbles: np.ndarray) -> np.ndarray:
+    keys = (nibbles[:NUM_QUBITS] << 4) | nibbles[NUM_QUBITS:2 * NUM_QUBITS]
+    state = product_state(PRODUCT_STATES[keys])
+    exps = _z_expectations(kernel.run(nibbles * math.pi / 8, state, FIRST_LAYER_OPS))
+    if near_fixed_edge(exps):
+        return _expectations_kernel(nibbles)
+    return exps
+
+
+# --- matrix product state ---------------------------------------------------
+# Each CX ladder crosses every cut of the register once, so after the two layers
+# the state has bond dimension at most 4 and the MPS engine never touches the
+# 2^16 amplitudes. Truncated runs (a smaller MAX_BOND) and values near a toFixed
+# edge are redone with the exact kernel.
+
+mps_circuit = MPSCircuit(qc, params)
+MAX_BOND = DEFAULT_MAX_BOND
+
+
+def _expectations_mps(nibbles: np.ndarray) -> np.ndarray:
+    mps = mps_circuit.run(nibbles * math.pi / 8, MAX_BOND)
+    exps = mps.expectations(range(NUM_QUBITS), "Z")[:, 0]
+    if not mps.is_exact() or near_fixed_edge(exps):
+        return _expectations_kernel(nibbles)
+    return exps
+
+
+# --- complex64 ---------------------------------------------------------------
+# There is no complex64 engine for qhash. A single-precision evolution moves the
+# expectations by up to qsim.readout.SINGLE_TOLERANCE (2e-5), 0.66 units of the 15
+# fraction bits toFixed keeps: more than half a unit, so every value would be
+# near an edge and every hash would be redone in float64. complex64 cannot carry
+# 16-bit fixed point; the 8-bit hashes in solution/ and research/ do have one.
+
+
+# --- deterministic ---------------------------------------------------------
+# qsim.deterministic: the same digests for any thread count, BLAS library or
+# CPU, at about 130 ms a hash. Its values are canonical rather than Qiskit's and
+# differ from the other engines only for a value within ~1e-15 of a toFixed edge.
+
+
+def _expectations_deterministic(nibbles: np.ndarray) -> np.ndarray:
+    re, im = deterministic.run(kernel, nibbles * math.pi / 8)
+    return deterministic.expectations(re, im, range(NUM_QUBITS), "Z")[0, :, 0]
+
+
+ENGINES = {
+    "mps": _expectations_mps,
+    "table": _expectations_table,
+    "kernel": _expectations_kernel,
+    "qiskit": _expectations_qiskit,
+    "deterministic": _expectations_deterministic,
+}
+
+
+def _digest(exps: np.ndarray) -> bytes:
     # convert the expectations to the fixed-point values
     fixed_exps = [toFixed(exp) for exp in exps]
 
@@ -65,3 +202,133 @@ def qhash(x: bytes) -> bytes:
             data.append((fixed >> (8 * i)) & 0xFF)
 
     return bytes(data)
+
+
+# Quantum simulation portion of the qhash
+# x - 256-bit byte array
+# returns the hash value as a 256-bit byte array
+def qhash(x: bytes, engine: str = DEFAULT_ENGINE) -> bytes:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+    return _digest(ENGINES[engine](qhash_nibbles(x)))
+
+
+# --- batched Estimator ------------------------------------------------------
+# qhash_batch evaluates the parameterized circuit once for N inputs: an
+# (N, num_params) angle array and the 16 single-qubit Z observables go to the
+# Estimator as one job. The estimator's values differ from the kernel's by a few
+# ulp, so rows near a toFixed edge are redone with the exact kernel and every
+# digest equals qhash(x).
+
+# column of each qc.parameters entry (sorted by name) in the params order
+CIRCUIT_ORDER = [params.index(param) for param in qc.parameters]
+
+
+def qhash_batch(inputs, estimator=None) -> list:
+    """qhash(x) for every x in inputs, simulated as one batched Estimator job."""
+    nibbles = np.array([qhash_nibbles(x) for x in inputs], dtype=np.int64).reshape(-1, num_params)
+    angles = (nibbles * math.pi / 8)[:, CIRCUIT_ORDER]
+    batch = batch_expectations(qc, angles, range(NUM_QUBITS), "Z", estimator)[:, :, 0]
+    digests = []
+    for row, exps in zip(nibbles, batch):
+        if near_fixed_edge(exps):
+            exps = _expectations_kernel(row)
+        digests.append(_digest(exps))
+    return digests
+
+
+# --- batched statevector ----------------------------------------------------
+# qhash_stream hashes a long list of inputs (a backlog of block headers, say)
+# B at a time on a (B, 2^16) array of states, 1 MiB per state:
+#   first layer    the product state of PRODUCT_STATES rows, batched
+#   CX ladder      one gather of every row (the kernel's permutation)
+#   later layers   RZ RY of four qubits at a time as a 16x16 Kronecker block,
+#                  four batched matmuls per layer
+#   readout        |amplitude|^2 times a (2^16, 16) matrix of Z signs
+# This rounds differently from the kernel (by ~1e-15), so rows near a toFixed
+# edge are redone with the exact kernel. B follows from BATCH_MEMORY, the
+# ceiling on the live state arrays, or is given directly; tune either per
+# machine (a B whose states fit in cache is usually fastest).
+
+BATCH_MEMORY = int(os.environ.get("QHASH_BATCH_MEMORY", 16 << 20))  # bytes
+BATCH_COPIES = 4  # (B, 2^16) complex arrays alive at the peak of a batch step
+GROUP_QUBITS = 4  # qubits per Kronecker block
+
+CX_LADDER = next(op[1] for op in kernel.ops if op[0] == "gather")
+Z_SIGNS = 1.0 - 2 * ((np.arange(1 << NUM_QUBITS)[:, None] >> np.arange(NUM_QUBITS)) & 1)
+
+
+def build_layer_gates() -> np.ndarray:
+    """RZ(phi) RY(theta) for every (theta, phi) nibble pair, shape (256, 2, 2)."""
+    gates = np.empty((256, 2, 2), dtype=complex)
+    for key in range(256):
+        ry = gate_matrix(RYGate, ((key >> 4) * math.pi / 8,))
+        rz = gate_matrix(RZGate, ((key & 0x0F) * math.pi / 8,))
+        gates[key] = rz @ ry
+    return gates
+
+
+LAYER_GATES = build_layer_gates()
+
+
+def auto_batch_size(memory: int = None) -> int:
+    """The number of states whose batch step fits in memory bytes (BATCH_MEMORY by default)."""
+    memory = BATCH_MEMORY if memory is None else memory
+    return max(1, memory // (BATCH_COPIES * np.dtype(complex).itemsize << NUM_QUBITS))
+
+
+def _layer_keys(nibbles: np.ndarray, layer: int) -> np.ndarray:
+    # (RY nibble << 4 | RZ nibble) of every qubit, shape (B, NUM_QUBITS)
+    first = 2 * NUM_QUBITS * layer
+    return (nibbles[:, first:first + NUM_QUBITS] << 4) | nibbles[:, first + NUM_QUBITS:first + 2 * NUM_QUBITS]
+
+
+def _kron_blocks(gates: np.ndarray) -> list:
+    """(B, 16, 16) Kronecker blocks of each GROUP_QUBITS qubits, lowest qubit least significant."""
+    blocks = []
+    for first in range(0, NUM_QUBITS, GROUP_QUBITS):
+        block = gates[:, first]
+        for q in range(first + 1, first + GROUP_QUBITS):
+            size = 2 * block.shape[1]
+            block = np.einsum("bij,bkl->bikjl", gates[:, q], block).reshape(len(gates), size, size)
+        blocks.append(block)
+    return blocks
+
+
+def _expectations_batched(nibbles: np.ndarray) -> np.ndarray:
+    """Z expectations of a (B, num_params) batch of nibble rows, shape (B, NUM_QUBITS)."""
+    size = len(nibbles)
+    qubit_states = PRODUCT_STATES[_layer_keys(nibbles, 0)]
+    state = qubit_states[:, 0]
+    for q in range(1, NUM_QUBITS):
+        state = (qubit_states[:, q, :, None] * state[:, None, :]).reshape(size, -1)
+    state = np.take(state, CX_LADDER, axis=1)
+    group = 1 << GROUP_QUBITS
+    for layer in range(1, NUM_LAYERS):
+        blocks = _kron_blocks(LAYER_GATES[_layer_keys(nibbles, layer)])
+        # the lowest block acts on the last axis; the others on (B, hi, 16, lo) views
+        state = np.matmul(state.reshape(size, -1, group), blocks[0].transpose(0, 2, 1))
+        for g, block in enumerate(blocks[1:], 1):
+            state = np.matmul(block[:, None], state.reshape(size, -1, group, group ** g))
+        state = np.take(state.reshape(size, -1), CX_LADDER, axis=1)
+    return (state.real ** 2 + state.imag ** 2) @ Z_SIGNS
+
+
+def qhash_stream(inputs, batch_size: int = None, memory: int = None):
+    """Yield qhash(x) for every x in inputs (any iterable), batch_size inputs at a time.
+
+    batch_size defaults to auto_batch_size(memory).
+    """
+    batch_size = auto_batch_size(memory) if batch_size is None else batch_size
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    inputs = iter(inputs)
+    while True:
+        chunk = [qhash_nibbles(x) for _, x in zip(range(batch_size), inputs)]
+        if not chunk:
+            return
+        nibbles = np.array(chunk, dtype=np.int64)
+        for row, exps in zip(nibbles, _expectations_batched(nibbles)):
+            if near_fixed_edge(exps):
+                exps = _expectations_kernel(row)
+            yield _digest(exps)
@@ -0,0 +1 @@
+# Shared NumPy simulation kernels for the hash variants in solution/ and research/
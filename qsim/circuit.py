@@ -0,0 +1,335 @@
+# Compiled statevector kernels for fixed-structure circuits
+#
+# Several variants rebuild or re-bind the same circuit for every input and
+# simulate it with Statevector.from_instruction, which creates a bound circuit,
+# an Instruction and an Operator per gate on every call. compile_circuit walks
+# the circuit once and keeps only what the simulation needs:
+#   fixed gates            the gate matrix and the contraction layout
+#   parameterized gates    the gate class and which entry of the value vector
+#                          feeds each parameter; matrices are cached per value
+#   runs of permutation    CX, X, SWAP, ... merged into one gather index
+#   gates                  (runs of XOR-affine ones, like CX fan-outs, are
+#                          tracked as a GF(2) map and the index built once)
+#   sub-circuits           inlined, with their global phase as its own step
+# CompiledCircuit.run(values) then evolves |0...0> with the same np.dot
+# contractions Statevector uses, so the amplitudes are bit-for-bit identical.
+#
+# With fuse=True, runs of fixed single-qubit gates on distinct qubits (an
+# all-qubit H or ry(pi/4) layer, or different gates side by side) also become
+# one "layer" step: apply_layer contracts LAYER_GROUP adjacent qubits per pass
+# with the Kronecker product of their gates (for H, a blocked Walsh-Hadamard
+# transform), ping-ponging between two buffers, instead of a transposed copy
+# and a fresh result per gate. The sums are regrouped, so amplitudes then
+# differ from Statevector's at ~1e-15.
+
+import functools
+
+import numpy as np
+from qiskit.circuit import Parameter
+from qiskit.quantum_info import Operator
+
+# Below this qubit stride np.matmul's stacked loop rounds differently from one
+# big np.dot, so low qubits take the transposed-copy route Statevector uses.
+MATMUL_MIN_STRIDE = 32
+LAYER_GROUP = 4  # qubits per apply_layer pass; a 16x16 block still streams at memory speed
+
+
+@functools.lru_cache(maxsize=4096)
+def gate_matrix(gate_class, values: tuple) -> np.ndarray:
+    """Matrix of gate_class(*values) exactly as Statevector builds it."""
+    return np.asarray(Operator._instruction_to_matrix(gate_class(*values)), dtype=complex)
+
+
+def _layout(num_qubits: int, qargs: list) -> tuple:
+    """(tensor shape, axes, inverse axes, contraction shape, stride) for a gate on qargs.
+
+    Statevector._evolve_operator transposes a (2,) * n tensor; runs of
+    untouched qubits are merged into single axes here, which gives the same
+    memory layout for np.dot with far fewer dimensions to transpose. stride is
+    2**q for a single-qubit gate on qubit q and None otherwise.
+    """
+    gate_axes = [num_qubits - 1 - q for q in reversed(qargs)]
+    shape, position = [], {}
+    for axis in range(num_qubits):
+        if axis in gate_axes:
+            position[axis] = len(shape)
+            shape.append(2)
+        elif shape and axis - 1 not in gate_axes and axis > 0:
+            shape[-1] *= 2
+        else:
+            shape.append(2)
+    axes = [position[axis] for axis in gate_axes]
+    axes += [i for i in range(len(shape)) if i not in axes]
+    contract_dim = 2 ** len(qargs)
+    stride = 2 ** qargs[0] if len(qargs) == 1 else None
+    return tuple(shape), axes, np.argsort(axes).tolist(), (contract_dim, 2 ** num_qubits // contract_dim), stride
+
+
+def apply_matrix(state: np.ndarray, matrix: np.ndarray, layout: tuple) -> np.ndarray:
+    """One gate on a flat state, contracted like Statevector.evolve."""
+    shape, axes, axes_inv, contract_shape, stride = layout
+    if stride is not None and stride >= MATMUL_MIN_STRIDE:
+        # stacked (2, stride) blocks go through the same gemm kernel without the transposed copies
+        return np.matmul(matrix, state.reshape(-1, 2, stride)).reshape(state.shape)
+    tensor = np.transpose(np.reshape(state, shape), axes)
+    tensor = np.reshape(np.dot(matrix, np.reshape(tensor, contract_shape)), tensor.shape)
+    return np.reshape(np.transpose(tensor, axes_inv), state.shape)
+
+
+def apply_layer(state: np.ndarray, matrices, qubits) -> np.ndarray:
+    """Single-qubit gates on distinct qubits, on a flat state.
+
+    matrices is one 2x2 matrix for every qubit or one per qubit. Adjacent
+    qubits are taken LAYER_GROUP at a time: the Kronecker product of their
+    gates goes through one matmul pass, and the passes alternate between two
+    new buffers, so no other temporaries are made. state itself is not written.
+    """
+    source = state = np.ascontiguousarray(state)
+    if np.ndim(matrices) == 2:
+        matrices = [matrices] * len(qubits)
+    gates = sorted(zip(qubits, (np.asarray(m, dtype=state.dtype) for m in matrices)), key=lambda g: g[0])
+    free = []  # buffers from earlier passes that can be written again
+    while gates:
+        low = gates[0][0]
+        k = 1
+        while k < min(LAYER_GROUP, len(gates)) and gates[k][0] == low + k:
+            k += 1
+        # the highest qubit is the most significant factor
+        block = functools.reduce(np.kron, [m for _, m in reversed(gates[:k])])
+        out = free.pop() if free else np.empty_like(state)
+        if low == 0:
+            np.matmul(state.reshape(-1, 2 ** k), block.T, out=out.reshape(-1, 2 ** k))
+        else:
+            np.matmul(block, state.reshape(-1, 2 ** k, 1 << low), out=out.reshape(-1, 2 ** k, 1 << low))
+        if state is not source:
+            free.append(state)
+        state = out
+        gates = gates[k:]
+    return state
+
+
+def _affine_source(matrix: np.ndarray):
+    """(shift, columns) with source(i) = shift ^ XOR of columns[j] over bits j of i, or None.
+
+    source(i) is the basis state a permutation gate moves into state i, in
+    the gate's local (little-endian) indices. CX, X and SWAP are affine over
+    GF(2); CCX and CSWAP are not.
+    """
+    source = np.argmax(matrix.real, axis=1)
+    k = len(source).bit_length() - 1
+    shift = int(source[0])
+    columns = [int(source[1 << j]) ^ shift for j in range(k)]
+    expected = np.full(len(source), shift)
+    for j, column in enumerate(columns):
+        expected[(np.arange(len(source)) >> j & 1).astype(bool)] ^= column
+    return (shift, columns) if np.array_equal(expected, source) else None
+
+
+def affine_gather(num_qubits: int, shift: int, columns: list) -> np.ndarray:
+    """The gather index of an XOR-affine source map, built by doubling in O(2^n)."""
+    perm = np.empty(2 ** num_qubits, dtype=np.intp)
+    perm[0] = shift
+    for j, column in enumerate(columns):
+        perm[1 << j:2 << j] = perm[:1 << j] ^ column
+    return perm
+
+
+def _is_permutation(matrix: np.ndarray) -> bool:
+    return (np.isin(matrix, (0, 1)).all() and (matrix.sum(axis=0) == 1).all()
+            and (matrix.sum(axis=1) == 1).all())
+
+
+def flatten(qc, qubit_map: list = None):
+    """Yield (kind, payload, qubits) for every gate of qc, sub-circuits inlined.
+
+    kind is "fixed" with the gate matrix, "param" with a parameterized
+    operation, or "phase" with the global phase of an inlined sub-circuit.
+    """
+    qubit_map = list(range(qc.num_qubits)) if qubit_map is None else qubit_map
+    positions = {qubit: i for i, qubit in enumerate(qc.qubits)}
+    for instruction in qc.data:
+        op = instruction.operation
+        qargs = [qubit_map[positions[q]] for q in instruction.qubits]
+        if instruction.clbits:
+            raise ValueError(f"Cannot compile instruction with classical bits: {op.name}")
+        if op.name == "barrier":
+            continue
+        if op.is_parameterized():
+            yield "param", op, qargs
+            continue
+        matrix = Operator._instruction_to_matrix(op)
+        if matrix is not None:
+            yield "fixed", np.asarray(matrix, dtype=complex), qargs
+        elif op.definition is not None:
+            if op.definition.global_phase:
+                yield "phase", float(op.definition.global_phase), qargs
+            yield from flatten(op.definition, qargs)
+        else:
+            raise ValueError(f"Cannot compile instruction: {op.name}")
+
+
+def parameter_sources(op, index: dict) -> tuple:
+    """Each parameter of op as a position in the value vector (via index) or a constant."""
+    sources = []
+    for param in op.params:
+        if isinstance(param, Parameter) and param in index:
+            sources.append(index[param])
+        elif not getattr(param, "parameters", None):
+            sources.append(float(param))
+        else:
+            raise ValueError(f"Cannot compile {op.name}: parameter expression {param} is not a plain Parameter")
+    return tuple(sources)
+
+
+def bind_sources(sources: tuple, values: list) -> tuple:
+    return tuple(values[s] if isinstance(s, int) else s for s in sources)
+
+
+class CompiledCircuit:
+    """A circuit reduced to a list of statevector operations, bound per call.
+
+    parameters fixes the order of the value vector passed to run (the
+    circuit's own sorted qc.parameters by default). fuse=True merges layers
+    of single-qubit gates into apply_layer steps.
+    """
+
+    def __init__(self, qc, parameters=None, fuse: bool = False):
+        self.num_qubits = qc.num_qubits
+        self.fuse = fuse
+        self.parameters = list(qc.parameters if parameters is None else parameters)
+        missing = set(qc.parameters) - set(self.parameters)
+        if missing:
+            raise ValueError(f"No value order given for parameters {sorted(p.name for p in missing)}")
+        self._index = {param: i for i, param in enumerate(self.parameters)}
+        self.global_phase = float(qc.global_phase)
+        self.ops = []
+        self._perm = None
+        self._affine = None  # [shift, columns] of a run of XOR-affine permutations
+        self._layer = None  # (matrices, qubits) of the layer being collected
+        self._compile(qc, list(range(qc.num_qubits)))
+        self._flush()
+
+    def _compile(self, qc, qubit_map: list) -> None:
+        for kind, payload, qargs in flatten(qc, qubit_map):
+            if kind == "phase":
+                self._flush()
+                self.ops.append(("phase", np.exp(1j * payload)))
+            elif kind == "param":
+                self._flush()
+                self.ops.append(("param", payload.base_class, parameter_sources(payload, self._index),
+                                 _layout(self.num_qubits, qargs)))
+            else:
+                self._add_fixed(payload, qargs)
+
+    def _add_fixed(self, matrix: np.ndarray, qargs: list) -> None:
+        layout = _layout(self.num_qubits, qargs)
+        if not _is_permutation(matrix):
+            if self.fuse and len(qargs) == 1:
+                layer = self._layer
+                if layer is None or qargs[0] in layer[1]:
+                    self._flush()
+                    self._layer = layer = ([], [])
+                layer[0].append(matrix)
+                layer[1].append(qargs[0])
+                return
+            self._flush()
+            self.ops.append(("matrix", matrix, layout))
+            return
+        # the contraction of a 0/1 matrix only moves amplitudes; track where from
+        self._flush_layer()
+        local = _affine_source(matrix) if self._perm is None else None
+        if local is not None:
+            if self._affine is None:
+                self._affine = [0, [1 << q for q in range(self.num_qubits)]]
+            # source_new(i) = source(gate_source(i)): only the gate's qubit columns change
+            columns = self._affine[1]
+            old = [columns[q] for q in qargs]
+
+            def image(local_bits: int) -> int:
+                out = 0
+                for j, column in enumerate(old):
+                    if local_bits >> j & 1:
+                        out ^= column
+                return out
+
+            self._affine[0] ^= image(local[0])
+            for q, column in zip(qargs, local[1]):
+                columns[q] = image(column)
+            return
+        self._flush_affine()
+        if self._perm is None:
+            self._perm = np.arange(2 ** self.num_qubits)
+        self._perm = self._perm[apply_matrix(np.arange(2.0 ** self.num_qubits), matrix, layout).real.astype(np.intp)]
+
+    def _flush_affine(self) -> None:
+        if self._affine is not None:
+            self._perm = affine_gather(self.num_qubits, *self._affine)
+            self._affine = None
+
+    def _flush_layer(self) -> None:
+        if self._layer is not None:
+            matrices, qubits = self._layer
+            if len(qubits) == 1:
+                self.ops.append(("matrix", matrices[0], _layout(self.num_qubits, qubits)))
+            else:
+                self.ops.append(("layer", tuple(matrices), tuple(qubits)))
+            self._layer = None
+
+    def _flush(self) -> None:
+        self._flush_layer()
+        self._flush_affine()
+        if self._perm is not None:
+            self.ops.append(("gather", self._perm))
+            self._perm = None
+
+    def matrices(self, values) -> list:
+        """The gate matrix of every "param" op for one value vector."""
+        return [gate_matrix(gate_class, bind_sources(sources, values))
+                for kind, gate_class, sources, _ in (op for op in self.ops if op[0] == "param")]
+
+    def run(self, values=(), state: np.ndarray = None, first_op: int = 0, dtype=complex) -> np.ndarray:
+        """Final amplitudes of the circuit with its parameters set to values.
+
+        Pass the amplitudes after ops[:first_op] as state to resume from there.
+        dtype=np.complex64 evolves in single precision (the matrices are
+        rounded to it); results then differ from Statevector at the ~1e-6 level.
+        """
+        values = np.asarray(values, dtype=float).tolist()
+        if len(values) != len(self.parameters):
+            raise ValueError(f"Expected {len(self.parameters)} parameter values, got {len(values)}")
+        if state is None:
+            if first_op:
+                raise ValueError("Resuming from first_op needs the state after the skipped ops")
+            state = np.zeros(2 ** self.num_qubits, dtype=dtype)
+            state[0] = 1.0
+            if self.global_phase:
+                state = state * state.dtype.type(np.exp(1j * self.global_phase))
+        else:
+            state = np.asarray(state, dtype=dtype)
+        matrices = iter(self.matrices(values)[sum(op[0] == "param" for op in self.ops[:first_op]):])
+        for op in self.ops[first_op:]:
+            if op[0] == "gather":
+                state = state[op[1]]
+            elif op[0] == "phase":
+                state = state * state.dtype.type(op[1])
+            elif op[0] == "matrix":
+                state = apply_matrix(state, op[1].astype(state.dtype, copy=False), op[2])
+            elif op[0] == "layer":
+                state = apply_layer(state, op[1], op[2])
+            else:
+                state = apply_matrix(state, next(matrices).astype(state.dtype, copy=False), op[3])
+        return state
+
+
+def product_state(qubit_states: np.ndarray) -> np.ndarray:
+    """Amplitudes of the product of n single-qubit states, an (n, 2) array with qubit 0 first."""
+    state = qubit_states[0]
+    for vector in qubit_states[1:]:
+        # qubit q is bit q of the basis index, so each new qubit goes outermost
+        state = np.outer(vector, state).reshape(-1)
+    return state
+
+
+def compile_circuit(qc, parameters=None, fuse: bool = False) -> CompiledCircuit:
+    """Compile qc once; see CompiledCircuit."""
+    return CompiledCircuit(qc, parameters, fuse)
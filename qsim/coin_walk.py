@@ -0,0 +1,72 @@
+# Compiled kernels for the 20-qubit coin circuit
+#
+# solution/bonus/hash.py and research/test_hashing/qhash.py run the same
+# circuit: per 2 input bits, H (bit '1') or RX(pi/2) (bit '0') on coins 0 and
+# 1, then a CX from each of the 4 coin qubits to each of the 16 position
+# qubits; after the last chunk a ry(pi/4) layer, a CX chain and an H layer.
+# Only the coin gates depend on the input, so there are four 2-bit chunk
+# operators (plus '0' and '1' for an odd last bit) and one fixed tail. Each
+# is compiled once, the 64 CX to a single gather, and run() streams the state
+# through the kernel of each chunk in turn, with no circuit built per call.
+
+import functools
+import math
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+from qsim.circuit import compile_circuit
+
+TOTAL_QUBITS = 20
+COIN_QUBITS = list(range(4))
+POSITION_QUBITS = list(range(4, 20))
+
+
+def chunk_circuit(bits: str) -> QuantumCircuit:
+    """Coin gates for one chunk of up to 2 bits, then the coin-to-position CX fan-out."""
+    qc = QuantumCircuit(TOTAL_QUBITS)
+    for j, bit in enumerate(bits):
+        if bit == '1':
+            qc.h(COIN_QUBITS[j % len(COIN_QUBITS)])
+        else:
+            qc.rx(math.pi / 2, COIN_QUBITS[j % len(COIN_QUBITS)])
+    for c in COIN_QUBITS:
+        for p in POSITION_QUBITS:
+            qc.cx(c, p)
+    return qc
+
+
+def tail_circuit() -> QuantumCircuit:
+    """The mixing and final Hadamard layers after the last chunk."""
+    qc = QuantumCircuit(TOTAL_QUBITS)
+    for i in range(TOTAL_QUBITS):
+        qc.ry(math.pi / 4, i)
+    for i in range(TOTAL_QUBITS - 1):
+        qc.cx(i, i + 1)
+    for i in range(TOTAL_QUBITS):
+        qc.h(i)
+    return qc
+
+
+@functools.lru_cache(maxsize=None)
+def chunk_kernel(bits: str):
+    """chunk_circuit(bits) compiled once: a fused coin layer, then the fan-out gather."""
+    return compile_circuit(chunk_circuit(bits), fuse=True)
+
+
+@functools.lru_cache(maxsize=None)
+def tail_kernel():
+    """tail_circuit compiled once, its ry and h layers fused."""
+    return compile_circuit(tail_circuit(), fuse=True)
+
+
+def run(binary_input: str, dtype=complex) -> np.ndarray:
+    """Final amplitudes of the circuit for a string of '0' / '1' bits, from |0...0>.
+
+    dtype=np.complex64 evolves in single precision, as CompiledCircuit.run does.
+    """
+    state = np.zeros(2 ** TOTAL_QUBITS, dtype=dtype)
+    state[0] = 1.0
+    for start in range(0, len(binary_input), 2):
+        state = chunk_kernel(binary_input[start:start + 2]).run(state=state, dtype=dtype)
+    return tail_kernel().run(state=state, dtype=dtype)
@@ -0,0 +1,117 @@
+# Bit-exact deterministic evolution and readout
+#
+# The fast engines round the same way only on the same machine setup: np.dot
+# goes through whatever BLAS is installed, NumPy's complex ufuncs and its
+# reductions pick SIMD kernels at run time, and Qiskit's parallel sum splits by
+# its thread count. Near a quantization edge any of these can flip a byte.
+#
+# Everything here is float64 elementwise multiply, add and subtract on separate
+# real and imaginary arrays (each one IEEE-rounded on its own, whatever the
+# SIMD width), gathers, and sums over a fixed pairwise tree. There is no BLAS,
+# no threading and no NumPy reduction, and the rows of a batch never mix, so
+# the values depend on nothing but the inputs: not on thread counts, batch
+# size, BLAS library or CPU. They are canonical values of their own and differ
+# from Statevector's by ~1e-15, which only shows in a digest when a value sits
+# that close to a quantization edge.
+
+import numpy as np
+
+from qsim.circuit import bind_sources, gate_matrix
+
+
+def tree_sum(rows: np.ndarray) -> np.ndarray:
+    """Sum along the last axis over a fixed pairwise tree (zero-padded to a power of two)."""
+    size = rows.shape[-1]
+    width = 1 << max(size - 1, 0).bit_length()
+    if width != size:
+        rows = np.concatenate([rows, np.zeros(rows.shape[:-1] + (width - size,))], axis=-1)
+    while rows.shape[-1] > 1:
+        half = rows.shape[-1] // 2
+        rows = np.add(rows[..., :half], rows[..., half:])
+    return rows[..., 0]
+
+
+def _product(m_re, m_im, a_re, a_im) -> tuple:
+    # (m_re + i m_im)(a_re + i a_im), one rounding per operation
+    return (np.subtract(np.multiply(m_re, a_re), np.multiply(m_im, a_im)),
+            np.add(np.multiply(m_re, a_im), np.multiply(m_im, a_re)))
+
+
+def apply_gate(re: np.ndarray, im: np.ndarray, matrix: np.ndarray, qubit: int) -> tuple:
+    """A single-qubit gate on a (B, 2^n) batch given as real and imaginary parts.
+
+    matrix is one 2x2 matrix or a (B, 2, 2) stack, one per row.
+    """
+    m = np.asarray(matrix, dtype=complex).reshape(-1, 2, 2)
+    m_re, m_im = m.real[:, :, :, None, None], m.imag[:, :, :, None, None]
+    shape = (re.shape[0], -1, 2, 1 << qubit)
+    v_re, v_im = re.reshape(shape), im.reshape(shape)
+    out_re, out_im = np.empty_like(v_re), np.empty_like(v_im)
+    for row in range(2):
+        acc_re, acc_im = _product(m_re[:, row, 0], m_im[:, row, 0], v_re[:, :, 0], v_im[:, :, 0])
+        t_re, t_im = _product(m_re[:, row, 1], m_im[:, row, 1], v_re[:, :, 1], v_im[:, :, 1])
+        out_re[:, :, row] = np.add(acc_re, t_re)
+        out_im[:, :, row] = np.add(acc_im, t_im)
+    return out_re.reshape(re.shape), out_im.reshape(im.shape)
+
+
+def apply_phase(re: np.ndarray, im: np.ndarray, phase: complex) -> tuple:
+    return _product(np.real(phase), np.imag(phase), re, im)
+
+
+def run(kernel, values=()) -> tuple:
+    """(re, im) final amplitudes of a qsim.circuit.CompiledCircuit, shape (B, 2^n).
+
+    values is one value vector or a (B, num_parameters) array, one row per
+    state. Only single-qubit gates, permutations and phases are supported.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values.reshape(-1, len(kernel.parameters)) if values.size else np.zeros((1, 0))
+    rows = values.tolist()
+    re = np.zeros((len(rows), 2 ** kernel.num_qubits))
+    im = np.zeros_like(re)
+    re[:, 0] = 1.0
+    if kernel.global_phase:
+        re, im = apply_phase(re, im, np.exp(1j * kernel.global_phase))
+    for op in kernel.ops:
+        if op[0] == "gather":
+            re, im = re[:, op[1]], im[:, op[1]]
+        elif op[0] == "phase":
+            re, im = apply_phase(re, im, op[1])
+        elif op[0] == "layer":
+            for matrix, qubit in zip(op[1], op[2]):
+                re, im = apply_gate(re, im, matrix, qubit)
+        else:
+            stride = op[-1][-1]
+            if stride is None:
+                raise ValueError("Deterministic runs support single-qubit gates and permutations only")
+            if op[0] == "matrix":
+                matrix = op[1]
+            else:
+                matrix = np.stack([gate_matrix(op[1], bind_sources(op[2], row)) for row in rows])
+            re, im = apply_gate(re, im, matrix, stride.bit_length() - 1)
+    return re, im
+
+
+def expectations(re: np.ndarray, im: np.ndarray, qubits, axes: str = "ZX") -> np.ndarray:
+    """<P> on each qubit for each P in axes, shape (B, len(qubits), len(axes))."""
+    qubits = list(qubits)
+    if any(axis not in "XYZ" for axis in axes):
+        raise ValueError(f"axes must be drawn from 'XYZ', got {axes!r}")
+    out = np.empty((re.shape[0], len(qubits), len(axes)))
+    for k, qubit in enumerate(qubits):
+        shape = (re.shape[0], -1, 2, 1 << qubit)
+        v_re, v_im = re.reshape(shape), im.reshape(shape)
+        re0, re1, im0, im1 = v_re[:, :, 0], v_re[:, :, 1], v_im[:, :, 0], v_im[:, :, 1]
+        for col, axis in enumerate(axes):
+            if axis == "Z":
+                terms = np.subtract(np.add(np.multiply(re0, re0), np.multiply(im0, im0)),
+                                    np.add(np.multiply(re1, re1), np.multiply(im1, im1)))
+            elif axis == "X":
+                terms = np.add(np.multiply(re0, re1), np.multiply(im0, im1))
+                terms = np.multiply(terms, 2.0)
+            else:
+                terms = np.subtract(np.multiply(re0, im1), np.multiply(im0, re1))
+                terms = np.multiply(terms, 2.0)
+            out[:, k, col] = tree_sum(terms.reshape(re.shape[0], -1))
+    return out
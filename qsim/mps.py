@@ -0,0 +1,176 @@
+# Matrix-product-state simulation for shallow chain circuits
+#
+# qhash.py and the v7 variants entangle their qubits with nearest-neighbour CX
+# chains (plus one wrap-around CX for the ring). Each chain crosses every cut
+# of the register a bounded number of times, so after a few layers the state
+# is a matrix product state of small bond dimension, and single-qubit
+# expectations cost O(n * bond^3) instead of O(2^n).
+#
+# The state is kept in mixed canonical form. Two-qubit gates on non-adjacent
+# qubits first SWAP one qubit next to the other (the qubit stays there; the
+# site of each qubit is tracked). After each two-qubit gate the bond is split
+# by SVD and cut to max_bond, and the weight of the dropped singular values is
+# added to truncation_error. A run is exact when that stays at rounding level.
+
+import numpy as np
+
+from qsim.circuit import bind_sources, flatten, gate_matrix, parameter_sources
+
+DEFAULT_MAX_BOND = 64
+SVD_CUTOFF = 1e-13  # singular values below this (the state has norm 1) are rounding noise
+EXACT_TOLERANCE = 1e-20  # truncation_error up to this counts as exact
+
+PAULI_MATRICES = {
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+}
+SWAP = np.eye(4, dtype=complex)[[0, 2, 1, 3]]
+
+
+class MPS:
+    """An n-qubit |0...0> matrix product state, one (left, 2, right) tensor per site."""
+
+    def __init__(self, num_qubits: int, max_bond: int = DEFAULT_MAX_BOND):
+        if max_bond < 1:
+            raise ValueError(f"max_bond must be at least 1, got {max_bond}")
+        self.num_qubits = num_qubits
+        self.max_bond = max_bond
+        self.tensors = [np.array([1, 0], dtype=complex).reshape(1, 2, 1) for _ in range(num_qubits)]
+        self.site = list(range(num_qubits))  # site of each qubit
+        self.qubit = list(range(num_qubits))  # qubit on each site
+        self.center = 0  # every tensor left of it is left-orthonormal, right of it right-orthonormal
+        self.truncation_error = 0.0
+
+    @property
+    def bond_dims(self) -> list:
+        return [tensor.shape[2] for tensor in self.tensors[:-1]]
+
+    def is_exact(self, tolerance: float = EXACT_TOLERANCE) -> bool:
+        return self.truncation_error <= tolerance
+
+    def apply(self, matrix: np.ndarray, qubits: list) -> None:
+        """A one- or two-qubit gate in Qiskit's little-endian matrix convention."""
+        if len(qubits) == 1:
+            site = self.site[qubits[0]]
+            self.tensors[site] = np.einsum("st,ltr->lsr", matrix, self.tensors[site])
+        elif len(qubits) == 2:
+            first, second = qubits
+            while abs(self.site[first] - self.site[second]) > 1:
+                # walk the second qubit towards the first
+                step = 1 if self.site[second] < self.site[first] else -1
+                self._apply_pair(min(self.site[second], self.site[second] + step), SWAP)
+            # matrix index is bit(first) + 2 * bit(second): rows (out2, out1), columns (in2, in1)
+            gate = matrix.reshape(2, 2, 2, 2)
+            if self.site[first] > self.site[second]:
+                gate = gate.transpose(1, 0, 3, 2)
+            self._apply_pair(min(self.site[first], self.site[second]), gate.reshape(4, 4))
+        else:
+            raise ValueError(f"MPS gates act on one or two qubits, got {len(qubits)}")
+
+    def _apply_pair(self, left: int, gate: np.ndarray) -> None:
+        """gate on sites (left, left + 1); gate index is bit(left + 1) * 2 + bit(left)."""
+        self._move_center(left)
+        a, b = self.tensors[left], self.tensors[left + 1]
+        theta = np.einsum("lsm,mtr->ltsr", a, b)  # (left bond, s_right, s_left, right bond)
+        lb, rb = theta.shape[0], theta.shape[3]
+        theta = np.einsum("ij,ljr->lir", gate, theta.reshape(lb, 4, rb)).reshape(lb, 2, 2, rb)
+        u, s, vh = np.linalg.svd(theta.transpose(0, 2, 1, 3).reshape(lb * 2, 2 * rb), full_matrices=False)
+        keep = max(1, min(self.max_bond, int((s > SVD_CUTOFF).sum())))
+        dropped = float((s[keep:] ** 2).sum())
+        if dropped:
+            self.truncation_error += dropped
+            s = s[:keep] / np.linalg.norm(s[:keep])
+        else:
+            s = s[:keep]
+        self.tensors[left] = u[:, :keep].reshape(lb, 2, keep)
+        self.tensors[left + 1] = (s[:, None] * vh[:keep]).reshape(keep, 2, rb)
+        self.center = left + 1
+        if gate is SWAP:
+            q1, q2 = self.qubit[left], self.qubit[left + 1]
+            self.qubit[left], self.qubit[left + 1] = q2, q1
+            self.site[q1], self.site[q2] = left + 1, left
+
+    def _move_center(self, site: int) -> None:
+        while self.center < site:
+            a = self.tensors[self.center]
+            q, r = np.linalg.qr(a.reshape(-1, a.shape[2]))
+            self.tensors[self.center] = q.reshape(a.shape[0], 2, -1)
+            self.tensors[self.center + 1] = np.einsum("km,msr->ksr", r, self.tensors[self.center + 1])
+            self.center += 1
+        while self.center > site:
+            a = self.tensors[self.center]
+            q, r = np.linalg.qr(a.reshape(a.shape[0], -1).T)
+            self.tensors[self.center] = q.T.reshape(-1, 2, a.shape[2])
+            self.tensors[self.center - 1] = np.einsum("lsm,km->lsk", self.tensors[self.center - 1], r)
+            self.center -= 1
+
+    def expectations(self, qubits=None, axes: str = "ZX") -> np.ndarray:
+        """<P> on each qubit for each P in axes, shaped like qsim.readout.pauli_expectations."""
+        qubits = list(range(self.num_qubits) if qubits is None else qubits)
+        if any(axis not in PAULI_MATRICES for axis in axes):
+            raise ValueError(f"axes must be drawn from 'XYZ', got {axes!r}")
+        out = np.empty((len(qubits), len(axes)))
+        # sweep the orthogonality center once across the sites that are read
+        for site in sorted({self.site[q] for q in qubits}):
+            self._move_center(site)
+            a = self.tensors[site]
+            rho = np.einsum("lsr,ltr->st", a, a.conj())  # reduced density matrix, up to the norm
+            norm = rho.trace().real
+            for row in (i for i, q in enumerate(qubits) if self.site[q] == site):
+                for col, axis in enumerate(axes):
+                    out[row, col] = np.einsum("st,ts->", rho, PAULI_MATRICES[axis]).real / norm
+        return out
+
+
+def operator_schmidt_rank(matrix: np.ndarray) -> int:
+    """How much a two-qubit gate can raise the bond dimension across the two qubits (1, 2 or 4)."""
+    gate = matrix.reshape(2, 2, 2, 2)  # (out2, out1, in2, in1)
+    split = gate.transpose(1, 3, 0, 2).reshape(4, 4)  # (out1, in1) x (out2, in2)
+    return int(np.linalg.matrix_rank(split, tol=1e-12))
+
+
+class MPSCircuit:
+    """A circuit's gate list compiled once, run on an MPS for a vector of parameter values.
+
+    parameters fixes the order of the value vector (qc.parameters by default).
+    bond_bound and fits() give a static check before running: a cut crossed by
+    k CX gates needs at most 2^k. A run's truncation_error is the final word.
+    """
+
+    def __init__(self, qc, parameters=None):
+        self.num_qubits = qc.num_qubits
+        self.parameters = list(qc.parameters if parameters is None else parameters)
+        index = {param: i for i, param in enumerate(self.parameters)}
+        self.gates = []
+        # upper bound on the Schmidt rank across each cut between qubits q and q + 1
+        self.bond_bound = [1] * max(self.num_qubits - 1, 0)
+        for kind, payload, qargs in flatten(qc):
+            if kind == "phase" or not qargs:
+                continue  # global phases do not change any expectation value
+            if len(qargs) > 2:
+                raise ValueError(f"MPS gates act on one or two qubits, got {len(qargs)}")
+            if kind == "param":
+                self.gates.append((payload.base_class, parameter_sources(payload, index), qargs))
+                rank = 4
+            else:
+                self.gates.append((payload, None, qargs))
+                rank = operator_schmidt_rank(payload) if len(qargs) == 2 else 1
+            for cut in range(min(qargs), max(qargs)):
+                self.bond_bound[cut] *= rank
+        for cut in range(len(self.bond_bound)):
+            self.bond_bound[cut] = min(self.bond_bound[cut], 2 ** min(cut + 1, self.num_qubits - cut - 1))
+
+    def fits(self, max_bond: int = DEFAULT_MAX_BOND) -> bool:
+        """Whether max_bond can hold the state exactly (as far as the gate structure tells)."""
+        return max(self.bond_bound, default=1) <= max_bond
+
+    def run(self, values=(), max_bond: int = DEFAULT_MAX_BOND) -> MPS:
+        values = np.asarray(values, dtype=float).tolist()
+        if len(values) != len(self.parameters):
+            raise ValueError(f"Expected {len(self.parameters)} parameter values, got {len(values)}")
+        mps = MPS(self.num_qubits, max_bond)
+        for gate, sources, qargs in self.gates:
+            matrix = gate if sources is None else gate_matrix(gate, bind_sources(sources, values))
+            mps.apply(matrix, qargs)
+        return mps
@@ -0,0 +1,151 @@
+# All-qubit single-qubit Pauli readout
+#
+# The variants read <X>, <Y> and <Z> of every qubit by building a Pauli label
+# per qubit and axis and calling Statevector.expectation_value each time, one
+# pass over the amplitudes per qubit and axis. Here the qubits are taken in
+# groups of GROUP_QUBITS and one matrix product over a reshaped view of the
+# amplitudes gives each group's reduced density matrix rho; every <X>, <Y>
+# and <Z> of the group's qubits is then a sum of a few entries of rho. 20
+# qubits and all three axes cost 4 contractions instead of 60 passes.
+#
+# The sums run in a different order from Qiskit's, so values can differ from
+# Statevector.expectation_value by rounding (~1e-15). Callers that quantize
+# pass their edge test as exact_near: any state it flags is read again with
+# Statevector.expectation_value, and the quantized bytes are Qiskit's.
+
+import functools
+
+import numpy as np
+from qiskit.quantum_info import Pauli, Statevector
+
+AXES = "XYZ"
+GROUP_QUBITS = 5  # rho is 32 x 32; larger groups cost more multiplies than they save in passes
+
+
+def label_qubits(num_qubits: int) -> list:
+    """Qubit read by each position of a Pauli label ("I" * i + "Z" + ...)."""
+    return [num_qubits - 1 - i for i in range(num_qubits)]
+
+
+@functools.lru_cache(maxsize=None)
+def _pair_indices(k: int) -> tuple:
+    # for each of k qubits, the rho indices with that bit clear and the same indices with it set
+    index = np.arange(1 << k)
+    zero = np.array([index[index & (1 << j) == 0] for j in range(k)])
+    return zero, zero | (1 << np.arange(k))[:, None]
+
+
+def reduced_density_matrices(amps: np.ndarray, first: int, k: int) -> np.ndarray:
+    """(B, 2**k, 2**k) reduced density matrices of qubits first..first+k-1 of a (B, 2**n) batch."""
+    batch, size = amps.shape
+    inner = 1 << first
+    view = amps.reshape(batch, size // (inner << k), 1 << k, inner)
+    if inner == 1:
+        rows = view[..., 0].transpose(0, 2, 1)  # a strided view, no copy
+    else:
+        rows = view.transpose(0, 2, 1, 3).reshape(batch, 1 << k, -1)
+    return rows @ rows.conj().transpose(0, 2, 1)
+
+
+def _row_sums(terms: np.ndarray) -> np.ndarray:
+    # left to right along the last axis; np.sum picks its order from the batch shape,
+    # and a state must read the same alone as in a batch
+    total = terms[..., 0].copy()
+    for j in range(1, terms.shape[-1]):
+        total += terms[..., j]
+    return total
+
+
+def _group_expectations(rho: np.ndarray, axes: str) -> np.ndarray:
+    """(B, k, len(axes)) expectations of each qubit of a group from its rho."""
+    k = rho.shape[-1].bit_length() - 1
+    zero, one = _pair_indices(k)
+    out = np.empty(rho.shape[:1] + (k, len(axes)))
+    if "Z" in axes:
+        diagonal = np.diagonal(rho, axis1=1, axis2=2).real
+        z = _row_sums(diagonal[:, zero]) - _row_sums(diagonal[:, one])
+    if "X" in axes or "Y" in axes:
+        # rho[one, zero] summed is sum(a_1 * conj(a_0)) over the pairs that differ in the qubit
+        coherence = 2 * _row_sums(rho[:, one, zero])
+    for col, axis in enumerate(axes):
+        out[..., col] = z if axis == "Z" else coherence.real if axis == "X" else coherence.imag
+    return out
+
+
+def exact_expectations(amps: np.ndarray, qubits: list, axes: str) -> np.ndarray:
+    """Statevector.expectation_value of each single-qubit Pauli, Qiskit's values to the bit."""
+    sv = Statevector(np.asarray(amps, dtype=complex))
+    return np.array([[sv.expectation_value(Pauli(axis), [qubit]).real for axis in axes]
+                     for qubit in qubits]).reshape(len(qubits), len(axes))
+
+
+def pauli_expectations(state, qubits=None, axes: str = "ZX", max_bytes: int = 1 << 26,
+                       exact_near=None) -> np.ndarray:
+    """<P> on each qubit for each P in axes.
+
+    state is a Statevector or an array of 2**n amplitudes, optionally with
+    leading batch axes. qubits are Qiskit qubit indices (all of them by
+    default; use label_qubits for the "I" * i + P label order). Returns an
+    array of shape batch + (len(qubits), len(axes)). Batches are read in
+    slices of about max_bytes of amplitudes.
+
+    exact_near is an edge test such as near_byte_edge: a state whose values
+    it flags is read again with Statevector.expectation_value.
+    """
+    amps = np.asarray(getattr(state, "data", state))
+    num_qubits = amps.shape[-1].bit_length() - 1
+    qubits = list(range(num_qubits) if qubits is None else qubits)
+    if any(axis not in AXES for axis in axes):
+        raise ValueError(f"axes must be drawn from {AXES!r}, got {axes!r}")
+
+    lead = amps.shape[:-1]
+    amps = amps.reshape(-1, amps.shape[-1]).astype(complex, copy=False)
+    # about half the register per group, so a rho is never much larger than the state
+    k = max(1, min(GROUP_QUBITS, (num_qubits + 1) // 2))
+    groups = sorted({qubit // k for qubit in qubits})
+    out = np.empty((len(amps), num_qubits, len(axes)))
+    rows = max(1, max_bytes // (16 * (amps.shape[1] + (1 << 2 * k))))
+    for start in range(0, len(amps), rows):
+        chunk = amps[start:start + rows]
+        for group in groups:
+            first = group * k
+            size = min(k, num_qubits - first)
+            rho = reduced_density_matrices(chunk, first, size)
+            out[start:start + len(chunk), first:first + size] = _group_expectations(rho, axes)
+    out = out[:, qubits]
+
+    if exact_near is not None:
+        for row in _flagged_rows(out, exact_near):
+            out[row] = exact_expectations(amps[row], qubits, axes)
+    return out.reshape(lead + (len(qubits), len(axes)))
+
+
+def _flagged_rows(exps: np.ndarray, exact_near, start: int = 0) -> list:
+    # halve the batch until each flagged state is found, so a batch with no
+    # flagged state costs a single call
+    if not exact_near(exps):
+        return []
+    if len(exps) == 1:
+        return [start]
+    half = len(exps) // 2
+    return (_flagged_rows(exps[:half], exact_near, start)
+            + _flagged_rows(exps[half:], exact_near, start + half))
+
+
+BYTE_MARGIN = 1e-9  # far above the ~1e-15 differences between simulation methods
+
+
+def near_byte_edge(exps, margin: float = BYTE_MARGIN) -> bool:
+    """True if int((v + 1) / 2 * 255) could change for any v under a rounding-level change."""
+    scaled = (np.asarray(exps) + 1) / 2 * 255
+    nearest = np.round(scaled)
+    # int() truncates towards zero, so values around 0 land on 0 either way
+    return bool(((np.abs(scaled - nearest) < margin) & (nearest != 0)).any())
+
+# Largest expectation error of a complex64 evolution (qsim.circuit's
+# dtype=np.complex64) kept as rounding-level: about 10x the worst seen on the
+# 16- and 20-qubit hash circuits (~2e-6). The error grows with circuit depth,
+# so engines whose depth grows with the input cap the input they evolve in
+# complex64.
+SINGLE_TOLERANCE = 2e-5
+SINGLE_BYTE_MARGIN = SINGLE_TOLERANCE * 255 / 2
@@ -0,0 +1,192 @@
+# Stabilizer-tableau simulation for Clifford circuits
+#
+# A circuit made only of Clifford gates (H, S, CX, CZ, Paulis, rotations by
+# multiples of pi/2, ...) maps Pauli operators to Pauli operators, so its state
+# is described by n stabilizer and n destabilizer Pauli strings and every gate
+# costs O(n) instead of O(2^n) (Aaronson & Gottesman, quant-ph/0406196).
+#
+# Gates are not matched by name: any one- or two-qubit matrix is conjugated
+# against each local Pauli once, and when every image is a Pauli with a phase
+# of 1, i, -1 or -i the gate is Clifford and that image table is what updates
+# the tableau. Single-qubit <X>, <Y>, <Z> of a stabilizer state are exactly 0
+# or +-1; Statevector gives the same values up to ~1e-15 of rounding noise.
+
+import functools
+import itertools
+import numpy as np
+from qiskit.quantum_info import Operator
+
+from qsim.circuit import flatten
+
+CLIFFORD_TOLERANCE = 1e-9  # matrix entries like cos(pi / 2) are only zero up to rounding
+AXIS_BITS = {"X": (1, 0, 0), "Y": (1, 1, 1), "Z": (0, 1, 0)}  # (x, z, phase): Y = i X Z
+
+_PAULI_FACTORS = [np.array([[1, 0], [0, 1]]), np.array([[0, 1], [1, 0]]),
+                  np.array([[1, 0], [0, -1]]), np.array([[0, -1], [1, 0]])]  # X^x Z^z by x + 2z
+
+
+def _pauli(index: int, k: int) -> np.ndarray:
+    # X^x Z^z on k qubits, bit j of index is x_j and bit k + j is z_j (qubit 0 least significant)
+    matrix = np.ones((1, 1))
+    for j in range(k):
+        matrix = np.kron(_PAULI_FACTORS[(index >> j & 1) + 2 * (index >> (k + j) & 1)], matrix)
+    return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def _clifford_table(key: bytes, k: int):
+    matrix = np.frombuffer(key, dtype=complex).reshape(2 ** k, 2 ** k)
+    paulis = [_pauli(index, k) for index in range(4 ** k)]
+    images = np.zeros((4 ** k, 2 * k), dtype=np.uint8)
+    phases = np.zeros(4 ** k, dtype=np.uint8)
+    for index, pauli in enumerate(paulis):
+        image = matrix @ pauli @ matrix.conj().T
+        for candidate, other in enumerate(paulis):
+            coefficient = np.vdot(other, image) / 2 ** k  # Paulis are orthogonal, trace norm 2^k
+            if abs(coefficient) > 0.5:
+                break
+        phase = int(round(np.angle(coefficient) / (np.pi / 2))) % 4
+        if not np.allclose(image, 1j ** phase * other, rtol=0, atol=CLIFFORD_TOLERANCE):
+            return None
+        images[index] = [candidate >> j & 1 for j in range(2 * k)]
+        phases[index] = phase
+    return images, phases
+
+
+def clifford_table(matrix: np.ndarray):
+    """How a one- or two-qubit gate maps the local Paulis, or None if it is not Clifford.
+
+    Returns (images, phases): for the local Pauli X^x Z^z with index
+    sum(x_j 2^j + z_j 2^(k+j)), U P U^dagger = i^phases[index] X^x' Z^z'
+    where images[index] holds the bits x'_0..x'_k-1, z'_0..z'_k-1.
+    """
+    matrix = np.asarray(matrix, dtype=complex)
+    k = matrix.shape[0].bit_length() - 1
+    if k not in (1, 2):
+        return None
+    # rounding the key lets ry(pi) built from floats share one table
+    key = np.round(matrix, 12).tobytes()
+    return _clifford_table(key, k)
+
+
+def non_clifford_gates(qc) -> list:
+    """(name, qubits) of every instruction of qc that is not Clifford.
+
+    An empty list means the circuit is efficiently simulable classically
+    with a StabilizerState, whatever its size. Parameterized gates count as
+    non-Clifford, since their values are not known.
+    """
+    positions = {qubit: i for i, qubit in enumerate(qc.qubits)}
+    found = []
+    for instruction in qc.data:
+        op = instruction.operation
+        qargs = [positions[q] for q in instruction.qubits]
+        if op.name == "barrier":
+            continue
+        try:
+            if op.is_parameterized():
+                raise ValueError(op.name)
+            matrix = Operator._instruction_to_matrix(op)
+            gates = [("fixed", matrix, qargs)] if matrix is not None else flatten(op.definition)
+            if any(kind == "param" or clifford_table(payload) is None
+                   for kind, payload, _ in gates if kind != "phase"):
+                raise ValueError(op.name)
+        except (ValueError, AttributeError):
+            found.append((op.name, qargs))
+    return found
+
+
+def is_clifford(qc) -> bool:
+    return not non_clifford_gates(qc)
+
+
+class StabilizerState:
+    """An n-qubit |0...0> stabilizer state as a tableau of 2n Pauli rows.
+
+    Rows 0..n-1 are destabilizers and rows n..2n-1 stabilizers; row r is
+    i^phase[r] * prod_j X_j^x[r, j] Z_j^z[r, j].
+    """
+
+    def __init__(self, num_qubits: int):
+        self.num_qubits = num_qubits
+        self.x = np.zeros((2 * num_qubits, num_qubits), dtype=np.uint8)
+        self.z = np.zeros_like(self.x)
+        self.phase = np.zeros(2 * num_qubits, dtype=np.int64)
+        self.x[:num_qubits] = np.eye(num_qubits, dtype=np.uint8)
+        self.z[num_qubits:] = np.eye(num_qubits, dtype=np.uint8)
+
+    def apply(self, matrix: np.ndarray, qubits: list) -> None:
+        """A one- or two-qubit Clifford gate in Qiskit's little-endian matrix convention."""
+        table = clifford_table(matrix)
+        if table is None:
+            raise ValueError(f"Gate on qubits {qubits} is not Clifford")
+        self.apply_table(table, qubits)
+
+    def apply_table(self, table: tuple, qubits) -> None:
+        """Apply a clifford_table to qubits, or to each row of an (m, k) array of disjoint qubits."""
+        images, phases = table
+        k = images.shape[1] // 2
+        qubits = np.asarray(qubits).reshape(-1, k)
+        local = np.concatenate([self.x[:, qubits], self.z[:, qubits]], axis=2)  # (2n, m, 2k)
+        index = local @ (1 << np.arange(2 * k))
+        self.x[:, qubits] = images[index, :k]
+        self.z[:, qubits] = images[index, k:]
+        self.phase = (self.phase + phases[index].sum(axis=1)) % 4
+
+    def expectations(self, qubits=None, axes: str = "ZX") -> np.ndarray:
+        """<P> on each qubit for each P in axes, shaped like qsim.readout.pauli_expectations."""
+        qubits = list(range(self.num_qubits) if qubits is None else qubits)
+        if any(axis not in AXIS_BITS for axis in axes):
+            raise ValueError(f"axes must be drawn from 'XYZ', got {axes!r}")
+        n = self.num_qubits
+        out = np.empty((len(qubits), len(axes)))
+        for (row, qubit), (col, axis) in itertools.product(enumerate(qubits), enumerate(axes)):
+            px, pz, p_phase = AXIS_BITS[axis]
+            anticommutes = (self.x[:, qubit] * pz + self.z[:, qubit] * px) % 2
+            if anticommutes[n:].any():
+                out[row, col] = 0.0
+                continue
+            # P is +-1 times the product of the stabilizers whose destabilizers anticommute with it
+            phase, z = 0, np.zeros(n, dtype=np.uint8)
+            for r in np.flatnonzero(anticommutes[:n]) + n:
+                # (X^x Z^z)(X^x' Z^z') = (-1)^(z . x') X^(x + x') Z^(z + z')
+                phase += int(self.phase[r]) + 2 * np.count_nonzero(z & self.x[r])
+                z = z ^ self.z[r]
+            out[row, col] = 1.0 if (phase - p_phase) % 4 == 0 else -1.0
+        return out
+
+
+class CliffordCircuit:
+    """A Clifford circuit's gate list compiled to Pauli image tables once.
+
+    Consecutive copies of one gate on disjoint qubits (a layer of H, a brick
+    of CX) are applied as a single tableau update. Raises ValueError naming
+    the first gate that is not Clifford; non_clifford_gates lists them all.
+    """
+
+    def __init__(self, qc):
+        self.num_qubits = qc.num_qubits
+        self.gates = []  # (table, (m, k) array of qubits)
+        table_of_layer, layer, used = None, [], set()
+        for kind, payload, qargs in flatten(qc):
+            if kind == "phase" or not qargs:
+                continue  # global phases do not change any expectation value
+            table = clifford_table(payload) if kind == "fixed" else None
+            if table is None:
+                name = payload.name if kind == "param" else f"{len(qargs)}-qubit gate"
+                raise ValueError(f"Not a Clifford circuit: {name} on qubits {qargs}")
+            if table is not table_of_layer or used.intersection(qargs):
+                if layer:
+                    self.gates.append((table_of_layer, np.array(layer)))
+                table_of_layer, layer, used = table, [], set()
+            layer.append(qargs)
+            used.update(qargs)
+        if layer:
+            self.gates.append((table_of_layer, np.array(layer)))
+
+    def run(self, state: StabilizerState = None) -> StabilizerState:
+        """Apply the circuit to state (|0...0> by default) and return it."""
+        state = StabilizerState(self.num_qubits) if state is None else state
+        for table, qubits in self.gates:
+            state.apply_table(table, qubits)
+        return state
@@ -0,0 +1,138 @@
+# Unit test for the compiled circuit kernels qsim/circuit.py
+
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter, ParameterVector
+from qiskit.circuit.random import random_circuit
+from qiskit.quantum_info import Statevector
+from qsim import deterministic
+from qsim.circuit import affine_gather, compile_circuit, product_state
+
+
+class TestCompiledCircuit(unittest.TestCase):
+
+    def test_fixed_circuits_match_statevector(self):
+        """Random circuits (multi-qubit, controlled and composite gates) evolve bit for bit."""
+        for seed in range(12):
+            qc = random_circuit(7, 6, max_operands=3, seed=seed)
+            qc.remove_final_measurements()
+            np.testing.assert_array_equal(compile_circuit(qc).run(), Statevector.from_instruction(qc).data)
+
+    def test_bound_values_match_assign_parameters(self):
+        """Values are taken in the given parameter order, including low and high qubits."""
+        theta = ParameterVector("theta", 12)
+        qc = QuantumCircuit(12)
+        for i in range(12):
+            qc.ry(theta[i], i)
+        for i in range(11):
+            qc.cx(i, i + 1)
+        for i in range(12):
+            qc.rz(theta[11 - i], i)
+        qc.u(0.3, theta[4], 1.2, 7)
+        order = list(reversed(theta))
+        kernel = compile_circuit(qc, order)
+
+        rng = np.random.default_rng(11)
+        for _ in range(5):
+            values = rng.uniform(0, 2 * np.pi, 12)
+            expected = Statevector.from_instruction(qc.assign_parameters(dict(zip(order, values))))
+            np.testing.assert_array_equal(kernel.run(values), expected.data)
+
+    def test_product_state(self):
+        """Qubit 0 is the least significant bit of the basis index."""
+        rng = np.random.default_rng(4)
+        vectors = rng.normal(size=(5, 2)) + 1j * rng.normal(size=(5, 2))
+        expected = vectors[4]
+        for vector in vectors[3::-1]:
+            expected = np.kron(expected, vector)
+        np.testing.assert_allclose(product_state(vectors), expected, rtol=0, atol=1e-12)
+
+    def test_resume_from_state(self):
+        theta = ParameterVector("theta", 8)
+        qc = QuantumCircuit(4)
+        for layer in range(2):
+            for i in range(4):
+                qc.ry(theta[4 * layer + i], i)
+            for i in range(3):
+                qc.cx(i, i + 1)
+        kernel = compile_circuit(qc)
+        values = np.linspace(0.1, 2.9, 8)
+        head = QuantumCircuit(4)
+        for i in range(4):
+            head.ry(values[i], i)
+        state = Statevector.from_instruction(head).data
+        np.testing.assert_array_equal(kernel.run(values, state, 4), kernel.run(values))
+        with self.assertRaises(ValueError):
+            kernel.run(values, None, 4)
+
+    def test_complex64_run(self):
+        """Single precision keeps the dtype throughout and stays at float32 rounding level."""
+        for seed in range(4):
+            qc = random_circuit(8, 8, max_operands=3, seed=seed)
+            qc.remove_final_measurements()
+            qc.global_phase = 0.7
+            state = compile_circuit(qc).run(dtype=np.complex64)
+            self.assertEqual(state.dtype, np.complex64)
+            np.testing.assert_allclose(state, Statevector.from_instruction(qc).data, rtol=0, atol=1e-5)
+
+    def test_cx_runs_compile_to_one_gather(self):
+        """XOR-affine runs (a CX fan-out, X, SWAP) and a CCX after them give the Statevector amplitudes."""
+        qc = QuantumCircuit(8)
+        qc.h(range(3))
+        for c in range(3):
+            for p in range(3, 8):
+                qc.cx(c, p)
+        qc.x(5)
+        qc.swap(0, 7)
+        qc.ccx(1, 2, 6)
+        qc.cx(6, 1)
+        kernel = compile_circuit(qc)
+        self.assertEqual([op[0] for op in kernel.ops], ["matrix"] * 3 + ["gather"])
+        np.testing.assert_array_equal(kernel.run(), Statevector.from_instruction(qc).data)
+        # bit j of the index picks columns[j]
+        np.testing.assert_array_equal(affine_gather(3, 5, [1, 6, 2]), [5, 4, 3, 2, 7, 6, 1, 0])
+
+    def test_fused_layers(self):
+        """H, ry(pi/4), partial and mixed layers fuse; CX bricks stay one gather."""
+        qc = QuantumCircuit(9)
+        for _ in range(2):
+            qc.h(range(9))
+            for j in range(0, 8, 2):
+                qc.cx(j, j + 1)
+            for j in range(1, 8, 2):
+                qc.cx(j, j + 1)
+            qc.cx(8, 0)
+        qc.ry(np.pi / 4, range(9))
+        qc.sx([0, 3, 4, 5, 8])
+        qc.rx(0.4, 1)
+        qc.s(2)
+        qc.sx(0)
+        fused = compile_circuit(qc, fuse=True)
+        self.assertEqual([op[0] for op in fused.ops], ["layer", "gather", "layer", "gather", "layer", "layer", "matrix"])
+        np.testing.assert_allclose(fused.run(), Statevector(qc).data, rtol=0, atol=1e-14)
+        start = np.random.default_rng(23).normal(size=2 ** 9) + 0j
+        kept = start.copy()
+        np.testing.assert_allclose(fused.run(state=start, dtype=np.complex64), Statevector(start).evolve(qc).data,
+                                   rtol=0, atol=1e-5)
+        np.testing.assert_array_equal(start, kept)
+        # the deterministic engine applies a layer gate by gate, as it did unfused
+        for got, expected in zip(deterministic.run(fused), deterministic.run(compile_circuit(qc))):
+            np.testing.assert_array_equal(got, expected)
+
+    def test_rejects_unbound_and_wrong_length(self):
+        a, b = Parameter("a"), Parameter("b")
+        qc = QuantumCircuit(1)
+        qc.rx(a, 0)
+        qc.ry(b, 0)
+        with self.assertRaises(ValueError):
+            compile_circuit(qc, [a])
+        with self.assertRaises(ValueError):
+            compile_circuit(qc).run([0.1])
+        qc.rz(2 * a, 0)
+        with self.assertRaises(ValueError):
+            compile_circuit(qc)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+# Unit test for the coin-circuit kernels qsim/coin_walk.py
+
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+from qsim import coin_walk
+
+
+def reference_state(bits):
+    qc = QuantumCircuit(coin_walk.TOTAL_QUBITS)
+    for start in range(0, len(bits), 2):
+        qc.compose(coin_walk.chunk_circuit(bits[start:start + 2]), inplace=True)
+    qc.compose(coin_walk.tail_circuit(), inplace=True)
+    return Statevector.from_instruction(qc).data
+
+
+class TestCoinWalk(unittest.TestCase):
+
+    def test_matches_statevector(self):
+        """Streaming through the cached kernels gives the whole circuit's state."""
+        for bits in ("0110", "11100", ""):
+            np.testing.assert_allclose(coin_walk.run(bits), reference_state(bits), rtol=0, atol=1e-12)
+        self.assertLessEqual(coin_walk.chunk_kernel.cache_info().currsize, 6)  # '00'..'11', '0', '1'
+        self.assertEqual([op[0] for op in coin_walk.chunk_kernel('01').ops], ["layer", "gather"])
+
+    def test_complex64(self):
+        state = coin_walk.run("1001", dtype=np.complex64)
+        self.assertEqual(state.dtype, np.complex64)
+        np.testing.assert_allclose(state, coin_walk.run("1001"), rtol=0, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
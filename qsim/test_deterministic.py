@@ -0,0 +1,114 @@
+# Unit and stress tests for the deterministic engines qsim/deterministic.py
+
+import os
+import subprocess
+import sys
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
+from qiskit.circuit.random import random_circuit
+from qiskit.quantum_info import Statevector
+from qsim import deterministic
+from qsim.circuit import compile_circuit
+from qsim.readout import pauli_expectations
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Hashes a fixed corpus with the deterministic walk (batched) and qhash engines
+# and prints the digests as hex.
+CORPUS_SCRIPT = """
+import sys
+import numpy as np
+sys.path[:0] = [{root!r}, {solution!r}]
+import qhash
+from main import hash_many
+
+rng = np.random.default_rng(17)
+walk = hash_many(rng.integers(0, 256, (48, 32), dtype=np.uint8), deterministic=True)
+digests = [qhash.qhash(bytes(x), engine="deterministic") for x in rng.integers(0, 256, (3, 32), dtype=np.uint8)]
+print(walk.tobytes().hex() + b"".join(digests).hex())
+"""
+
+
+def dispatched_cpu_features() -> str:
+    """The run-time SIMD targets NumPy would dispatch to on this CPU, or None if unknown."""
+    # a private module: numpy._core from NumPy 2, numpy.core before
+    try:
+        from numpy._core._multiarray_umath import __cpu_dispatch__, __cpu_features__
+    except ImportError:
+        try:
+            from numpy.core._multiarray_umath import __cpu_dispatch__, __cpu_features__
+        except ImportError:
+            return None
+    return " ".join(f for f in __cpu_dispatch__ if __cpu_features__.get(f))
+
+
+class TestDeterministic(unittest.TestCase):
+
+    def test_tree_sum(self):
+        rows = np.random.default_rng(1).normal(size=(3, 37))
+        np.testing.assert_allclose(deterministic.tree_sum(rows), rows.sum(axis=1), rtol=1e-13)
+        self.assertEqual(deterministic.tree_sum(np.zeros((2, 0))).tolist(), [0.0, 0.0])
+        # the same tree for each row of a batch and for the row alone
+        self.assertEqual(deterministic.tree_sum(rows)[1], deterministic.tree_sum(rows[1:2])[0])
+
+    def test_matches_statevector(self):
+        qc = random_circuit(6, 6, max_operands=1, seed=3)
+        qc.remove_final_measurements()
+        qc.cx(0, 3)
+        qc.swap(1, 5)
+        qc.global_phase = 0.4
+        re, im = deterministic.run(compile_circuit(qc))
+        np.testing.assert_allclose(re[0] + 1j * im[0], Statevector(qc).data, rtol=0, atol=1e-14)
+        expected = pauli_expectations(Statevector(qc).data, [0, 4, 2], "XYZ")
+        np.testing.assert_allclose(deterministic.expectations(re, im, [0, 4, 2], "XYZ")[0], expected,
+                                   rtol=0, atol=1e-14)
+
+    def test_batch_size_does_not_matter(self):
+        qc = random_circuit(5, 5, max_operands=1, seed=4)
+        qc.remove_final_measurements()
+        theta = ParameterVector("theta", 5)
+        for i in range(5):
+            qc.ry(theta[i], i)
+            qc.cx(i, (i + 1) % 5)
+        kernel = compile_circuit(qc)
+        values = np.random.default_rng(5).uniform(0, 2 * np.pi, (9, 5))
+        re, im = deterministic.run(kernel, values)
+        batch = deterministic.expectations(re, im, range(5), "ZX")
+        for row in range(9):
+            re1, im1 = deterministic.run(kernel, values[row])
+            np.testing.assert_array_equal(deterministic.expectations(re1, im1, range(5), "ZX")[0], batch[row])
+
+    def test_rejects_multi_qubit_matrices(self):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.cz(0, 1)
+        qc.cry(0.3, 0, 1)
+        with self.assertRaises(ValueError):
+            deterministic.run(compile_circuit(qc))
+
+    def test_digests_across_parallel_configurations(self):
+        """The same corpus hashes to the same bytes for any thread count and SIMD target."""
+        script = CORPUS_SCRIPT.format(root=REPO_ROOT, solution=os.path.join(REPO_ROOT, "solution"))
+        threads = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "RAYON_NUM_THREADS")
+        features = dispatched_cpu_features()
+        if features is None:
+            self.skipTest("this NumPy does not list its SIMD dispatch targets")
+        configurations = [
+            {},
+            {name: "1" for name in threads},
+            {name: "4" for name in threads},
+            {"NPY_DISABLE_CPU_FEATURES": features, "QISKIT_IN_PARALLEL": "TRUE"},
+        ]
+        outputs = set()
+        for extra in configurations:
+            env = dict(os.environ, **extra)
+            result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True,
+                                    text=True, check=True)
+            outputs.add(result.stdout.strip())
+        self.assertEqual(len(outputs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
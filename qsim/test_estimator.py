@@ -0,0 +1,33 @@
+# Unit test for the batched Estimator readout qsim/estimator.py
+
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
+from qiskit.quantum_info import Statevector
+from qsim.estimator import batch_expectations
+from qsim.readout import pauli_expectations
+
+
+class TestBatchExpectations(unittest.TestCase):
+
+    def test_matches_statevector(self):
+        theta = ParameterVector("theta", 10)
+        qc = QuantumCircuit(5)
+        for i in range(5):
+            qc.ry(theta[i], i)
+            qc.rz(theta[5 + i], i)
+        for i in range(4):
+            qc.cx(i, i + 1)
+        values = np.random.default_rng(5).uniform(0, 2 * np.pi, (4, 10))
+        qubits = [4, 0, 2]
+        batch = batch_expectations(qc, values, qubits, "ZXY")
+        self.assertEqual(batch.shape, (4, 3, 3))
+        for row, exps in zip(values, batch):
+            expected = pauli_expectations(Statevector(qc.assign_parameters(row)).data, qubits, "ZXY")
+            np.testing.assert_allclose(exps, expected, rtol=0, atol=1e-12)
+        self.assertEqual(batch_expectations(qc, np.empty((0, 10)), qubits, "Z").shape, (0, 3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# Unit test for the matrix-product-state engine qsim/mps.py
+
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
+from qiskit.circuit.random import random_circuit
+from qiskit.quantum_info import Statevector
+from qsim.mps import MPS, MPSCircuit
+from qsim.readout import pauli_expectations
+
+
+def chain_circuit(num_qubits, layers, ring=False):
+    theta = ParameterVector("theta", 2 * num_qubits * layers)
+    qc = QuantumCircuit(num_qubits)
+    for layer in range(layers):
+        for i in range(num_qubits):
+            qc.ry(theta[2 * num_qubits * layer + i], i)
+            qc.rz(theta[2 * num_qubits * layer + num_qubits + i], i)
+        for i in range(num_qubits - 1 + ring):
+            qc.cx(i, (i + 1) % num_qubits)
+    return qc
+
+
+class TestMPS(unittest.TestCase):
+
+    def test_matches_statevector(self):
+        """Random one- and two-qubit circuits, including non-adjacent gates, read the same."""
+        for seed in range(8):
+            qc = random_circuit(6, 6, max_operands=2, seed=seed)
+            qc.remove_final_measurements()
+            mps = MPSCircuit(qc).run()
+            expected = pauli_expectations(Statevector(qc).data, axes="XYZ")
+            np.testing.assert_allclose(mps.expectations(axes="XYZ"), expected, rtol=0, atol=1e-12)
+            self.assertTrue(mps.is_exact())
+
+    def test_chain_bond_and_values(self):
+        qc = chain_circuit(10, 2)
+        compiled = MPSCircuit(qc)
+        values = np.random.default_rng(13).uniform(0, 2 * np.pi, qc.num_parameters)
+        mps = compiled.run(values)
+        self.assertLessEqual(max(mps.bond_dims), 4)
+        self.assertTrue(compiled.fits(4))
+        expected = pauli_expectations(Statevector(qc.assign_parameters(values)).data, axes="ZX")
+        np.testing.assert_allclose(mps.expectations(axes="ZX"), expected, rtol=0, atol=1e-12)
+
+    def test_truncation_is_reported(self):
+        qc = chain_circuit(8, 4, ring=True)
+        compiled = MPSCircuit(qc)
+        self.assertFalse(compiled.fits(2))
+        values = np.random.default_rng(14).uniform(0, 2 * np.pi, qc.num_parameters)
+        self.assertFalse(compiled.run(values, max_bond=2).is_exact())
+        self.assertTrue(compiled.run(values, max_bond=16).is_exact())
+
+    def test_rejects_wide_gates(self):
+        qc = QuantumCircuit(3)
+        qc.ccx(0, 1, 2)
+        with self.assertRaises(ValueError):
+            MPSCircuit(qc)
+        with self.assertRaises(ValueError):
+            MPS(3).apply(np.eye(8), [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
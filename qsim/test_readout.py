@@ -0,0 +1,71 @@
+# Unit test for the all-qubit Pauli readout qsim/readout.py
+
+import unittest
+from unittest import mock
+import numpy as np
+from qiskit.quantum_info import Pauli, Statevector
+from qsim import readout
+from qsim.readout import exact_expectations, label_qubits, pauli_expectations
+
+
+def random_state(rng, num_qubits, batch=()):
+    shape = batch + (2 ** num_qubits,)
+    state = rng.normal(size=shape) + 1j * rng.normal(size=shape)
+    return state / np.linalg.norm(state, axis=-1, keepdims=True)
+
+
+def qiskit_readout(state, axes):
+    sv = Statevector(state)
+    n = sv.num_qubits
+    return np.array([[sv.expectation_value(Pauli("I" * i + a + "I" * (n - i - 1))).real for a in axes]
+                     for i in range(n)])
+
+
+class TestPauliReadout(unittest.TestCase):
+
+    def test_matches_qiskit(self):
+        """Fused values are Statevector's up to rounding, exact_near ones to the bit."""
+        rng = np.random.default_rng(9)
+        for n in (1, 3, 5, 11):
+            state = random_state(rng, n)
+            expected = qiskit_readout(state, "ZXY")
+            np.testing.assert_allclose(pauli_expectations(state, label_qubits(n), "ZXY"), expected,
+                                       rtol=0, atol=1e-14)
+            np.testing.assert_array_equal(exact_expectations(state, label_qubits(n), "ZXY"), expected)
+            exact = pauli_expectations(state, label_qubits(n), "ZXY", exact_near=lambda exps: True)
+            np.testing.assert_array_equal(exact, expected)
+
+    def test_exact_near_rereads_flagged_states(self):
+        rng = np.random.default_rng(9)
+        states = random_state(rng, 6, (5,))
+        fused = pauli_expectations(states, axes="ZX")
+        flagged = fused[2]
+        with mock.patch.object(readout, "exact_expectations", wraps=exact_expectations) as exact:
+            out = pauli_expectations(states, axes="ZX", exact_near=lambda exps: bool((exps == flagged).all(axis=(-2, -1)).any()))
+        self.assertEqual(exact.call_count, 1)
+        np.testing.assert_array_equal(out[2], qiskit_readout(states[2], "ZX")[::-1])
+        np.testing.assert_array_equal(np.delete(out, 2, axis=0), np.delete(fused, 2, axis=0))
+
+    def test_batch_matches_single_states(self):
+        rng = np.random.default_rng(9)
+        states = random_state(rng, 5, (4, 3))
+        batch = pauli_expectations(states, axes="XYZ")
+        self.assertEqual(batch.shape, (4, 3, 5, 3))
+        for index in np.ndindex(4, 3):
+            np.testing.assert_array_equal(batch[index], pauli_expectations(states[index], axes="XYZ"))
+
+    def test_basis_state_edges(self):
+        """|1> on qubit 0 of |0...0>: exactly -1 for Z there and +1 elsewhere, 0 for X."""
+        state = np.zeros(16, dtype=complex)
+        state[1] = 1
+        exps = pauli_expectations(state, axes="ZX")
+        np.testing.assert_array_equal(exps[:, 0], [-1, 1, 1, 1])
+        np.testing.assert_array_equal(exps[:, 1], [0, 0, 0, 0])
+
+    def test_bad_axis(self):
+        with self.assertRaises(ValueError):
+            pauli_expectations(np.ones(4, dtype=complex) / 2, axes="ZQ")
+
+
+if __name__ == "__main__":
+    unittest.main()
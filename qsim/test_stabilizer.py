@@ -0,0 +1,77 @@
+# Unit test for the stabilizer-tableau engine qsim/stabilizer.py
+
+import unittest
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit.quantum_info import Statevector, random_clifford
+from qsim.readout import pauli_expectations
+from qsim.stabilizer import CliffordCircuit, StabilizerState, is_clifford, non_clifford_gates
+
+
+def ring_blocks(num_qubits, bits, steps):
+    """Blocks shaped like qhash2's: ry(pi) per set bit, then H layers and a CX ring."""
+    qc = QuantumCircuit(num_qubits)
+    for chunk in np.asarray(bits).reshape(-1, num_qubits):
+        for j in np.flatnonzero(chunk):
+            qc.ry(np.pi, j)
+        for _ in range(steps):
+            qc.h(range(num_qubits))
+            for j in range(0, num_qubits - 1, 2):
+                qc.cx(j, j + 1)
+            for j in range(1, num_qubits - 1, 2):
+                qc.cx(j, j + 1)
+            qc.cx(num_qubits - 1, 0)
+    return qc
+
+
+class TestStabilizer(unittest.TestCase):
+
+    def test_random_cliffords_match_statevector(self):
+        for seed in range(10):
+            qc = random_clifford(6, seed=seed).to_circuit()
+            expected = pauli_expectations(Statevector(qc).data, axes="XYZ")
+            np.testing.assert_allclose(CliffordCircuit(qc).run().expectations(axes="XYZ"), expected,
+                                       rtol=0, atol=1e-12)
+
+    def test_ring_blocks_match_statevector(self):
+        bits = np.random.default_rng(22).integers(0, 2, 3 * 8)
+        qc = ring_blocks(8, bits, 5)
+        compiled = CliffordCircuit(qc)
+        # an H layer and each CX brick (the ring CX joins the odd one) are one update each
+        self.assertEqual(len(compiled.gates), 3 * (1 + 5 * 3))
+        expected = pauli_expectations(Statevector(qc).data, [3, 0, 7], "XYZ")
+        np.testing.assert_allclose(compiled.run().expectations([3, 0, 7], "XYZ"), expected, rtol=0, atol=1e-12)
+
+    def test_apply_gate_by_gate(self):
+        qc = QuantumCircuit(3)
+        qc.h(0)
+        qc.s(0)
+        qc.cz(0, 2)
+        qc.swap(1, 2)
+        qc.sx(1)
+        state = StabilizerState(3)
+        for instruction in qc.data:
+            state.apply(instruction.operation.to_matrix(), [qc.find_bit(q).index for q in instruction.qubits])
+        expected = pauli_expectations(Statevector(qc).data, axes="XYZ")
+        np.testing.assert_allclose(state.expectations(axes="XYZ"), expected, rtol=0, atol=1e-12)
+
+    def test_detector(self):
+        qc = QuantumCircuit(3)
+        qc.h(0)
+        qc.ry(np.pi / 2, 1)
+        qc.cx(0, 2)
+        self.assertTrue(is_clifford(qc))
+        qc.t(1)
+        qc.ccx(0, 1, 2)
+        qc.rz(Parameter("theta"), 0)
+        qc.rx(0.3, 2)
+        self.assertEqual(non_clifford_gates(qc), [("t", [1]), ("ccx", [0, 1, 2]), ("rz", [0]), ("rx", [2])])
+        with self.assertRaises(ValueError):
+            CliffordCircuit(qc)
+        with self.assertRaises(ValueError):
+            StabilizerState(1).apply(np.diag([1, np.exp(0.25j * np.pi)]), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,14 @@ import math
 from qiskit import QuantumCircuit
 from qiskit.circuit import Parameter
 from qiskit.quantum_info import Statevector
-from qiskit.quantum_info.operators import Pauli
 from qiskit_aer import Aer
 import struct
 import hashlib
+import functools
+import numpy as np
+
+from qsim.circuit import compile_circuit
+from qsim.readout import SINGLE_BYTE_MARGIN, label_qubits, near_byte_edge, pauli_expectations
 
 NUM_QUBITS = 20 # Increased number of qubits
 NUM_LAYERS = 8
@@ -44,6 +48,8 @@ for l in range(NUM_LAYERS):
 
 num_params = len(params)
 
+DEFAULT_ENGINE = "qiskit"
+
 def preprocess_input(data: bytes) -> bytes:
     target_size = 32
     input_size = len(data)
@@ -66,16 +72,50 @@ def preprocess_input(data: bytes) -> bytes:
                 reduced_data[j] ^= chunk_bytes[j]
         return bytes(reduced_data)
 
+def _expectations_qiskit(values: list):
+    # bind the parameters to the circuit.
+    bound_qc = qc_param.assign_parameters(dict(zip(params, values)))
+
+    # prepare the state vector from the bound circuit
+    sv = Statevector.from_instruction(bound_qc)
+    # calculate the qubit expectations on the Z and X axes
+    return pauli_expectations(sv, label_qubits(NUM_QUBITS), "ZX", exact_near=near_byte_edge)
+
+
+# complex64 engine: the circuit compiled once (a few seconds, on first use) and
+# the 2^20 amplitudes evolved in single precision, half the memory and about
+# twice as fast. Inputs with a value near a byte edge are redone in float64.
+@functools.lru_cache(maxsize=None)
+def compiled_circuit():
+    return compile_circuit(qc_param, params)
+
+
+def _expectations_complex64(values: list):
+    state = compiled_circuit().run(values, dtype=np.complex64)
+    exps = pauli_expectations(state.astype(complex), label_qubits(NUM_QUBITS), "ZX")
+    if near_byte_edge(exps, SINGLE_BYTE_MARGIN):
+        return _expectations_qiskit(values)
+    return exps
+
+
+ENGINES = {
+    "qiskit": _expectations_qiskit,
+    "complex64": _expectations_complex64,
+}
+
+
 # Quantum simulation portion of the qhash
 # x - byte array
 # returns the hash value as a byte array with the same size as input
-def qhash_variable_output_v7(x: bytes) -> bytes:
+def qhash_variable_output_v7(x: bytes, engine: str = DEFAULT_ENGINE) -> bytes:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
     original_input_size = len(x)
     global processed_input
     processed_input = preprocess_input(x)
 
-    # create a dictionary mapping each parameter to its value.
-    param_values = {}
+    # the value of each parameter, in params order.
+    param_values = []
     param_index = 0
     for l in range(NUM_LAYERS):
         for i in range(NUM_QUBITS):
@@ -84,7 +124,7 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
         for i in range(NUM_QUBITS):
             # RZ parameter
@@ -92,7 +132,7 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
         for i in range(NUM_QUBITS):
             # RX parameter
@@ -100,24 +140,11 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
 
-    # bind the parameters to the circuit.
-    bound_qc = qc_param.assign_parameters(param_values)
-
-    # prepare the state vector from the bound circuit
-    sv = Statevector.from_instruction(bound_qc)
-    # calculate the qubit expectations on the Z and X axes
-    expectation_bytes = bytearray()
-    for i in range(NUM_QUBITS):
-        z_op = Pauli("I" * i + "Z" + "I" * (NUM_QUBITS - i - 1))
-        z_val = sv.expectation_value(z_op).real
-        expectation_bytes.append(int((z_val + 1) / 2 * 255))
-
-        x_op = Pauli("I" * i + "X" + "I" * (NUM_QUBITS - i - 1))
-        x_val = sv.expectation_value(x_op).real
-        expectation_bytes.append(int((x_val + 1) / 2 * 255))
+    exps = ENGINES[engine](param_values)
+    expectation_bytes = bytearray(((exps.ravel() + 1) / 2 * 255).astype(int).tolist())
 
     # Resize the output to match the original input size using repetition or truncation
     output = bytearray()
@@ -1,8 +1,10 @@
+import concurrent.futures
 import math
 from qiskit import QuantumCircuit
 from qiskit.circuit import Parameter
 from qiskit.quantum_info import Statevector
-from qiskit.quantum_info.operators import Pauli
+
+from qsim.readout import label_qubits, near_byte_edge, pauli_expectations
 
 NUM_QUBITS = 4
 NUM_LAYERS = 8
@@ -57,7 +59,9 @@ def preprocess_input(data: bytes) -> bytes:
         return bytes(feedback)
 
 def quantum_process_chunk(chunk: bytes, prev_hash: bytes = None) -> bytes:
-    global processed_input
+    # processed_input is local: the module-level global is only read while
+    # qc_param is built at import, and a shared one would let threads hashing
+    # chunks side by side overwrite each other's input
     if prev_hash is not None:
         mixed_chunk = bytearray()
         min_len = min(len(chunk), len(prev_hash))
@@ -100,29 +104,12 @@ def quantum_process_chunk(chunk: bytes, prev_hash: bytes = None) -> bytes:
     bound_qc = qc_param.assign_parameters(param_values)
     sv = Statevector.from_instruction(bound_qc)
 
-    expectation_bytes = bytearray()
-    for i in range(NUM_QUBITS):
-        for axis in "ZXY":
-            op = Pauli("I" * i + axis + "I" * (NUM_QUBITS - i - 1))
-            val = sv.expectation_value(op).real
-            expectation_bytes.append(int((val + 1) / 2 * 255))
+    exps = pauli_expectations(sv, label_qubits(NUM_QUBITS), "ZXY", exact_near=near_byte_edge)
+    expectation_bytes = bytearray(((exps.ravel() + 1) / 2 * 255).astype(int).tolist())
 
     return bytes(expectation_bytes)
 
-def qhash_variable_output_v8(x: bytes) -> bytes:
-    original_input_size = len(x)
-    if len(x) <= CHUNK_SIZE:
-        hash_result = quantum_process_chunk(preprocess_input(x))
-    else:
-        chunks = [x[i:i+CHUNK_SIZE] for i in range(0, len(x), CHUNK_SIZE)]
-        current_hash = None
-        for i, chunk in enumerate(chunks):
-            processed_chunk = preprocess_input(chunk)
-            if i % 2 == 1:
-                processed_chunk = processed_chunk[::-1]
-            current_hash = quantum_process_chunk(processed_chunk, current_hash)
-        hash_result = current_hash
-
+def _expand_output(hash_result: bytes, original_input_size: int) -> bytes:
     output = bytearray()
     if len(hash_result) >= original_input_size:
         output = hash_result[:original_input_size]
@@ -138,6 +125,63 @@ def qhash_variable_output_v8(x: bytes) -> bytes:
 
     return bytes(output)
 
+def qhash_variable_output_v8(x: bytes) -> bytes:
+    original_input_size = len(x)
+    if len(x) <= CHUNK_SIZE:
+        hash_result = quantum_process_chunk(preprocess_input(x))
+    else:
+        chunks = [x[i:i+CHUNK_SIZE] for i in range(0, len(x), CHUNK_SIZE)]
+        current_hash = None
+        for i, chunk in enumerate(chunks):
+            processed_chunk = preprocess_input(chunk)
+            if i % 2 == 1:
+                processed_chunk = processed_chunk[::-1]
+            current_hash = quantum_process_chunk(processed_chunk, current_hash)
+        hash_result = current_hash
+
+    return _expand_output(hash_result, original_input_size)
+
+# --- tree mode ---------------------------------------------------------------
+# The chained v8 hash waits on each chunk's hash before the next. Tree mode is
+# a different hash, tagged with TREE_VERSION: every preprocessed chunk is an
+# independent leaf, then concatenated pairs are hashed level by level up to a
+# root (an odd node out moves up unchanged), all with quantum_process_chunk.
+# Each level is spread over a process pool, so the depth is O(log n). The root
+# is hashed once more with the version and the input length.
+
+TREE_VERSION = 1
+TREE_TASKS_PER_LEVEL = 64  # a level is sent to the pool in about this many batches
+
+def _tree_leaf(chunk: bytes) -> bytes:
+    return quantum_process_chunk(preprocess_input(chunk))
+
+def _tree_node(pair: tuple) -> bytes:
+    return quantum_process_chunk(pair[0] + pair[1])
+
+def qhash_tree_v8(x: bytes, processes: int = None, executor=None) -> bytes:
+    """Tree-mode hash of x, len(x) bytes long like qhash_variable_output_v8.
+
+    Levels run on executor (any concurrent.futures executor) if given, else on
+    a process pool of `processes` workers made for this call; processes=1
+    hashes in this process. The digest does not depend on any of these.
+    """
+    chunks = [bytes(x[i:i + CHUNK_SIZE]) for i in range(0, len(x), CHUNK_SIZE)] or [b""]
+    if executor is None and processes != 1 and len(chunks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            return qhash_tree_v8(x, executor=pool)
+
+    def run_level(fn, items):
+        if executor is None:
+            return list(map(fn, items))
+        return list(executor.map(fn, items, chunksize=max(1, len(items) // TREE_TASKS_PER_LEVEL)))
+
+    nodes = run_level(_tree_leaf, chunks)
+    while len(nodes) > 1:
+        parents = run_level(_tree_node, list(zip(nodes[0::2], nodes[1::2])))
+        nodes = parents + nodes[len(nodes) - len(nodes) % 2:]
+    header = bytes([TREE_VERSION]) + len(x).to_bytes(8, byteorder='big')
+    return _expand_output(quantum_process_chunk(header + nodes[0]), len(x))
+
 # Testing
 if __name__ == "__main__":
     print("===== Quantum Hash Generator (Variable Output Size - v8, No SHA) =====")
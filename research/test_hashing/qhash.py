@@ -6,30 +6,30 @@ from qiskit.quantum_info.operators import Pauli
 from qiskit_aer import Aer
 import numpy as np
 
+from qsim import coin_walk
+
 
 
 TOTAL_QUBITS = 20
 COIN_QUBITS = list(range(4))        # 4 qubits for coin control
 POSITION_QUBITS = list(range(4, 20))  # 16 qubits for entangled positions
 
-def quantum_hash(input_data):
-    """
-    Quantum hash function with 20 qubits. No classical hash. Pure quantum logic.
-    """
-    # Step 1: Convert to binary if input is text
+
+def to_binary(input_data):
+    """input_data as a string of '0' / '1' bits (text is encoded 8 bits per character)."""
     if not all(bit in '01' for bit in input_data):
         print(f"Converting text to binary...")
-        binary_input = ''.join(format(ord(char), '08b') for char in input_dataa)
+        binary_input = ''.join(format(ord(char), '08b') for char in input_data)
         print(f"Binary representation: {binary_input}")
     else:
         binary_input = input_data
 
     if len(binary_input) < len(COIN_QUBITS) * 2:
         binary_input = binary_input.ljust(len(COIN_QUBITS) * 2, '0')
+    return binary_input
 
-    print(f"Processing {len(binary_input)} bits...")
 
-    # Step 2: Build the circuit
+def build_circuit(binary_input):
     qc = QuantumCircuit(TOTAL_QUBITS)
     chunks = [binary_input[i:i+2] for i in range(0, len(binary_input), 2)]
 
@@ -55,11 +55,51 @@ def quantum_hash(input_data):
     # Step 5: Final Hadamard layer
     for i in range(TOTAL_QUBITS):
         qc.h(i)
+    return qc
+
 
-    # Step 6: Simulate and extract statevector
+def _state_aer(binary_input):
     backend = Aer.get_backend('statevector_simulator')
-    result = backend.run(qc).result()
-    state = result.get_statevector()
+    result = backend.run(build_circuit(binary_input)).result()
+    return np.asarray(result.get_statevector())
+
+
+# --- v2 ----------------------------------------------------------------------
+# Many of quantum_hash's top probabilities tie exactly in theory, and its
+# argsort orders them by Aer's rounding noise, so no other simulator gives its
+# digest. quantum_hash_v2 rounds the probabilities to PROBABILITY_DECIMALS
+# first and ranks them by (-p, index), largest first, so the ranking no longer
+# depends on rounding noise. It can then run on qsim.coin_walk's cached chunk
+# kernels instead of building and simulating the circuit on every call. Its
+# digests differ from quantum_hash's.
+
+PROBABILITY_DECIMALS = 12
+
+
+def digest_v2(state):
+    """The v2 digest of a final statevector: the 8 most probable states, ties by index."""
+    probabilities = np.round(np.abs(state) ** 2, PROBABILITY_DECIMALS)
+    top_indices = np.argsort(-probabilities, kind="stable")[:8]
+    hex_digest = ''.join(format(idx ^ int(probabilities[idx] * 1000), '04x') for idx in top_indices)
+    return hex_digest[:16]
+
+
+def quantum_hash_v2(input_data):
+    """quantum_hash's circuit with a canonical ranking of the top states, run on compiled kernels."""
+    return digest_v2(coin_walk.run(to_binary(input_data)))
+
+
+def quantum_hash(input_data):
+    """
+    Quantum hash function with 20 qubits. No classical hash. Pure quantum logic.
+    """
+    # Step 1: Convert to binary if input is text
+    binary_input = to_binary(input_data)
+
+    print(f"Processing {len(binary_input)} bits...")
+
+    # Steps 2-6: Build the circuit, simulate and extract statevector
+    state = _state_aer(binary_input)
     probabilities = np.abs(state) ** 2
 
     # Step 7: Extract top state indices and map to hex
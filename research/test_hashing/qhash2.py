@@ -1,59 +1,93 @@
+import functools
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister
-from qiskit.quantum_info import Statevector, Pauli
+from qiskit.circuit.library import RYGate
+from qiskit.quantum_info import Statevector
 
-def quantum_hash_iterative_v5(input_bytes):
-    """
-    A purely quantum hash function processing input in 20-bit chunks using Statevector.
-    Input: an array of 2^N bytes (N >= 5).
-    Output: 32 bytes (256 bits).
-    Uses 20 qubits.
-    """
+from qsim.readout import exact_expectations
+from qsim.stabilizer import CliffordCircuit, StabilizerState, clifford_table, non_clifford_gates
+
+N_QUBITS = 20
+NUM_STEPS = 64 # Number of steps in the quantum operation per block
+
+
+def input_chunks(input_bytes):
+    """The input bits zero-padded to whole 20-bit chunks, one row per block."""
     input_bits = np.unpackbits(np.frombuffer(input_bytes, dtype=np.uint8))
     padding_needed = 20 - (len(input_bits) % 20) if len(input_bits) % 20 != 0 else 0
     input_bits = np.pad(input_bits, (0, padding_needed), 'constant')
+    return input_bits.reshape(-1, N_QUBITS)
 
-    n_qubits = 20
+
+def block_circuit(chunk, n_qubits=N_QUBITS, num_steps=NUM_STEPS):
     qr = QuantumRegister(n_qubits, 'q')
+    qc_block = QuantumCircuit(qr)
 
-    current_state = Statevector.from_int(0, dims=2**n_qubits) # Start with |0...0>
+    # Encode input bits as rotations (Ry by pi if bit is 1)
+    for j in range(n_qubits):
+        if chunk[j]:
+            qc_block.ry(np.pi, qr[j])
 
-    num_steps = 64 # Number of steps in the quantum operation per block
+    # Perform a quantum operation
+    for _ in range(num_steps):
+        for j in range(n_qubits):
+            qc_block.h(qr[j])
+        for j in range(0, n_qubits - 1, 2):
+            qc_block.cx(qr[j], qr[j+1])
+        for j in range(1, n_qubits - 1, 2):
+            qc_block.cx(qr[j], qr[j+1])
+        if n_qubits > 1:
+            qc_block.cx(qr[n_qubits - 1], qr[0]) # Wrap around
+    return qc_block
 
-    for i in range(0, len(input_bits), 20):
-        chunk = input_bits[i:i+20]
 
-        qc_block = QuantumCircuit(qr)
+def _expectations_statevector(chunks):
+    current_state = Statevector.from_int(0, dims=2**N_QUBITS) # Start with |0...0>
+    for chunk in chunks:
+        current_state = current_state.evolve(block_circuit(chunk))
 
-        # Encode input bits as rotations (Ry by pi if bit is 1)
-        for j in range(20):
-            if chunk[j]:
-                qc_block.ry(np.pi, qr[j])
+    # After processing all blocks, get expectation values
+    # <X>, <Y>, <Z> of qubit i, for i = 0..19. The state is a stabilizer state,
+    # so most values are exactly 0, the 15.5 quantization tie: the fused
+    # readout would flag every state and fall back here anyway.
+    return exact_expectations(current_state.data, range(N_QUBITS), "XYZ")
 
-        # Perform a quantum operation
-        for _ in range(num_steps):
-            for j in range(n_qubits):
-                qc_block.h(qr[j])
-            for j in range(0, n_qubits - 1, 2):
-                qc_block.cx(qr[j], qr[j+1])
-            for j in range(1, n_qubits - 1, 2):
-                qc_block.cx(qr[j], qr[j+1])
-            if n_qubits > 1:
-                qc_block.cx(qr[n_qubits - 1], qr[0]) # Wrap around
 
-        current_state = current_state.evolve(qc_block)
+# ry(pi), h and cx are all Clifford, so the blocks can run on a stabilizer
+# tableau in O(n) per gate. Its values are exactly 0 or +-1. Statevector's
+# zeros carry ~1e-16 of rounding noise, and (0 + 1) * 31 / 2 = 15.5 is a
+# rounding tie: the v5 digest writes 15 or 16 for a zero depending on the sign
+# of that noise. The tableau cannot reproduce that noise, so it backs a
+# separate hash, quantum_hash_iterative_v6, whose ties always round up.
 
-    # After processing all blocks, get expectation values
-    expectation_values = []
-    for i in range(n_qubits):
-        expectation_values.append(current_state.expectation_value(Pauli("X", i)).real)
-        expectation_values.append(current_state.expectation_value(Pauli("Y", i)).real)
-        expectation_values.append(current_state.expectation_value(Pauli("Z", i)).real)
+RY_PI = clifford_table(RYGate(np.pi).to_matrix())
 
-    # Quantize to 5 bits and concatenate
+
+@functools.lru_cache(maxsize=None)
+def stabilizer_mixing():
+    """The 64 fixed steps of a block (a block with no bits set), compiled once.
+
+    Raises ValueError if a block is not a Clifford circuit.
+    """
+    hard_gates = non_clifford_gates(block_circuit(np.ones(N_QUBITS, dtype=np.uint8)))
+    if hard_gates:
+        raise ValueError(f"Blocks are not Clifford circuits, non-Clifford gates: {hard_gates}")
+    return CliffordCircuit(block_circuit(np.zeros(N_QUBITS, dtype=np.uint8)))
+
+
+def _expectations_stabilizer(chunks):
+    mixing = stabilizer_mixing()
+    state = StabilizerState(N_QUBITS)
+    for chunk in chunks:
+        state.apply_table(RY_PI, np.flatnonzero(chunk))
+        mixing.run(state)
+    return state.expectations(range(N_QUBITS), "XYZ")
+
+
+def _pack_levels(levels):
+    """The 5-bit levels concatenated, first 256 bits as 32 bytes."""
     output_bits = []
-    for value in expectation_values:
-        quantized_value = round((value + 1) * 31 / 2)
+    for quantized_value in levels:
         binary = format(int(quantized_value), '05b')
         output_bits.extend([int(b) for b in binary])
 
@@ -69,7 +103,34 @@ def quantum_hash_iterative_v5(input_bytes):
 
     return bytes(output_bytes)
 
+
+def quantum_hash_iterative_v5(input_bytes):
+    """
+    A purely quantum hash function processing input in 20-bit chunks using Statevector.
+    Input: an array of 2^N bytes (N >= 5).
+    Output: 32 bytes (256 bits).
+    Uses 20 qubits.
+    """
+    expectation_values = _expectations_statevector(input_chunks(input_bytes)).ravel()
+
+    # Quantize to 5 bits and concatenate
+    return _pack_levels(round((value + 1) * 31 / 2) for value in expectation_values)
+
+
+def quantum_hash_iterative_v6(input_bytes):
+    """
+    v5's circuit on a stabilizer tableau: the same blocks, with exact expectation values.
+    A value of 0 (level 15.5) always quantizes to 16, so v6 differs from v5
+    wherever v5's rounding noise wrote 15. About 6 ms per 20-bit block.
+    Output: 32 bytes (256 bits).
+    """
+    expectation_values = _expectations_stabilizer(input_chunks(input_bytes)).ravel()
+    return _pack_levels(np.floor((expectation_values + 1) * 31 / 2 + 0.5).astype(int))
+
 if __name__ == '__main__':
+    hard_gates = non_clifford_gates(block_circuit(np.ones(N_QUBITS, dtype=np.uint8)))
+    if not hard_gates:
+        print("Warning: every block is a Clifford circuit, efficiently simulable on a stabilizer tableau")
     input_data_n5 = b'This is a test input of 32 bytes for N=5'
     output_hash_n5 = quantum_hash_iterative_v5(input_data_n5)
     print(f"Input (N=5, {len(input_data_n5)} bytes): {input_data_n5}")
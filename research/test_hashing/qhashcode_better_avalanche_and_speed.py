@@ -2,7 +2,10 @@ import math
 from qiskit import QuantumCircuit
 from qiskit.circuit import Parameter
 from qiskit.quantum_info import Statevector
-from qiskit.quantum_info.operators import Pauli
+
+import numpy as np
+from qsim.estimator import batch_expectations
+from qsim.readout import label_qubits, near_byte_edge, pauli_expectations
 
 NUM_QUBITS = 16 # Increased number of qubits
 NUM_LAYERS = 8
@@ -63,16 +66,19 @@ def preprocess_input(data: bytes) -> bytes:
                 reduced_data[j] ^= chunk_bytes[j]
         return bytes(reduced_data)
 
-# Quantum simulation portion of the qhash
-# x - byte array
-# returns the hash value as a byte array with the same size as input
-def qhash_variable_output_v7(x: bytes) -> bytes:
-    original_input_size = len(x)
-    global processed_input
-    processed_input = preprocess_input(x)
+def _expectations_qiskit(values: list):
+    # bind the parameters to the circuit.
+    bound_qc = qc_param.assign_parameters(dict(zip(params, values)))
 
-    # create a dictionary mapping each parameter to its value.
-    param_values = {}
+    # prepare the state vector from the bound circuit
+    sv = Statevector.from_instruction(bound_qc)
+    # calculate the qubit expectations on the Z and X axes
+    return pauli_expectations(sv, label_qubits(NUM_QUBITS), "ZX", exact_near=near_byte_edge)
+
+
+def input_param_values(processed_input: bytes) -> list:
+    """The value of each parameter, in params order."""
+    param_values = []
     param_index = 0
     for l in range(NUM_LAYERS):
         for i in range(NUM_QUBITS):
@@ -81,7 +87,7 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
         for i in range(NUM_QUBITS):
             # RZ parameter
@@ -89,7 +95,7 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
         for i in range(NUM_QUBITS):
             # RX parameter
@@ -97,24 +103,13 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
             bit_index = (param_index % 2) * 4
             nibble = (processed_input[byte_index] >> bit_index) & 0x0F
             value = nibble * math.pi / 8
-            param_values[params[param_index]] = value
+            param_values.append(value)
             param_index += 1
+    return param_values
 
-    # bind the parameters to the circuit.
-    bound_qc = qc_param.assign_parameters(param_values)
-
-    # prepare the state vector from the bound circuit
-    sv = Statevector.from_instruction(bound_qc)
-    # calculate the qubit expectations on the Z and X axes
-    expectation_bytes = bytearray()
-    for i in range(NUM_QUBITS):
-        z_op = Pauli("I" * i + "Z" + "I" * (NUM_QUBITS - i - 1))
-        z_val = sv.expectation_value(z_op).real
-        expectation_bytes.append(int((z_val + 1) / 2 * 255))
 
-        x_op = Pauli("I" * i + "X" + "I" * (NUM_QUBITS - i - 1))
-        x_val = sv.expectation_value(x_op).real
-        expectation_bytes.append(int((x_val + 1) / 2 * 255))
+def _output_bytes(exps, original_input_size: int) -> bytes:
+    expectation_bytes = bytearray(((exps.ravel() + 1) / 2 * 255).astype(int).tolist())
 
     # Resize the output to match the original input size using repetition or truncation
     output = bytearray()
@@ -128,6 +123,37 @@ def qhash_variable_output_v7(x: bytes) -> bytes:
 
     return bytes(output)
 
+
+# Quantum simulation portion of the qhash
+# x - byte array
+# returns the hash value as a byte array with the same size as input
+def qhash_variable_output_v7(x: bytes) -> bytes:
+    global processed_input
+    processed_input = preprocess_input(x)
+    exps = _expectations_qiskit(input_param_values(processed_input))
+    return _output_bytes(exps, len(x))
+
+
+# Batched Estimator path: the parameter values of N inputs as one
+# (N, num_params) array and the Z and X observables of every qubit in one job.
+# Rows whose values sit near a byte edge are redone with Statevector, so each
+# digest equals qhash_variable_output_v7(x).
+
+# column of each qc_param.parameters entry (sorted by name) in the params order
+CIRCUIT_ORDER = [params.index(param) for param in qc_param.parameters]
+
+
+def qhash_batch(inputs) -> list:
+    inputs = [bytes(x) for x in inputs]
+    values = np.array([input_param_values(preprocess_input(x)) for x in inputs]).reshape(-1, num_params)
+    batch = batch_expectations(qc_param, values[:, CIRCUIT_ORDER], label_qubits(NUM_QUBITS), "ZX")
+    digests = []
+    for x, row, exps in zip(inputs, values, batch):
+        if near_byte_edge(exps):
+            exps = _expectations_qiskit(row.tolist())
+        digests.append(_output_bytes(exps, len(x)))
+    return digests
+
 # Simple command-line interface
 if __name__ == "__main__":
     print("===== Quantum Hash Generator (Variable Output Size - v8) =====")
@@ -142,5 +142,14 @@ class TestQuantumHashFunction(unittest.TestCase):
                 # Ensure that the hashes are different for different inputs (collision resistance)
                 self.assertNotEqual(hash1, hash2, f"Collision detected between inputs: {input_data1} and {input_data2}")
 
+class TestBatchEstimator(unittest.TestCase):
+
+    def test_batch_matches_single_inputs(self):
+        """One Estimator job gives each input's bytes, whatever its size."""
+        from qhashcode_better_avalanche_and_speed import qhash_batch
+
+        inputs = [bytearray([1, 2, 3, 4, 5, 8]), bytearray([255] * 16), bytearray(range(40)), bytearray()]
+        self.assertEqual(qhash_batch(inputs), [qhash_variable_output_v7(x) for x in inputs])
+
 if __name__ == '__main__':
     unittest.main()
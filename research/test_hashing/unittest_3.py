@@ -142,5 +142,24 @@ class TestQuantumHashFunction(unittest.TestCase):
                 # Ensure that the hashes are different for different inputs (collision resistance)
                 self.assertNotEqual(hash1, hash2, f"Collision detected between inputs: {input_data1} and {input_data2}")
 
+
+class TestTreeMode(unittest.TestCase):
+
+    def test_pool_matches_serial(self):
+        """The tree digest does not depend on the pool, and differs from the chained v8 hash."""
+        import concurrent.futures
+        from hash4 import qhash_tree_v8, qhash_variable_output_v8
+
+        inputs = [bytes(range(i, i + size)) for i, size in enumerate((0, 6, 32, 33, 100, 200))]
+        serial = [qhash_tree_v8(x, processes=1) for x in inputs]
+        with concurrent.futures.ProcessPoolExecutor(2) as pool:
+            self.assertEqual([qhash_tree_v8(x, executor=pool) for x in inputs], serial)
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            self.assertEqual([qhash_tree_v8(x, executor=pool) for x in inputs], serial)
+        for x, digest in zip(inputs, serial):
+            self.assertEqual(len(digest), len(x))
+            if len(x) > 32:
+                self.assertNotEqual(digest, qhash_variable_output_v8(x))
+
 if __name__ == '__main__':
     unittest.main()
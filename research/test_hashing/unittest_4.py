@@ -0,0 +1,32 @@
+import contextlib
+import io
+import unittest
+import numpy as np
+import qhash
+from qhash import quantum_hash
+
+
+def quiet_hash(input_data):
+    # quantum_hash prints its progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        return quantum_hash(input_data)
+
+
+class TestQuantumHash(unittest.TestCase):
+
+    def test_known_digest(self):
+        self.assertEqual(quiet_hash("11100000"), "0302018200626002")
+
+    def test_v2_digest_does_not_depend_on_simulator(self):
+        """v2 gives the same digest from the compiled kernels as from Aer's state."""
+        rng = np.random.default_rng(25)
+        for length in (8, 21, 40):
+            bits = ''.join(rng.choice(['0', '1'], length))
+            self.assertEqual(qhash.quantum_hash_v2(bits), qhash.digest_v2(qhash._state_aer(bits)))
+
+    def test_text_input(self):
+        self.assertEqual(quiet_hash("hi"), quiet_hash(format(ord("h"), "08b") + format(ord("i"), "08b")))
+
+
+if __name__ == "__main__":
+    unittest.main()
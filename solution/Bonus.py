@@ -1,8 +1,16 @@
 #Challenge Solution 
 
+import functools
 import math
+import mmap
+import os
+import numpy as np
 from qiskit import QuantumCircuit
-from qiskit.quantum_info import Statevector, Pauli
+from qiskit.quantum_info import Statevector
+from main import walk_angles, walk_schedule, walk_template, xor_fold
+
+from qsim.circuit import compile_circuit
+from qsim.readout import SINGLE_BYTE_MARGIN, near_byte_edge, pauli_expectations
 
 
 NUM_POSITION_QUBITS = 4  # for 16 positions
@@ -12,58 +20,122 @@ TOTAL_QUBITS = NUM_POSITION_QUBITS + 1  # +1 coin qubit
 
 def preprocess_input(data: bytearray, size: int = 32) -> bytearray:
     if len(data) > size:
-        reduced = bytearray(size)
-        for i in range(len(data)):
-            reduced[i % size] ^= data[i]
-        return reduced
+        reduced = np.zeros(size, dtype=np.uint8)
+        xor_fold(reduced, data)
+        return bytearray(reduced.tobytes())
     elif len(data) < size:
         return data + bytearray([0] * (size - len(data)))
     return data
 
 
-def qhash_quantum_walk(input_data: bytearray) -> bytes:
-    original_size = len(input_data)
-    data = preprocess_input(input_data)
-
-    qc = QuantumCircuit(TOTAL_QUBITS)
-    coin = 0
-    pos_qubits = list(range(1, TOTAL_QUBITS))
-
-    # Start walker roughly centered
-    center = len(pos_qubits) // 2
-    qc.x(pos_qubits[center])
-
-    for step in range(NUM_WALK_STEPS):
-        byte_val = sum([data[(step + i) % len(data)] for i in range(4)]) % 256
-        theta = (byte_val % 256) * math.pi / 128  # in [0, 2π]
-        qc.ry(theta, coin)
-
-        for i in reversed(range(len(pos_qubits))):
-            qc.cx(coin, pos_qubits[i])
-    
+@functools.lru_cache(maxsize=None)
+def bonus_template() -> QuantumCircuit:
+    """The walk template from main followed by the fixed mixing layer."""
+    qc = walk_template(NUM_WALK_STEPS).copy()
     for i in range(TOTAL_QUBITS):
         qc.ry(math.pi / 4, i)
     for i in range(TOTAL_QUBITS - 1):
         qc.cx(i, i + 1)
+    return qc
+
+
+# <Z> and <X> per label position i
+READOUT_QUBITS = [TOTAL_QUBITS - 1 - i for i in range(1, TOTAL_QUBITS)]
 
+DEFAULT_ENGINE = "qiskit"
+
+
+def _expectations_qiskit(angles):
+    # Only the step angles depend on the input; the circuit itself is built once
+    qc = bonus_template().assign_parameters(angles)
     sv = Statevector.from_instruction(qc)
+    return pauli_expectations(sv, READOUT_QUBITS, "ZX", exact_near=near_byte_edge)
+
+
+@functools.lru_cache(maxsize=None)
+def bonus_kernel():
+    """bonus_template compiled once; values are the step angles in order."""
+    return compile_circuit(bonus_template())
+
+
+def _expectations_complex64(angles):
+    # single-precision evolution; values near a byte edge are redone in float64
+    state = bonus_kernel().run(angles, dtype=np.complex64)
+    exps = pauli_expectations(state.astype(complex), READOUT_QUBITS, "ZX")
+    if near_byte_edge(exps, SINGLE_BYTE_MARGIN):
+        return _expectations_qiskit(angles)
+    return exps
+
 
-    # Collect expectations
-    hash_bytes = bytearray()
-    for i in pos_qubits:
-        z_op = Pauli("I" * i + "Z" + "I" * (TOTAL_QUBITS - i - 1))
-        x_op = Pauli("I" * i + "X" + "I" * (TOTAL_QUBITS - i - 1))
+ENGINES = {
+    "qiskit": _expectations_qiskit,
+    "complex64": _expectations_complex64,
+}
 
-        z_val = sv.expectation_value(z_op).real
-        x_val = sv.expectation_value(x_op).real
 
-        hash_bytes.append(int((z_val + 1) / 2 * 255))
-        hash_bytes.append(int((x_val + 1) / 2 * 255))
+def _hash_bytes(exps) -> bytes:
+    hash_bytes = bytearray(((exps.ravel() + 1) / 2 * 255).astype(int).tolist())
 
     while len(hash_bytes) < 32:
         hash_bytes.extend(hash_bytes)
 
     return bytes(hash_bytes[:32])
+
+
+def qhash_quantum_walk(input_data: bytearray, engine: str = DEFAULT_ENGINE) -> bytes:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+    data = preprocess_input(input_data)
+
+    return _hash_bytes(ENGINES[engine](walk_angles(walk_schedule(data))))
+
+
+class BonusHasher:
+    """qhash_quantum_walk as a streaming, hashlib-style object.
+
+    The 256-bit digest only sees the input XOR-folded into 32 bytes, so
+    update() folds each chunk into that state as it arrives and the input is
+    never held whole; digest() runs the quantum stage once on the state.
+    BonusHasher(a + b).digest() == h.update(a); h.update(b); h.digest().
+    """
+
+    name = "bonus256"
+    digest_size = 32
+    block_size = 32
+
+    def __init__(self, data=b"", engine: str = DEFAULT_ENGINE):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+        self.engine = engine
+        self.length = 0  # bytes folded so far
+        self._state = np.zeros(self.block_size, dtype=np.uint8)
+        self.update(data)
+
+    def update(self, data) -> None:
+        self.length += xor_fold(self._state, data, self.length)
+
+    def copy(self) -> "BonusHasher":
+        """An independent hasher with the same midstate (32 bytes are copied)."""
+        other = BonusHasher.__new__(BonusHasher)
+        other.engine, other.length, other._state = self.engine, self.length, self._state.copy()
+        return other
+
+    def digest(self) -> bytes:
+        data = bytearray(self._state.tobytes())
+        return _hash_bytes(ENGINES[self.engine](walk_angles(walk_schedule(data))))
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+def hash_file(path: str, engine: str = DEFAULT_ENGINE) -> bytes:
+    """qhash_quantum_walk of a file's contents, folded straight from an mmap of it."""
+    hasher = BonusHasher(engine=engine)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+    return hasher.digest()
 # Testing the optimized function
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+# Circuit construction benchmark: gate-by-gate rebuild vs cached templates
+#
+# Times only building the circuit each hash simulates, not the simulation:
+#   walk       main / qcircuit walk, 32 RY angles bound into walk_template
+#   bonus256   Bonus.py, the walk template plus the fixed mixing layer
+#   bonus      bonus/hash.py, H swapped into the RX(pi/2) template per 1 bit
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+SOLUTION_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SOLUTION_DIR, "bonus"))
+
+import Bonus
+import hash as bonus_hash
+from main import (COIN, POS_QUBITS, START_QUBIT, TOTAL_QUBITS, preprocess_input,
+                  walk_angles, walk_schedule, walk_template)
+
+
+def rebuild_walk(angles) -> QuantumCircuit:
+    qc = QuantumCircuit(TOTAL_QUBITS)
+    qc.x(START_QUBIT)
+    for theta in angles:
+        qc.ry(theta, COIN)
+        for i in reversed(range(len(POS_QUBITS))):
+            qc.cx(COIN, POS_QUBITS[i])
+    return qc
+
+
+def rebuild_bonus256(angles) -> QuantumCircuit:
+    qc = rebuild_walk(angles)
+    for i in range(TOTAL_QUBITS):
+        qc.ry(math.pi / 4, i)
+    for i in range(TOTAL_QUBITS - 1):
+        qc.cx(i, i + 1)
+    return qc
+
+
+def rebuild_bonus(binary_input: str) -> QuantumCircuit:
+    qc = QuantumCircuit(bonus_hash.TOTAL_QUBITS)
+    for start in range(0, len(binary_input), 2):
+        for j, bit in enumerate(binary_input[start:start + 2]):
+            coin = bonus_hash.COIN_QUBITS[j % len(bonus_hash.COIN_QUBITS)]
+            if bit == '1':
+                qc.h(coin)
+            else:
+                qc.rx(math.pi / 2, coin)
+        for c in bonus_hash.COIN_QUBITS:
+            for p in bonus_hash.POSITION_QUBITS:
+                qc.cx(c, p)
+    for i in range(bonus_hash.TOTAL_QUBITS):
+        qc.ry(math.pi / 4, i)
+    for i in range(bonus_hash.TOTAL_QUBITS - 1):
+        qc.cx(i, i + 1)
+    for i in range(bonus_hash.TOTAL_QUBITS):
+        qc.h(i)
+    return qc
+
+
+def cases(data: bytes) -> dict:
+    """name -> (rebuild, bind) callables producing the same circuit for data."""
+    angles = walk_angles(walk_schedule(preprocess_input(bytearray(data))))
+    bits = ''.join(format(byte, '08b') for byte in data)
+    return {
+        "walk": (lambda: rebuild_walk(angles.tolist()),
+                 lambda: walk_template().assign_parameters(angles)),
+        "bonus256": (lambda: rebuild_bonus256(angles.tolist()),
+                     lambda: Bonus.bonus_template().assign_parameters(angles)),
+        "bonus": (lambda: rebuild_bonus(bits), lambda: bonus_hash.bind_bits(bits)),
+    }
+
+
+def per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Circuit construction time per hash call")
+    parser.add_argument("--size", type=int, default=32, help="input size in bytes")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    data = np.random.default_rng(0).integers(0, 256, args.size, dtype=np.uint8).tobytes()
+    print(f"--- circuit construction for a {args.size}-byte input, {args.repeat} calls ---")
+    for name, (rebuild, bind) in cases(data).items():
+        if rebuild() != bind():
+            raise SystemExit(f"{name}: template circuit differs from the rebuilt one")
+        old, new = per_call(rebuild, args.repeat), per_call(bind, args.repeat)
+        print(f"{name:9s} rebuild {old * 1e6:10.1f} us   template {new * 1e6:9.1f} us   (x{old / new:.1f})")
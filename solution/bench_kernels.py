@@ -0,0 +1,60 @@
+# Simulation benchmark: fused vs gate-by-gate single-qubit layers
+#
+# Times qsim.coin_walk.run, the 20-qubit kernels behind research's
+# quantum_hash_v2 and the bonus hash's complex64 engine. coin_walk compiles
+# with fuse=True, so each all-qubit ry(pi/4) and H layer of the tail (and the
+# coin gates of a chunk) is one apply_layer op; the same circuits compiled
+# without fuse apply those gates one matmul at a time.
+
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from qsim import coin_walk
+from qsim.circuit import compile_circuit
+
+
+@functools.lru_cache(maxsize=None)
+def unfused_chunk_kernel(bits: str):
+    return compile_circuit(coin_walk.chunk_circuit(bits))
+
+
+@functools.lru_cache(maxsize=None)
+def unfused_tail_kernel():
+    return compile_circuit(coin_walk.tail_circuit())
+
+
+def run_unfused(binary_input: str, dtype=complex) -> np.ndarray:
+    state = np.zeros(2 ** coin_walk.TOTAL_QUBITS, dtype=dtype)
+    state[0] = 1.0
+    for start in range(0, len(binary_input), 2):
+        state = unfused_chunk_kernel(binary_input[start:start + 2]).run(state=state, dtype=dtype)
+    return unfused_tail_kernel().run(state=state, dtype=dtype)
+
+
+def per_call(fn, repeat: int) -> float:
+    fn()  # compile the kernels outside the timing
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coin-circuit simulation time per hash call")
+    parser.add_argument("--size", type=int, default=4, help="input size in bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = np.random.default_rng(0).integers(0, 256, args.size, dtype=np.uint8).tobytes()
+    bits = ''.join(format(byte, '08b') for byte in data)
+    print(f"--- 20-qubit coin circuit for a {args.size}-byte input, {args.repeat} calls ---")
+    for dtype in (np.complex128, np.complex64):
+        fused = lambda: coin_walk.run(bits, dtype=dtype)
+        unfused = lambda: run_unfused(bits, dtype=dtype)
+        if not np.allclose(fused(), unfused(), rtol=0, atol=1e-5):
+            raise SystemExit(f"{np.dtype(dtype).name}: fused and unfused states differ")
+        old, new = per_call(unfused, args.repeat), per_call(fused, args.repeat)
+        print(f"{np.dtype(dtype).name:10s} unfused {old * 1e3:8.1f} ms   fused {new * 1e3:8.1f} ms   (x{old / new:.1f})")
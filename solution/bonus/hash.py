@@ -1,7 +1,12 @@
 from qiskit import QuantumCircuit
-from qiskit.quantum_info import Statevector, Pauli
+from qiskit.circuit.library import HGate, RXGate
 from qiskit_aer import Aer
+import functools
 import math
+import numpy as np
+
+from qsim import coin_walk
+from qsim.readout import SINGLE_BYTE_MARGIN, label_qubits, near_byte_edge, pauli_expectations
 
 TOTAL_QUBITS = 20
 COIN_QUBITS = list(range(4))
@@ -11,34 +16,24 @@ def expectation_to_byte(exp_val):
     """Convert expectation value [-1, 1] to byte [0, 255]."""
     return int((exp_val + 1) / 2 * 255)
 
-def quantum_hash(input_data):
-    """Quantum hash function using expectations from quantum statevector.
-    Returns a hash with output size matching the input size."""
-    # Ensure input_data is in byte array format
-    if not isinstance(input_data, bytearray):
-        raise ValueError("Input must be a byte array")
-    
-    # Store the original input size to match later
-    input_size = len(input_data)
-    
-    # Convert byte array to binary string
-    binary_input = ''.join(format(byte, '08b') for byte in input_data)
+# Only the H / RX(pi/2) choice on each coin depends on the input bits; the rest
+# of the circuit is fixed for a given input length. It is built once per length
+# with RX(pi/2) in every coin slot, and each call swaps H into the slots whose
+# bit is 1. (A single parameterized gate cannot stand in for both: U(pi/2, 0, pi)
+# is H only up to rounding, which would change the hash bytes.)
+H_GATE = HGate()
 
-    # Pad binary input if needed (ensure it's multiple of 2)
-    if len(binary_input) % 2 != 0:
-        binary_input += '0'
 
-    # Build the quantum circuit
+@functools.lru_cache(maxsize=16)
+def circuit_template(num_bits: int) -> tuple:
+    """(circuit, coin slot indices) for a num_bits-bit input, all bits '0'."""
     qc = QuantumCircuit(TOTAL_QUBITS)
-    chunks = [binary_input[i:i+2] for i in range(0, len(binary_input), 2)]
-
-    for chunk in chunks:
-        for j, bit in enumerate(chunk):
+    slots = []
+    for start in range(0, num_bits, 2):
+        for j in range(min(2, num_bits - start)):
             idx = j % len(COIN_QUBITS)
-            if bit == '1':
-                qc.h(COIN_QUBITS[idx])
-            else:
-                qc.rx(math.pi / 2, COIN_QUBITS[idx])
+            slots.append(len(qc.data))
+            qc.rx(math.pi / 2, COIN_QUBITS[idx])
 
         for c in COIN_QUBITS:
             for p in POSITION_QUBITS:
@@ -51,6 +46,34 @@ def quantum_hash(input_data):
         qc.cx(i, i + 1)
     for i in range(TOTAL_QUBITS):
         qc.h(i)
+    return qc, slots
+
+
+def bind_bits(binary_input: str) -> QuantumCircuit:
+    """The hash circuit for a string of '0' / '1' bits, from the cached template."""
+    template, slots = circuit_template(len(binary_input))
+    qc = template.copy()
+    for slot, bit in zip(slots, binary_input):
+        if bit == '1':
+            qc.data[slot] = qc.data[slot].replace(operation=H_GATE)
+    return qc
+
+
+# --- complex64 engine --------------------------------------------------------
+# The circuit repeats one block per 2 input bits: H or RX(pi/2) on coins 0 and 1,
+# then the same CX fan-out. qsim.coin_walk compiles the four block kinds and
+# the fixed tail once, and the 2^20 amplitudes run through them in single
+# precision (half the memory traffic of Aer's complex128 state). Any value within
+# SINGLE_BYTE_MARGIN of a byte edge sends the input back to Aer.
+#
+# Single-precision error grows with the number of blocks applied, and
+# SINGLE_TOLERANCE was measured on circuits no deeper than a 32-byte input's.
+# Longer inputs go to Aer directly.
+COMPLEX64_MAX_BITS = 32 * 8
+
+
+def _expectations_aer(binary_input: str):
+    qc = bind_bits(binary_input)
 
     # Simulate and get statevector
     backend = Aer.get_backend('statevector_simulator')
@@ -58,15 +81,47 @@ def quantum_hash(input_data):
     state = result.get_statevector()
 
     # Collect expectation values for Z and X operators
-    hash_bytes = bytearray()
-    for i in range(TOTAL_QUBITS):
-        z_op = Pauli('I' * i + 'Z' + 'I' * (TOTAL_QUBITS - i - 1))
-        z_val = state.expectation_value(z_op).real
-        hash_bytes.append(expectation_to_byte(z_val))
+    return pauli_expectations(state, label_qubits(TOTAL_QUBITS), "ZX", exact_near=near_byte_edge)
+
+
+def _expectations_complex64(binary_input: str):
+    if len(binary_input) > COMPLEX64_MAX_BITS:
+        return _expectations_aer(binary_input)
+    state = coin_walk.run(binary_input, dtype=np.complex64)
+    exps = pauli_expectations(state.astype(complex), label_qubits(TOTAL_QUBITS), "ZX")
+    if near_byte_edge(exps, SINGLE_BYTE_MARGIN):
+        return _expectations_aer(binary_input)
+    return exps
+
+
+ENGINES = {
+    "aer": _expectations_aer,
+    "complex64": _expectations_complex64,
+}
+DEFAULT_ENGINE = "aer"
+
+
+def quantum_hash(input_data, engine: str = DEFAULT_ENGINE):
+    """Quantum hash function using expectations from quantum statevector.
+    Returns a hash with output size matching the input size."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+    # Ensure input_data is in byte array format
+    if not isinstance(input_data, bytearray):
+        raise ValueError("Input must be a byte array")
+    
+    # Store the original input size to match later
+    input_size = len(input_data)
+    
+    # Convert byte array to binary string
+    binary_input = ''.join(format(byte, '08b') for byte in input_data)
+
+    # Pad binary input if needed (ensure it's multiple of 2)
+    if len(binary_input) % 2 != 0:
+        binary_input += '0'
 
-        x_op = Pauli('I' * i + 'X' + 'I' * (TOTAL_QUBITS - i - 1))
-        x_val = state.expectation_value(x_op).real
-        hash_bytes.append(expectation_to_byte(x_val))
+    exps = ENGINES[engine](binary_input)
+    hash_bytes = bytearray(expectation_to_byte(val) for val in exps.ravel())
     
     # Resize the hash to match the input size exactly
     if len(hash_bytes) < input_size:
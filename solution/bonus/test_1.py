@@ -1,5 +1,6 @@
 # Unit test for our second Hashing function hash.py
 
+import os
 import time
 import unittest
 from hash import TOTAL_QUBITS, quantum_hash  # Replace with actual module name if needed
@@ -144,5 +145,21 @@ class TestQuantumHashFunction(unittest.TestCase):
                 # Ensure that the hashes are different for different inputs (collision resistance)
                 self.assertNotEqual(hash1, hash2, f"Collision detected between inputs: {input_data1} and {input_data2}")
 
+
+class TestComplex64Engine(unittest.TestCase):
+
+    def test_matches_aer(self):
+        """Single precision gives the Aer bytes, directly or through the float64 fallback."""
+        for input_data in (bytearray([1, 2, 3, 4]), bytearray([255, 0, 255, 0])):
+            self.assertEqual(quantum_hash(input_data, engine="complex64"), quantum_hash(input_data))
+        with self.assertRaises(ValueError):
+            quantum_hash(bytearray([1, 2]), engine="complex128")
+
+    @unittest.skipUnless(os.environ.get("QHASH_SLOW_TESTS"), "set QHASH_SLOW_TESTS=1 to run")
+    def test_long_input_matches_aer(self):
+        """Above COMPLEX64_MAX_BITS the engine gives the Aer bytes; several KB take Aer a long while."""
+        input_data = bytearray(i * 37 % 256 for i in range(4096))
+        self.assertEqual(quantum_hash(input_data, engine="complex64"), quantum_hash(input_data))
+
 if __name__ == '__main__':
     unittest.main()
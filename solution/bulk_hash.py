@@ -0,0 +1,251 @@
+# Bulk hashing across a process pool through shared memory
+#
+# For large offline jobs (collision scans, distribution studies) pickling every
+# input and every digest between processes costs more than the simulation.
+# Here all inputs are packed into one multiprocessing.shared_memory block
+# (bytes + row offsets), digests are written into a second block, and the
+# pool workers are only sent (start, stop) row ranges.
+#
+# Variants that cannot be bulk-hashed as they stand:
+#   solution/qcircuit.py          builds and prints the walk circuit, returns None
+#   research/test_hashing/qhash.py  qhash is the root qhash.qhash without toFixed,
+#                                   quantum_hash takes text and returns a hex string
+#   research/test_hashing/qhashCopy.py  imports prev_work.qhash, which is not in the repo
+
+import argparse
+import concurrent.futures
+import importlib.util
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SOLUTION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SOLUTION_DIR)
+RESEARCH_DIR = os.path.join(REPO_ROOT, "research", "test_hashing")
+
+# name -> (directory, module file stem, function, digest size or None for input size)
+VARIANTS = {
+    "walk": (SOLUTION_DIR, "main", "qhash_quantum_walk", None),
+    "bonus256": (SOLUTION_DIR, "Bonus", "qhash_quantum_walk", 32),
+    "bonus": (os.path.join(SOLUTION_DIR, "bonus"), "hash", "quantum_hash", None),
+    "qhash": (REPO_ROOT, "qhash", "qhash", 32),
+    "v7": (RESEARCH_DIR, "qhashcode_better_avalanche_and_speed", "qhash_variable_output_v7", None),
+    "v7_20": (RESEARCH_DIR, "anothergoodone(but requires more computational power)",
+              "qhash_variable_output_v7", None),
+    "v8": (RESEARCH_DIR, "hash4", "qhash_variable_output_v8", None),
+    "chunk": (RESEARCH_DIR, "hash4", "quantum_process_chunk", 12),
+    "iterative_v5": (RESEARCH_DIR, "qhash2", "quantum_hash_iterative_v5", 32),
+}
+
+CHUNK_ROWS = 4096  # rows per task for the vectorized walk (smaller batches lose vectorization)
+CHUNK_ROWS_QISKIT = 8  # rows per task for the per-input Qiskit variants
+
+
+def _load_module(name: str):
+    directory, stem, _, _ = VARIANTS[name]
+    path = os.path.join(directory, stem + ".py")
+    # one module name per file: the root qhash.py and research's qhash.py must not
+    # share "qhash", and file names like "anothergoodone(...).py" are not identifiers
+    relative = os.path.splitext(os.path.relpath(path, REPO_ROOT))[0]
+    module_name = "bulk_hash_" + "".join(c if c.isalnum() else "_" for c in relative)
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+    return module
+
+
+def load_variant(name: str):
+    """Import one of the VARIANTS by name and return its hash function."""
+    if name not in VARIANTS:
+        raise ValueError(f"Unknown hash variant {name!r}, expected one of {sorted(VARIANTS)}")
+    return getattr(_load_module(name), VARIANTS[name][2])
+
+
+def digest_sizes(name: str, lengths: np.ndarray) -> np.ndarray:
+    fixed = VARIANTS[name][3]
+    return lengths.copy() if fixed is None else np.full_like(lengths, fixed)
+
+
+# --- worker side -------------------------------------------------------------
+
+def _views(layout: dict, shm_in, shm_out) -> tuple:
+    """Numpy views of (input bytes, input offsets, output bytes, output offsets, status)."""
+    n, in_bytes, out_bytes = layout["rows"], layout["in_bytes"], layout["out_bytes"]
+    header = 8 * (n + 1)
+    data = np.ndarray(in_bytes, np.uint8, shm_in.buf, header)
+    in_off = np.ndarray(n + 1, np.int64, shm_in.buf, 0)
+    out = np.ndarray(out_bytes, np.uint8, shm_out.buf, header + n)
+    out_off = np.ndarray(n + 1, np.int64, shm_out.buf, 0)
+    status = np.ndarray(n, np.uint8, shm_out.buf, header)
+    return data, in_off, out, out_off, status
+
+
+def _hash_rows(name: str, views: tuple, start: int, stop: int) -> tuple:
+    data, in_off, out, out_off, status = views
+    lengths = np.diff(in_off[start:stop + 1])
+
+    if name == "walk" and len(lengths) and (lengths == lengths[0]).all():
+        # one (rows, L) view straight over the shared input, hashed as a batch
+        rows = data[in_off[start]:in_off[stop]].reshape(stop - start, int(lengths[0]))
+        out[out_off[start]:out_off[stop]] = _load_module("walk")._hash_matrix(rows).ravel()
+        status[start:stop] = 1
+        return 0, None
+
+    fn = load_variant(name)
+    failures, error = 0, None
+    for i in range(start, stop):
+        try:
+            digest = fn(bytearray(data[in_off[i]:in_off[i + 1]]))
+            out[out_off[i]:out_off[i + 1]] = np.frombuffer(digest, np.uint8)
+            status[i] = 1
+        except Exception as e:
+            failures += 1
+            error = error or f"input {i}: {type(e).__name__}: {e}"
+    return failures, error
+
+
+def _hash_range(name: str, layout: dict, start: int, stop: int) -> tuple:
+    """Hash rows [start, stop) in place; returns (failures, first error message)."""
+    # workers share the parent's resource tracker, so attaching does not transfer ownership
+    shm_in = shared_memory.SharedMemory(name=layout["in"])
+    shm_out = shared_memory.SharedMemory(name=layout["out"])
+    try:
+        return _hash_rows(name, _views(layout, shm_in, shm_out), start, stop)
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+# --- parent side -------------------------------------------------------------
+
+def _pack(inputs) -> tuple:
+    """Contiguous bytes, int64 row offsets and the row order for a list or an (N, L) array.
+
+    List inputs are packed sorted by length so rows of one length sit together
+    and the walk can hash them as one matrix; order maps packed rows back.
+    """
+    if isinstance(inputs, np.ndarray):
+        if inputs.ndim != 2:
+            raise ValueError("Batched input must be a 2-D (N, L) array")
+        n, length = inputs.shape
+        return (np.ascontiguousarray(inputs, dtype=np.uint8).ravel(),
+                np.arange(n + 1, dtype=np.int64) * length, None)
+    lengths = np.fromiter((len(item) for item in inputs), dtype=np.int64, count=len(inputs))
+    order = np.argsort(lengths, kind="stable")
+    offsets = np.zeros(len(inputs) + 1, dtype=np.int64)
+    np.cumsum(lengths[order], out=offsets[1:])
+    data = np.frombuffer(b"".join(bytes(inputs[i]) for i in order), dtype=np.uint8)
+    return data, offsets, order
+
+
+def _ranges(offsets: np.ndarray, chunk: int) -> list:
+    """Split rows into tasks of at most chunk rows that do not straddle a length change."""
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    breaks = set(range(0, n, chunk)) | set((np.flatnonzero(np.diff(lengths)) + 1).tolist())
+    bounds = sorted(breaks) + [n]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _run(name: str, executor, layout: dict, in_off: np.ndarray, chunk: int) -> None:
+    futures = [executor.submit(_hash_range, name, layout, a, b) for a, b in _ranges(in_off, chunk)]
+    failures, error = 0, None
+    for future in futures:
+        count, message = future.result()
+        failures += count
+        error = error or message
+    if failures:
+        raise RuntimeError(f"{failures} of {layout['rows']} inputs failed to hash with {name}, first: {error}")
+
+
+def bulk_hash(name: str, inputs, workers: int = None, executor=None, chunk: int = None):
+    """Hash many inputs with a pool of worker processes over shared memory.
+
+    inputs is a list of byte strings (giving a list of bytes in the same
+    order) or an (N, L) uint8 array (giving an (N, digest size) uint8 array).
+    Pass a pool from make_pool as executor to reuse its workers across calls.
+    Raises RuntimeError if any input fails to hash.
+    """
+    load_variant(name)  # before the pool forks, so workers inherit the import
+    data, in_off, order = _pack(inputs)
+    n = len(in_off) - 1
+    out_off = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(digest_sizes(name, np.diff(in_off)), out=out_off[1:])
+    if n == 0:
+        if order is not None:
+            return []
+        return np.zeros((0, int(digest_sizes(name, np.array([inputs.shape[1]]))[0])), np.uint8)
+
+    if chunk is None:
+        per_worker = -(-n // (workers or os.cpu_count()))
+        chunk = max(1, min(CHUNK_ROWS if name == "walk" else CHUNK_ROWS_QISKIT, per_worker))
+
+    # input block: offsets | bytes, output block: offsets | status | digests
+    header = 8 * (n + 1)
+    shm_in = shared_memory.SharedMemory(create=True, size=header + max(len(data), 1))
+    shm_out = shared_memory.SharedMemory(create=True, size=header + n + max(int(out_off[-1]), 1))
+    own_pool = executor is None
+    try:
+        np.ndarray(n + 1, np.int64, shm_in.buf, 0)[:] = in_off
+        np.ndarray(len(data), np.uint8, shm_in.buf, header)[:] = data
+        np.ndarray(n + 1, np.int64, shm_out.buf, 0)[:] = out_off
+        np.ndarray(n, np.uint8, shm_out.buf, header)[:] = 0
+        layout = {"in": shm_in.name, "out": shm_out.name, "rows": n,
+                  "in_bytes": len(data), "out_bytes": int(out_off[-1])}
+        if own_pool:
+            executor = concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count())
+        _run(name, executor, layout, in_off, chunk)
+        flat = bytes(shm_out.buf[header + n:header + n + int(out_off[-1])])
+    finally:
+        if own_pool and executor is not None:
+            executor.shutdown()
+        for shm in (shm_in, shm_out):
+            shm.close()
+            shm.unlink()
+
+    if order is None:
+        return np.frombuffer(flat, np.uint8).reshape(n, -1).copy()
+    results = [None] * n
+    for row, i in enumerate(order):
+        results[i] = flat[out_off[row]:out_off[row + 1]]
+    return results
+
+
+def make_pool(workers: int = None, preload=()) -> concurrent.futures.ProcessPoolExecutor:
+    """A reusable pool for bulk_hash with the given variants imported before forking."""
+    for name in preload:
+        load_variant(name)
+    return concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk hashing over shared memory")
+    parser.add_argument("--hash", default="walk", choices=sorted(VARIANTS))
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=32, help="input size in bytes")
+    parser.add_argument("--workers", type=int, nargs="*", default=None,
+                        help="worker counts to compare (default 1 and all cores)")
+    args = parser.parse_args()
+
+    inputs = np.random.default_rng(0).integers(0, 256, (args.count, args.size), dtype=np.uint8)
+    counts = args.workers or sorted({1, os.cpu_count()})
+    print(f"--- {args.count} inputs of {args.size} bytes through {args.hash} ---")
+    base = None
+    for count in counts:
+        with make_pool(count, preload=[args.hash]) as pool:
+            bulk_hash(args.hash, inputs[:count], executor=pool)  # warm the workers up
+            start = time.perf_counter()
+            bulk_hash(args.hash, inputs, executor=pool)
+            rate = args.count / (time.perf_counter() - start)
+        base = base or rate
+        print(f"{count:3d} workers: {rate:12.1f} H/s  (x{rate / base:.2f})")
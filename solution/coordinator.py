@@ -0,0 +1,368 @@
+# Distributed nonce search: a coordinator leases nonce ranges to workers
+#
+# Workers connect over TCP ("host:port") or a Unix socket ("unix:/path") and
+# speak newline-delimited JSON:
+#
+#   worker -> {"op": "lease", "worker": name}
+#   coord  -> {"done": false, "job": {...}, "lease": {"id", "start", "stop"}}
+#             or {"done": true} once the search is over
+#   worker -> {"op": "result", "worker": name, "lease": id, "hashes": n,
+#              "elapsed": seconds, "nonce": nonce or null}
+#   coord  -> {"done": bool}
+#
+# A lease that is not reported within lease_timeout seconds, or whose worker
+# disconnects, goes back into the queue and is handed to the next worker.
+
+import argparse
+import collections
+import json
+import multiprocessing as mp
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from miner import (BATCH_SIZE, HASH_FUNCTIONS, difficulty_target, digest_size, load_hash_fn,
+                   meets_target, search_batch)
+
+
+def parse_address(address: str):
+    """'unix:/path' -> '/path', 'host:port' -> (host, port)."""
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def format_address(address) -> str:
+    if isinstance(address, str):
+        return "unix:" + address
+    return f"{address[0]}:{address[1]}"
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        held = set()  # leases handed out on this connection
+        try:
+            for line in self.rfile:
+                try:
+                    reply = self._reply(coordinator, json.loads(line), held)
+                except (KeyError, TypeError, ValueError, AttributeError, OverflowError) as e:
+                    # a malformed request gets an error reply, the connection stays up
+                    reply = {"error": f"bad request: {type(e).__name__}: {e}"}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+                self.wfile.flush()
+        except ConnectionError:
+            pass
+        finally:
+            # worker went away: whatever it still held is leased out again
+            coordinator.release(held)
+
+    @staticmethod
+    def _reply(coordinator, request: dict, held: set) -> dict:
+        if request["op"] == "lease":
+            reply = coordinator.lease(request.get("worker"))
+            if "lease" in reply:
+                held.add(reply["lease"]["id"])
+            return reply
+        if request["op"] == "result":
+            reply = coordinator.report(request)
+            held.discard(request["lease"])
+            return reply
+        return {"error": f"unknown op {request['op']!r}"}
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Coordinator:
+    """Hands out nonce ranges for header_prefix + nonce and collects results."""
+
+    def __init__(self, header_prefix: bytes, target: int, hash_fn: str = "walk",
+                 nonce_size: int = 4, range_size: int = 4096, lease_timeout: float = 30.0,
+                 max_nonce: int = None):
+        if hash_fn not in HASH_FUNCTIONS:
+            raise ValueError(f"Unknown hash function {hash_fn!r}, expected one of {sorted(HASH_FUNCTIONS)}")
+        self.job = {
+            "prefix": bytes(header_prefix).hex(),
+            "target": target,
+            "hash_fn": hash_fn,
+            "nonce_size": nonce_size,
+        }
+        self.range_size = range_size
+        self.lease_timeout = lease_timeout
+        self.max_nonce = 1 << (8 * nonce_size) if max_nonce is None else max_nonce
+
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._next_nonce = 0
+        self._requeued = collections.deque()
+        self._leases = {}  # id -> (start, stop, deadline)
+        self._next_lease = 0
+        self._workers = {}  # name -> [hashes, busy seconds]
+        self._requeue_count = 0
+        self._solution = None
+        self._started = None
+        self._server = None
+
+    # --- lease bookkeeping --------------------------------------------------
+
+    def _expire(self, now):
+        for lease_id, (start, stop, deadline) in list(self._leases.items()):
+            if deadline < now:
+                del self._leases[lease_id]
+                self._requeued.append((start, stop))
+                self._requeue_count += 1
+
+    def _check_finished(self):
+        if self._solution is not None or (
+                self._next_nonce >= self.max_nonce and not self._requeued and not self._leases):
+            self._finished.set()
+
+    def lease(self, worker=None) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            self._expire(now)
+            if self._finished.is_set():
+                return {"done": True}
+
+            if self._requeued:
+                start, stop = self._requeued.popleft()
+            elif self._next_nonce < self.max_nonce:
+                start = self._next_nonce
+                stop = min(start + self.range_size, self.max_nonce)
+                self._next_nonce = stop
+            else:
+                # everything is out on lease; ask again later
+                return {"done": False, "wait": min(1.0, self.lease_timeout)}
+
+            lease_id = self._next_lease
+            self._next_lease += 1
+            self._leases[lease_id] = (start, stop, now + self.lease_timeout)
+            return {"done": False, "job": self.job,
+                    "lease": {"id": lease_id, "start": start, "stop": stop}}
+
+    def report(self, result: dict) -> dict:
+        lease_id, hashes, elapsed = result["lease"], int(result["hashes"]), float(result["elapsed"])
+        nonce = result.get("nonce")
+        if nonce is not None:
+            # never trust a worker's word for it: recompute the winning digest
+            digest = self._digest(int(nonce))
+            if not meets_target(digest, self.job["target"]):
+                nonce = None
+        with self._lock:
+            self._expire(time.monotonic())
+            if self._leases.pop(lease_id, None) is not None:
+                # an expired lease was requeued and its range is counted by whoever searches it next
+                stats = self._workers.setdefault(result.get("worker"), [0, 0.0])
+                stats[0] += hashes
+                stats[1] += elapsed
+            if nonce is not None and self._solution is None:
+                self._solution = (int(nonce), digest, result.get("worker"))
+            self._check_finished()
+            return {"done": self._finished.is_set()}
+
+    def release(self, lease_ids):
+        with self._lock:
+            for lease_id in lease_ids:
+                if lease_id in self._leases:
+                    start, stop, _ = self._leases.pop(lease_id)
+                    self._requeued.append((start, stop))
+                    self._requeue_count += 1
+
+    def _digest(self, nonce: int) -> bytes:
+        fn = load_hash_fn(self.job["hash_fn"])
+        prefix = bytes.fromhex(self.job["prefix"])
+        return fn(bytearray(prefix + nonce.to_bytes(self.job["nonce_size"], "little")))
+
+    # --- serving ------------------------------------------------------------
+
+    def serve(self, address):
+        """Start serving on a (host, port) tuple or a Unix socket path; returns the bound address."""
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            self._server = _UnixServer(address, _Handler)
+        else:
+            self._server = _TCPServer(address, _Handler)
+        self._server.coordinator = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address
+
+    def wait(self, timeout: float = None) -> dict:
+        """Block until a solution is found or the range is exhausted, then summarize."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._finished.wait(0.1):
+            with self._lock:
+                self._expire(time.monotonic())
+                self._check_finished()
+            if deadline is not None and time.monotonic() > deadline:
+                break
+        return self.summary()
+
+    def summary(self) -> dict:
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            hashes = sum(count for count, _ in self._workers.values())
+            solution = self._solution
+            return {
+                "nonce": None if solution is None else solution[0],
+                "digest": None if solution is None else solution[1],
+                "worker": None if solution is None else solution[2],
+                "hashes": hashes,
+                "elapsed": elapsed,
+                "hash_rate": hashes / elapsed if elapsed else 0.0,
+                "worker_rates": {name: count / busy if busy else 0.0
+                                 for name, (count, busy) in self._workers.items()},
+                "requeued": self._requeue_count,
+            }
+
+    def shutdown(self):
+        self._finished.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if isinstance(self._server.server_address, str):
+                os.unlink(self._server.server_address)
+
+
+def _connect(address):
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock
+
+
+def run_worker(address, name: str = None) -> int:
+    """Lease and search nonce ranges until the coordinator says the search is over.
+
+    Returns the number of hashes this worker computed.
+    """
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    total = 0
+    with _connect(address) as sock, sock.makefile("rwb") as stream:
+
+        def call(message):
+            stream.write(json.dumps(message).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise ConnectionError("coordinator closed the connection")
+            return json.loads(line)
+
+        while True:
+            reply = call({"op": "lease", "worker": name})
+            if reply["done"]:
+                return total
+            if "lease" not in reply:
+                time.sleep(reply.get("wait", 0.5))
+                continue
+
+            job, lease = reply["job"], reply["lease"]
+            prefix = bytes.fromhex(job["prefix"])
+            start_time = time.perf_counter()
+            hashes = 0
+            found = None
+            for first in range(lease["start"], lease["stop"], BATCH_SIZE):
+                nonces = np.arange(first, min(first + BATCH_SIZE, lease["stop"]))
+                found = search_batch(job["hash_fn"], prefix, nonces, job["nonce_size"], job["target"])
+                if found is not None:
+                    hashes += found[0] - first + 1
+                    break
+                hashes += len(nonces)
+            total += hashes
+            reply = call({"op": "result", "worker": name, "lease": lease["id"], "hashes": hashes,
+                          "elapsed": time.perf_counter() - start_time,
+                          "nonce": None if found is None else found[0]})
+            if reply["done"]:
+                return total
+
+
+def _local_worker(address, name, hash_fn):
+    load_hash_fn(hash_fn)
+    run_worker(address, name)
+
+
+def run_local(header_prefix: bytes, target: int, workers: int = None, hash_fn: str = "walk",
+              address=None, timeout: float = None, **options) -> dict:
+    """Run a coordinator plus `workers` local worker processes on this machine."""
+    workers = workers or os.cpu_count()
+    load_hash_fn(hash_fn)  # forked workers inherit the import
+    coordinator = Coordinator(header_prefix, target, hash_fn=hash_fn, **options)
+    bound = coordinator.serve(address or ("127.0.0.1", 0))
+    procs = [mp.Process(target=_local_worker, args=(bound, f"local-{k}", hash_fn), daemon=True)
+             for k in range(workers)]
+    for proc in procs:
+        proc.start()
+    try:
+        result = coordinator.wait(timeout)
+    finally:
+        coordinator.shutdown()
+        for proc in procs:
+            proc.join(5)
+            if proc.is_alive():
+                proc.terminate()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed nonce-range coordinator and workers")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    serve = sub.add_parser("serve", help="run the coordinator")
+    serve.add_argument("--listen", default="127.0.0.1:7777", help="host:port or unix:/path")
+    local = sub.add_parser("local", help="coordinator plus local worker processes")
+    local.add_argument("--workers", type=int, default=os.cpu_count())
+    for p in (serve, local):
+        p.add_argument("--hash", default="walk", choices=sorted(HASH_FUNCTIONS))
+        p.add_argument("--zero-bits", type=int, default=8, help="leading zero bits required")
+        p.add_argument("--prefix", default="00" * 28, help="header prefix as hex")
+        p.add_argument("--nonce-size", type=int, default=4)
+        p.add_argument("--range-size", type=int, default=4096)
+        p.add_argument("--lease-timeout", type=float, default=30.0)
+        p.add_argument("--timeout", type=float, default=None)
+    work = sub.add_parser("work", help="run a worker")
+    work.add_argument("--connect", default="127.0.0.1:7777", help="host:port or unix:/path")
+    work.add_argument("--name", default=None)
+    args = parser.parse_args()
+
+    if args.mode == "work":
+        print(f"Worker finished after {run_worker(parse_address(args.connect), args.name)} hashes")
+    else:
+        prefix = bytes.fromhex(args.prefix)
+        size = digest_size(args.hash, len(prefix) + args.nonce_size)
+        target = difficulty_target(args.zero_bits, size)
+        options = dict(hash_fn=args.hash, nonce_size=args.nonce_size,
+                       range_size=args.range_size, lease_timeout=args.lease_timeout)
+        if args.mode == "serve":
+            coordinator = Coordinator(prefix, target, **options)
+            print(f"Listening on {format_address(coordinator.serve(parse_address(args.listen)))}")
+            result = coordinator.wait(args.timeout)
+            coordinator.shutdown()
+        else:
+            result = run_local(prefix, target, workers=args.workers, timeout=args.timeout, **options)
+
+        if result["nonce"] is None:
+            print("No solution found")
+        else:
+            print(f"Nonce: {result['nonce']} (worker {result['worker']})")
+            print(f"Digest (hex): {result['digest'].hex()}")
+        print(f"{result['hashes']} hashes in {result['elapsed']:.2f}s = {result['hash_rate']:.1f} H/s"
+              f" ({result['requeued']} ranges re-leased)")
+        for name, rate in sorted(result["worker_rates"].items()):
+            print(f"  {name}: {rate:.1f} H/s")
@@ -4,9 +4,9 @@ import random
 import matplotlib.pyplot as plt
 from collections import defaultdict
 
-from main import qhash_quantum_walk
+from main import hash_many
 
-# Use the existing qhash_quantum_walk function
+# Use the batched qhash_quantum_walk (hash_many gives the same digests)
 
 def find_probability_distribution(num_bits: int = 3, num_simulations: int = 1024):
     # Generate all possible 3-bit inputs (0 to 7)
@@ -20,10 +20,9 @@ def find_probability_distribution(num_bits: int = 3, num_simulations: int = 1024
     hash_counts = defaultdict(int)
 
     # Run simulations for each input and count the hash results
-    for input_data in inputs:
-        for _ in range(num_simulations):
-            result = qhash_quantum_walk(input_data)
-            hash_counts[result.hex()] += 1  # Store hash result in hexadecimal format
+    batch = [input_data for input_data in inputs for _ in range(num_simulations)]
+    for result in hash_many(batch):
+        hash_counts[result.hex()] += 1  # Store hash result in hexadecimal format
 
     # Calculate probability distribution
     total_counts = sum(hash_counts.values())
@@ -0,0 +1,341 @@
+# Asyncio hashing service with a micro-batching window
+#
+# Clients connect over a Unix socket ("unix:/path") or localhost TCP
+# ("host:port") and send newline-delimited JSON requests:
+#
+#   {"id": 1, "hash": "walk", "data": "<hex>", "deadline_ms": 50}
+#   -> {"id": 1, "digest": "<hex>"}  or  {"id": 1, "error": "..."}
+#
+#   {"op": "stats"} -> request count, batch sizes and p50/p99 latency
+#
+# Requests for the same hash function are collected for window_ms and the
+# group is hashed as one batch in a process pool, so the per-call Python and
+# Qiskit setup is paid once per batch instead of once per request. Each hash
+# function has a bounded queue: when it is full, reading from that client
+# pauses until the batcher catches up.
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import time
+
+import numpy as np
+
+from coordinator import format_address, parse_address
+from miner import HASH_FUNCTIONS, load_hash_fn
+
+
+def hash_batch(name: str, inputs: list) -> list:
+    """Hash a group of inputs in a pool worker; each result is bytes or an error string."""
+    fn = load_hash_fn(name)
+    if name == "walk":
+        from main import hash_many
+        return hash_many([bytearray(x) for x in inputs])
+    results = []
+    for data in inputs:
+        try:
+            results.append(fn(bytearray(data)))
+        except Exception as e:
+            results.append(f"{type(e).__name__}: {e}")
+    return results
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class _Request:
+    __slots__ = ("data", "deadline", "received", "future")
+
+    def __init__(self, data, deadline, received, future):
+        self.data = data
+        self.deadline = deadline
+        self.received = received
+        self.future = future
+
+
+def percentile_ms(latencies, q: float) -> float:
+    if not latencies:
+        return 0.0
+    return float(np.percentile(np.fromiter(latencies, dtype=float), q)) * 1000
+
+
+class HashService:
+    """Serve the project's hash functions with micro-batching over a worker pool."""
+
+    def __init__(self, window_ms: float = 2.0, max_batch: int = 256, max_pending: int = 4096,
+                 default_deadline_ms: float = None, workers: int = None, executor=None,
+                 hash_names=("walk", "bonus256", "qhash")):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.default_deadline = None if default_deadline_ms is None else default_deadline_ms / 1000
+        self.workers = workers or os.cpu_count()
+        self.hash_names = list(hash_names)
+        for name in self.hash_names:
+            if name not in HASH_FUNCTIONS:
+                raise ValueError(f"Unknown hash function {name!r}, expected one of {sorted(HASH_FUNCTIONS)}")
+            load_hash_fn(name)  # forked pool workers inherit the imports
+
+        self._executor = executor
+        self._owns_executor = False  # only a pool made by start() is shut down by stop()
+        self._queues = {}
+        self._slots = None
+        self._tasks = []
+        self._server = None
+        self.latencies = collections.deque(maxlen=10000)
+        self.counts = collections.Counter()
+
+    # --- batching -----------------------------------------------------------
+
+    async def _batcher(self, name):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[name]
+        while True:
+            batch = [await queue.get()]
+            window_end = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = window_end - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            now = loop.time()
+            live = []
+            for request in batch:
+                if request.future.done():
+                    continue  # the client already gave up on it
+                if request.deadline is not None and request.deadline < now:
+                    request.future.set_exception(DeadlineExceeded())
+                    continue
+                live.append(request)
+            if live:
+                # only as many batches in flight as there are pool workers
+                await self._slots.acquire()
+                self._tasks.append(asyncio.create_task(self._run_batch(name, live)))
+                self._tasks = [task for task in self._tasks if not task.done()]
+
+    async def _run_batch(self, name, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, hash_batch, name,
+                                                 [request.data for request in batch])
+        except Exception as e:
+            results = [f"{type(e).__name__}: {e}"] * len(batch)
+        finally:
+            self._slots.release()
+        self.counts["batches"] += 1
+        self.counts["batched"] += len(batch)
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    # --- connections --------------------------------------------------------
+
+    async def _answer(self, request_id, request, writer, lock):
+        loop = asyncio.get_running_loop()
+        try:
+            timeout = None if request.deadline is None else max(request.deadline - loop.time(), 0)
+            result = await asyncio.wait_for(asyncio.shield(request.future), timeout)
+            if isinstance(result, str):
+                reply = {"id": request_id, "error": result}
+            else:
+                reply = {"id": request_id, "digest": bytes(result).hex()}
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            request.future.cancel()
+            self.counts["expired"] += 1
+            reply = {"id": request_id, "error": "deadline exceeded"}
+        self.counts["requests"] += 1
+        self.latencies.append(loop.time() - request.received)
+        async with lock:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+
+    def _parse(self, message, received: float) -> tuple:
+        """(hash name, input bytes, deadline) of a hash request; ValueError says what is wrong."""
+        if not isinstance(message, dict):
+            raise ValueError("request must be a JSON object")
+        name = message.get("hash", "walk")
+        if name not in self._queues:
+            raise ValueError(f"unknown hash {name!r}")
+        if not isinstance(message.get("data"), str):
+            raise ValueError("missing hex string 'data'")
+        data = bytes.fromhex(message["data"])
+        deadline_ms = message.get("deadline_ms")
+        if deadline_ms is not None:
+            if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)):
+                raise ValueError("'deadline_ms' must be a number")
+            return name, data, received + deadline_ms / 1000
+        if self.default_deadline is not None:
+            return name, data, received + self.default_deadline
+        return name, data, None
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def send(reply):
+            async with lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                received = loop.time()
+                message = None
+                try:
+                    message = json.loads(line)
+                    if isinstance(message, dict) and message.get("op") == "stats":
+                        await send(self.stats())
+                        continue
+                    name, data, deadline = self._parse(message, received)
+                except ValueError as e:
+                    # a bad request only fails itself, not the other requests on this connection
+                    request_id = message.get("id") if isinstance(message, dict) else None
+                    await send({"id": request_id, "error": str(e)})
+                    continue
+
+                request = _Request(data, deadline, received, loop.create_future())
+                # backpressure: waits here while this hash function's queue is full
+                await self._queues[name].put(request)
+                task = asyncio.create_task(self._answer(message.get("id"), request, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, ValueError):
+            pass  # ValueError: a line longer than the stream limit
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+    def stats(self) -> dict:
+        batches = self.counts["batches"]
+        return {
+            "requests": self.counts["requests"],
+            "expired": self.counts["expired"],
+            "batches": batches,
+            "mean_batch": self.counts["batched"] / batches if batches else 0.0,
+            "p50_ms": percentile_ms(self.latencies, 50),
+            "p99_ms": percentile_ms(self.latencies, 99),
+        }
+
+    # --- lifecycle ----------------------------------------------------------
+
+    async def start(self, address):
+        """Start serving on a (host, port) tuple or a Unix socket path; returns the bound address."""
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+            self._owns_executor = True
+        self._slots = asyncio.Semaphore(self.workers)
+        for name in self.hash_names:
+            self._queues[name] = asyncio.Queue(self.max_pending)
+            self._tasks.append(asyncio.create_task(self._batcher(name)))
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            self._server = await asyncio.start_unix_server(self._handle, path=address)
+        else:
+            self._server = await asyncio.start_server(self._handle, *address)
+        bound = self._server.sockets[0].getsockname()
+        return bound if isinstance(bound, str) else bound[:2]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor, self._owns_executor = None, False
+
+
+async def open_client(address):
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+
+async def load_test(address, name="walk", clients=32, requests=200, input_size=32,
+                    deadline_ms=None) -> dict:
+    """Drive the service from `clients` concurrent connections and time every request."""
+    latencies = []
+    errors = collections.Counter()
+    rng = np.random.default_rng(0)
+
+    async def client(k):
+        reader, writer = await open_client(address)
+        for i in range(requests):
+            message = {"id": i, "hash": name, "data": rng.bytes(input_size).hex()}
+            if deadline_ms is not None:
+                message["deadline_ms"] = deadline_ms
+            start = time.perf_counter()
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply:
+                errors[reply["error"]] += 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(k) for k in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+        "errors": dict(errors),
+    }
+
+
+async def _serve_forever(args):
+    service = HashService(window_ms=args.window_ms, max_batch=args.max_batch,
+                          max_pending=args.max_pending, default_deadline_ms=args.deadline_ms,
+                          workers=args.workers)
+    bound = await service.start(parse_address(args.listen))
+    print(f"Listening on {format_address(bound)}")
+    while True:
+        await asyncio.sleep(args.report_every)
+        stats = service.stats()
+        print(f"{stats['requests']} requests, mean batch {stats['mean_batch']:.1f}, "
+              f"p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+              f"{stats['expired']} expired")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching hash service")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--listen", default="127.0.0.1:7878", help="host:port or unix:/path")
+    serve.add_argument("--window-ms", type=float, default=2.0)
+    serve.add_argument("--max-batch", type=int, default=256)
+    serve.add_argument("--max-pending", type=int, default=4096)
+    serve.add_argument("--deadline-ms", type=float, default=None, help="default per-request deadline")
+    serve.add_argument("--workers", type=int, default=os.cpu_count())
+    serve.add_argument("--report-every", type=float, default=5.0)
+    bench = sub.add_parser("bench", help="load-test a running service")
+    bench.add_argument("--connect", default="127.0.0.1:7878")
+    bench.add_argument("--hash", default="walk", choices=sorted(HASH_FUNCTIONS))
+    bench.add_argument("--clients", type=int, default=32)
+    bench.add_argument("--requests", type=int, default=200)
+    bench.add_argument("--deadline-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        asyncio.run(_serve_forever(args))
+    else:
+        result = asyncio.run(load_test(parse_address(args.connect), args.hash, args.clients,
+                                       args.requests, deadline_ms=args.deadline_ms))
+        print(f"{result['requests']} requests at {result['throughput']:.1f} req/s, "
+              f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+        if result["errors"]:
+            print(f"errors: {result['errors']}")
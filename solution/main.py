@@ -1,64 +1,488 @@
 #Challenge Solution 
 
+import functools
 import math
+import os
+import numpy as np
 from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
 from qiskit.quantum_info import Statevector, Pauli
 
+from qsim import deterministic
+from qsim.circuit import compile_circuit
+from qsim.readout import SINGLE_BYTE_MARGIN, near_byte_edge, pauli_expectations
+
 
 NUM_POSITION_QUBITS = 4  # for 16 positions
 NUM_WALK_STEPS = 32 #gotta check this
 TOTAL_QUBITS = NUM_POSITION_QUBITS + 1  # +1 coin qubit
 
+COIN = 0
+POS_QUBITS = list(range(1, TOTAL_QUBITS))
+START_QUBIT = POS_QUBITS[len(POS_QUBITS) // 2]  # walker starts roughly centered
+
+# Pauli labels are big-endian, so label position i reads qubit TOTAL_QUBITS - 1 - i
+READOUT_QUBITS = [TOTAL_QUBITS - 1 - i for i in POS_QUBITS]
+
+DEFAULT_ENGINE = "table"
+
+
+def xor_fold(state: np.ndarray, data, offset: int = 0) -> int:
+    """XOR the bytes of data into the uint8 array state, in place, and return their count.
+
+    Byte i of data lands on state[(offset + i) % len(state)], so folding a
+    stream chunk by chunk (offset = bytes folded so far) equals folding it
+    whole. data is any buffer (bytes, memoryview, mmap) and is not copied.
+    """
+    size = len(state)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    head = min(len(buf), (size - offset % size) % size)
+    state[offset % size:offset % size + head] ^= buf[:head]
+    body = (len(buf) - head) // size * size
+    if body:
+        # whole blocks as rows of a view on data, XOR-reduced column by column
+        state ^= np.bitwise_xor.reduce(buf[head:head + body].reshape(-1, size), axis=0)
+    tail = buf[head + body:]
+    state[:len(tail)] ^= tail
+    return len(buf)
+
 
 def preprocess_input(data: bytearray, size: int = 32) -> bytearray:
     if len(data) > size:
-        reduced = bytearray(size)
-        for i in range(len(data)):
-            reduced[i % size] ^= data[i]
-        return reduced
+        reduced = np.zeros(size, dtype=np.uint8)
+        xor_fold(reduced, data)
+        return bytearray(reduced.tobytes())
     elif len(data) < size:
-        return data + bytearray([0] * (size - len(data)))
+        return bytearray(data) + bytearray(size - len(data))
     return data
 
 
-def qhash_quantum_walk(input_data: bytearray) -> bytes:
-    original_size = len(input_data)
-    data = preprocess_input(input_data)
+def tile_digest(hash_bytes: bytes, size: int, out=None):
+    """hash_bytes repeated up to size bytes, as the doubling loop produced them.
 
-    qc = QuantumCircuit(TOTAL_QUBITS)
-    coin = 0
-    pos_qubits = list(range(1, TOTAL_QUBITS))
+    The copies are written straight into out, a writable buffer of size bytes,
+    which is returned; without out the result is a new bytes object.
+    """
+    buf = bytearray(size) if out is None else out
+    view = np.frombuffer(buf, dtype=np.uint8)
+    if len(view) != size:
+        raise ValueError(f"Output buffer must hold {size} bytes, got {len(view)}")
+    pattern = np.frombuffer(bytes(hash_bytes), dtype=np.uint8)
+    whole = size // len(pattern) * len(pattern)
+    view[:whole].reshape(-1, len(pattern))[:] = pattern
+    view[whole:] = pattern[:size - whole]
+    return bytes(buf) if out is None else out
 
-    # Start walker roughly centered
-    center = len(pos_qubits) // 2
-    qc.x(pos_qubits[center])
 
-    for step in range(NUM_WALK_STEPS):
+def walk_schedule(data: bytearray, first_step: int = 0) -> list:
+    """Angle byte of each walk step from first_step on (data is already preprocessed)."""
+    schedule = []
+    for step in range(first_step, NUM_WALK_STEPS):
         byte_val = sum([data[(step + i) % len(data)] for i in range(4)]) % 256
-        theta = (byte_val % 256) * math.pi / 128  # in [0, 2π]
-        qc.ry(theta, coin)
+        schedule.append(byte_val)
+    return schedule
+
+
+def _step_angle(byte_val: int) -> float:
+    return (byte_val % 256) * math.pi / 128  # in [0, 2π]
+
+
+def walk_angles(schedule) -> np.ndarray:
+    """RY angle of each walk step, as _step_angle gives them."""
+    return np.asarray(schedule, dtype=np.int64) % 256 * math.pi / 128
 
-        for i in reversed(range(len(pos_qubits))):
-            qc.cx(coin, pos_qubits[i])
+
+@functools.lru_cache(maxsize=None)
+def walk_template(num_steps: int = NUM_WALK_STEPS) -> QuantumCircuit:
+    """The walk circuit with one RY angle Parameter per step.
+
+    Only the angles depend on the input, so the circuit is built once and
+    each call binds an array of angles: walk_template().assign_parameters(
+    walk_angles(schedule)). Do not modify the cached circuit in place.
+    """
+    theta = ParameterVector("theta", num_steps)
+    qc = QuantumCircuit(TOTAL_QUBITS)
+    qc.x(START_QUBIT)
+
+    for step in range(num_steps):
+        qc.ry(theta[step], COIN)
+
+        for i in reversed(range(len(POS_QUBITS))):
+            qc.cx(COIN, POS_QUBITS[i])
+    return qc
+
+
+def _walk_expectations_qiskit(schedule: list) -> list:
+    """Reference path: bind the walk circuit and read <Z>, <X> with Qiskit."""
+    qc = walk_template(len(schedule)).assign_parameters(walk_angles(schedule))
 
     sv = Statevector.from_instruction(qc)
 
     # Collect expectations
-    hash_bytes = bytearray()
-    for i in pos_qubits:
+    exps = []
+    for i in POS_QUBITS:
         z_op = Pauli("I" * i + "Z" + "I" * (TOTAL_QUBITS - i - 1))
         x_op = Pauli("I" * i + "X" + "I" * (TOTAL_QUBITS - i - 1))
 
-        z_val = sv.expectation_value(z_op).real
-        x_val = sv.expectation_value(x_op).real
+        exps.append(sv.expectation_value(z_op).real)
+        exps.append(sv.expectation_value(x_op).real)
+    return exps
+
+
+# --- NumPy engine --------------------------------------------------------
+# The 5-qubit walk is only 32 amplitudes, so we evolve them directly instead of
+# paying for QuantumCircuit/Statevector objects. Every floating point step is
+# done in the same order as Qiskit so the hash bytes come out identical.
+
+_INDICES = np.arange(2 ** TOTAL_QUBITS)
+_POS_MASK = sum(1 << q for q in POS_QUBITS)
+
+# The CX ladder flips every position bit when the coin bit is set; as a gather
+# this is new_state = state[_CX_LADDER].
+_CX_LADDER = np.where(_INDICES & (1 << COIN), _INDICES ^ _POS_MASK, _INDICES)
+
+
+def _apply_coin(state: np.ndarray, theta: float) -> np.ndarray:
+    """RY(theta) on the coin, contracted exactly like Statevector.evolve."""
+    c, s = math.cos(theta / 2), math.sin(theta / 2)
+    ry = np.array([[c, -s], [s, c]], dtype=complex)
+    # coin axis first, the other 4 qubits flattened into columns
+    pairs = np.dot(ry, state.reshape(-1, 2).T.reshape(2, -1))
+    return pairs.T.reshape(-1)
+
+
+def _walk_readout(state: np.ndarray) -> list:
+    """<Z>, <X> for every readout qubit, interleaved like the Qiskit path."""
+    return pauli_expectations(state, READOUT_QUBITS, "ZX", exact_near=near_byte_edge).ravel().tolist()
+
+
+def _walk_expectations_numpy(schedule: list) -> list:
+    state = np.zeros(2 ** TOTAL_QUBITS, dtype=complex)
+    state[1 << START_QUBIT] = 1.0
+
+    for byte_val in schedule:
+        state = _apply_coin(state, _step_angle(byte_val))
+        state = state[_CX_LADDER]
+
+    return _walk_readout(state)
+
+
+# --- Table-driven engine -------------------------------------------------
+# A walk step depends only on its angle byte, so there are just 256 distinct
+# step operators. Each one is stored in coin-conditioned permutation form: a
+# 2x2 coin block plus one gather shared by all bytes. The state is kept
+# coin-major, shape (2, 16) with row = coin bit and column = index >> 1, which
+# is the exact layout np.dot sees in _apply_coin. The CX ladder and the layout
+# shuffle then fold into a single gather, and a step is one lookup, one np.dot
+# and one gather with no gate construction.
+
+STEP_TABLE_VERSION = 1
+# Optional cached table artifact (written with save_step_table)
+STEP_TABLE_PATH = os.environ.get("QHASH_WALK_TABLE")
+
+_HALF = 2 ** TOTAL_QUBITS // 2
+# where basis index i lives in the flattened coin-major layout
+_COIN_MAJOR = (_INDICES & 1) * _HALF + (_INDICES >> 1)
+
+
+def build_step_table() -> tuple:
+    """Coin blocks for every angle byte, shape (256, 2, 2), and the step gather."""
+    coins = np.empty((256, 2, 2), dtype=complex)
+    for byte_val in range(256):
+        theta = _step_angle(byte_val)
+        c, s = math.cos(theta / 2), math.sin(theta / 2)
+        coins[byte_val] = np.array([[c, -s], [s, c]], dtype=complex)
+
+    gather = np.empty_like(_COIN_MAJOR)
+    gather[_COIN_MAJOR] = _COIN_MAJOR[_CX_LADDER]
+    return coins, gather
+
+
+def save_step_table(path: str) -> None:
+    coins, gather = build_step_table()
+    np.savez(path, version=STEP_TABLE_VERSION, coins=coins, gather=gather)
+
+
+def load_step_table(path: str) -> tuple:
+    with np.load(path) as table:
+        if int(table["version"]) != STEP_TABLE_VERSION:
+            raise ValueError(f"Step table {path} has version {int(table['version'])}, "
+                             f"expected {STEP_TABLE_VERSION}")
+        coins, gather = table["coins"], table["gather"]
+    if coins.shape != (256, 2, 2) or gather.shape != _INDICES.shape:
+        raise ValueError(f"Step table {path} does not match a {TOTAL_QUBITS}-qubit walk")
+    return coins, gather
+
+
+if STEP_TABLE_PATH and os.path.exists(STEP_TABLE_PATH):
+    STEP_COINS, STEP_GATHER = load_step_table(STEP_TABLE_PATH)
+else:
+    STEP_COINS, STEP_GATHER = build_step_table()
+
+
+def _table_start_state() -> np.ndarray:
+    """Coin-major (2, 16) state of the walker before the first step."""
+    state = np.zeros(2 ** TOTAL_QUBITS, dtype=complex)
+    state[_COIN_MAJOR[1 << START_QUBIT]] = 1.0
+    return state.reshape(2, -1)
+
+
+def _run_table(state: np.ndarray, schedule: list, coins: np.ndarray = None) -> np.ndarray:
+    coins = STEP_COINS if coins is None else coins
+    for byte_val in schedule:
+        state = np.dot(coins[byte_val], state).reshape(-1)[STEP_GATHER].reshape(2, -1)
+    return state
+
+
+def _walk_expectations_table(schedule: list) -> list:
+    state = _run_table(_table_start_state(), schedule)
+    # back to basis order for the readout
+    return _walk_readout(state.T.reshape(-1))
+
+
+# --- complex64 engine ------------------------------------------------------
+# The table walk in single precision, read in double. Expectations move by up
+# to SINGLE_TOLERANCE, so a walk with any value within SINGLE_BYTE_MARGIN of a
+# byte edge is redone with the float64 table and the bytes never change.
+
+
+def _walk_expectations_complex64(schedule: list) -> list:
+    state = _run_table(_table_start_state().astype(np.complex64), schedule, STEP_COINS.astype(np.complex64))
+    exps = _walk_readout(state.T.reshape(-1).astype(complex))
+    if near_byte_edge(exps, SINGLE_BYTE_MARGIN):
+        return _walk_expectations_table(schedule)
+    return exps
+
+
+# --- Deterministic engine ---------------------------------------------------
+# The walk run through qsim.deterministic: no BLAS, no SIMD-dependent kernels
+# and a fixed summation tree, so the bytes are the same on every machine, for
+# any thread count and any batch size (hash_many(..., deterministic=True)
+# gives the same digests). Its values are canonical rather than Qiskit's and
+# can differ from the other engines only for a value within ~1e-15 of a byte edge.
+
+
+@functools.lru_cache(maxsize=None)
+def walk_kernel(num_steps: int = NUM_WALK_STEPS):
+    """walk_template compiled once; values are the step angles in order."""
+    return compile_circuit(walk_template(num_steps))
+
+
+def _walk_deterministic_many(byte_vals: np.ndarray) -> np.ndarray:
+    """(N, 8) readout for each row of step bytes, computed deterministically."""
+    re, im = deterministic.run(walk_kernel(byte_vals.shape[1]), walk_angles(byte_vals))
+    return deterministic.expectations(re, im, READOUT_QUBITS, "ZX").reshape(len(byte_vals), -1)
+
+
+def _walk_expectations_deterministic(schedule: list) -> list:
+    return _walk_deterministic_many(np.array([schedule])).ravel().tolist()
+
+
+# --- Batched NumPy engine -------------------------------------------------
+# The table-driven walk vectorized over a leading batch axis. Each step the
+# rows are sorted by angle byte so rows sharing a coin block are contracted in
+# one np.dot call, which gives the same per-element result as the scalar path.
+
+
+def preprocess_many(data: np.ndarray, size: int = 32) -> np.ndarray:
+    """preprocess_input for every row of an (N, L) uint8 array."""
+    n, length = data.shape
+    if length > size:
+        # XOR-folding is unchanged by zero padding, so fold whole blocks
+        padded = np.zeros((n, -(-length // size) * size), dtype=np.uint8)
+        padded[:, :length] = data
+        return np.bitwise_xor.reduce(padded.reshape(n, -1, size), axis=1)
+    elif length < size:
+        padded = np.zeros((n, size), dtype=np.uint8)
+        padded[:, :length] = data
+        return padded
+    return data
+
+
+def walk_byte_values(data: np.ndarray) -> np.ndarray:
+    """Per-step angle byte (theta = byte * pi / 128) for preprocessed (N, 32) rows."""
+    data = data.astype(np.int64)
+    window = sum(np.roll(data, -i, axis=1) for i in range(4)) % 256
+    steps = np.arange(NUM_WALK_STEPS) % data.shape[1]
+    return window[:, steps]
+
+
+def _walk_readout_many(states: np.ndarray) -> np.ndarray:
+    """(N, 8) array of <Z>, <X> pairs; the batched _walk_readout."""
+    return pauli_expectations(states, READOUT_QUBITS, "ZX", exact_near=near_byte_edge).reshape(len(states), -1)
+
+
+def _walk_expectations_many(byte_vals: np.ndarray, start: np.ndarray = None) -> np.ndarray:
+    """Readout of the walk for each row of step bytes.
+
+    start is the coin-major (2, 16) state the walks begin from, the fresh
+    walker by default.
+    """
+    n = byte_vals.shape[0]
+    if start is None:
+        start = _table_start_state()
+    # coin-major rows; rows get reordered every step, rows_at tracks the inputs
+    states = np.tile(start.reshape(1, -1), (n, 1))
+    rows_at = np.arange(n)
+    coin_of, col_of = np.divmod(STEP_GATHER, _HALF)
+
+    for step in range(byte_vals.shape[1]):
+        step_vals = byte_vals[rows_at, step]
+        order = np.argsort(step_vals, kind="stable")
+        rows_at, step_vals = rows_at[order], step_vals[order]
+        cols = states[order].reshape(n, 2, _HALF).transpose(1, 0, 2)
+
+        values, starts = np.unique(step_vals, return_index=True)
+        bounds = list(starts[1:]) + [n]
+        out = np.empty_like(cols)
+        for b, lo, hi in zip(values, starts, bounds):
+            group = cols[:, lo:hi].reshape(2, -1)
+            out[:, lo:hi] = np.dot(STEP_COINS[b], group).reshape(2, hi - lo, -1)
+
+        # CX ladder and layout shuffle, straight back into (n, 32) rows
+        states = out[coin_of[None, :], np.arange(n)[:, None], col_of[None, :]]
+
+    basis = np.empty_like(states)
+    basis[rows_at] = states[:, _COIN_MAJOR]
+    return _walk_readout_many(basis)
+
+
+def _digest_matrix(exps: np.ndarray, original_size: int) -> np.ndarray:
+    hash_bytes = ((exps + 1) / 2 * 255).astype(np.int64).astype(np.uint8)
+    # repeating the 8 readout bytes is what the doubling loop produces
+    return hash_bytes[:, np.arange(original_size) % hash_bytes.shape[1]]
+
+
+def _hash_matrix(data: np.ndarray, deterministic: bool = False) -> np.ndarray:
+    byte_vals = walk_byte_values(preprocess_many(data))
+    if deterministic:
+        exps = _walk_deterministic_many(byte_vals)
+    else:
+        exps = _walk_expectations_many(byte_vals)
+    return _digest_matrix(exps, data.shape[1])
+
+
+def hash_many(inputs, deterministic: bool = False):
+    """Hash a batch of inputs with the vectorized walk.
+
+    inputs is either an (N, L) uint8 array, giving an (N, L) uint8 array of
+    digests, or a list of byte strings, giving a list of bytes in the same
+    order (inputs are grouped by length and each group is hashed as a batch).
+    Every digest matches qhash_quantum_walk byte for byte, or
+    qhash_quantum_walk(..., engine="deterministic") with deterministic=True.
+    """
+    if isinstance(inputs, np.ndarray):
+        if inputs.ndim != 2:
+            raise ValueError("Batched input must be a 2-D (N, L) array")
+        if len(inputs) == 0:
+            return np.zeros(inputs.shape, dtype=np.uint8)
+        return _hash_matrix(inputs.astype(np.uint8, copy=False), deterministic)
+
+    buckets = {}
+    for i, item in enumerate(inputs):
+        buckets.setdefault(len(item), []).append(i)
+
+    results = [None] * len(inputs)
+    for length, positions in buckets.items():
+        rows = np.frombuffer(b"".join(bytes(inputs[i]) for i in positions), dtype=np.uint8)
+        digests = _hash_matrix(rows.reshape(len(positions), length), deterministic)
+        for i, digest in zip(positions, digests):
+            results[i] = digest.tobytes()
+    return results
+
+
+ENGINES = {
+    "table": _walk_expectations_table,
+    "numpy": _walk_expectations_numpy,
+    "qiskit": _walk_expectations_qiskit,
+    "complex64": _walk_expectations_complex64,
+    "deterministic": _walk_expectations_deterministic,
+}
+
+
+def qhash_quantum_walk(input_data: bytearray, engine: str = DEFAULT_ENGINE, out=None) -> bytes:
+    """The walk hash of input_data, as many bytes as the input.
+
+    input_data may be any byte buffer (bytes, memoryview, mmap); large inputs
+    are folded through a view without copying. Pass a writable buffer of
+    len(input_data) bytes as out to have the digest tiled into it (and
+    returned) instead of allocating a new bytes object.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+    original_size = len(input_data)
+    data = preprocess_input(input_data)
+
+    exps = ENGINES[engine](walk_schedule(data))
+
+    hash_bytes = bytearray()
+    for val in exps:
+        hash_bytes.append(int((val + 1) / 2 * 255))
+
+    return tile_digest(hash_bytes, original_size, out)
+
+
+class WalkHasher:
+    """qhash_quantum_walk primed with a fixed prefix, for nonce searches.
+
+    Candidates are prefix + nonce with a nonce of nonce_size bytes. Step s of
+    the walk only reads bytes s..s+3 (mod 32) of the preprocessed input, so
+    every step before the first one whose window covers a nonce byte is the
+    same for all candidates. That midstate is computed once and each
+    candidate resumes from it.
+    """
+
+    def __init__(self, prefix: bytes, nonce_size: int = 4):
+        self.prefix = bytes(prefix)
+        self.nonce_size = nonce_size
+        self.size = len(self.prefix) + nonce_size
+
+        # preprocessed input with a zero nonce; nonce byte j is XORed in at
+        # _nonce_pos[j] (plain placement when the input is not folded)
+        self._base = bytes(preprocess_input(bytearray(self.prefix) + bytearray(nonce_size)))
+        self._nonce_pos = [(len(self.prefix) + j) % len(self._base) for j in range(nonce_size)]
+
+        touched = set(self._nonce_pos)
+        self.shared_steps = NUM_WALK_STEPS
+        for step in range(NUM_WALK_STEPS):
+            if any((step + i) % len(self._base) in touched for i in range(4)):
+                self.shared_steps = step
+                break
+
+        schedule = walk_schedule(bytearray(self._base))
+        self._midstate = _run_table(_table_start_state(), schedule[:self.shared_steps])
+
+    def _data(self, nonce: bytes) -> bytearray:
+        if len(nonce) != self.nonce_size:
+            raise ValueError(f"Nonce must be {self.nonce_size} bytes, got {len(nonce)}")
+        data = bytearray(self._base)
+        for pos, byte in zip(self._nonce_pos, nonce):
+            data[pos] ^= byte
+        return data
+
+    def hash(self, nonce: bytes) -> bytes:
+        """Same digest as qhash_quantum_walk(prefix + nonce)."""
+        schedule = walk_schedule(self._data(nonce), self.shared_steps)
+        state = _run_table(self._midstate, schedule)
+
+        hash_bytes = bytearray()
+        for val in _walk_readout(state.T.reshape(-1)):
+            hash_bytes.append(int((val + 1) / 2 * 255))
 
-        hash_bytes.append(int((z_val + 1) / 2 * 255))
-        hash_bytes.append(int((x_val + 1) / 2 * 255))
+        return tile_digest(hash_bytes, self.size)
 
-    while len(hash_bytes) < original_size:
-        hash_bytes.extend(hash_bytes)
+    def hash_many(self, nonces: np.ndarray) -> np.ndarray:
+        """Digests for an (N, nonce_size) uint8 array of nonces, as an (N, size) array."""
+        nonces = np.asarray(nonces, dtype=np.uint8)
+        if nonces.ndim != 2 or nonces.shape[1] != self.nonce_size:
+            raise ValueError(f"Nonces must be an (N, {self.nonce_size}) array")
+        data = np.tile(np.frombuffer(self._base, dtype=np.uint8), (len(nonces), 1))
+        for j, pos in enumerate(self._nonce_pos):
+            data[:, pos] ^= nonces[:, j]
 
-    return bytes(hash_bytes[:original_size])
+        byte_vals = walk_byte_values(data)[:, self.shared_steps:]
+        exps = _walk_expectations_many(byte_vals, start=self._midstate)
+        return _digest_matrix(exps, self.size)
 # Testing the optimized function
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+# Incremental Merkle trees over the 256-bit bonus hash (Bonus.py)
+#
+# Nodes are kept level by level, each level one (capacity, 32) uint8 array that
+# doubles when it fills up: level 0 holds the leaf hashes and level k node j
+# hashes nodes 2j and 2j+1 of level k-1. A node without a right sibling moves
+# up unchanged. Changing a leaf only dirties its ancestors, so update, append
+# and pop rehash O(log n) nodes; a batch of changes rehashes each dirty level
+# in one batch, which is spread over an executor when one is given.
+#
+# This is not a secure Merkle tree. The bonus hash XOR-folds its input into 32
+# bytes and qhash_quantum_walk gives about 128 distinct digests over random
+# inputs, so collisions, and with them forged leaves, forged subtrees and
+# second preimages of a root, are easy to find. Use it to study incremental
+# rehashing and batching, not to prove membership.
+#
+# Leaves and internal nodes are still hashed in separate domains, after RFC
+# 6962: a leaf hashes LEAF_TAG + item and a node NODE_TAG + left +
+# NODE_SEPARATOR + right, so an honest leaf's bytes are never a node's. This
+# keeps the tree's layout unambiguous; it is no defence against forgery,
+# since any leaf can be crafted to collide with a node through the hash.
+# RFC 6962's 0x00 leaf tag would not separate anything here: a zero byte adds
+# nothing to the XOR fold, and the walk maps a rotated input to the same
+# digest, so both tags are nonzero and differ.
+#
+# Bonus folds inputs past 32 bytes by XOR, so hashing left + right would give
+# right + left the same parent. A separator byte between the children shifts
+# the right one by a byte in the fold, which keeps their order in the root
+# (reversing the right child does not: the walk maps a byte-reversed input to
+# the same digest).
+
+import functools
+import numpy as np
+from Bonus import DEFAULT_ENGINE, ENGINES, qhash_quantum_walk
+
+DIGEST_SIZE = 32
+LEAF_TAG = b"\x02"
+NODE_TAG = b"\x01"
+NODE_SEPARATOR = b"\x01"
+TASKS_PER_LEVEL = 64  # a dirty level is sent to the executor in about this many batches
+
+
+def leaf_hash(data, engine: str = DEFAULT_ENGINE) -> bytes:
+    """The leaf hash of one item (transaction) as stored in a MerkleTree."""
+    return qhash_quantum_walk(bytearray(LEAF_TAG + bytes(data)), engine=engine)
+
+
+def node_input(left: bytes, right: bytes) -> bytes:
+    """The bytes hashed for a parent node."""
+    return NODE_TAG + bytes(left) + NODE_SEPARATOR + bytes(right)
+
+
+def verify_proof(leaf: bytes, proof: list, root: bytes, engine: str = DEFAULT_ENGINE) -> bool:
+    """Check a MerkleTree.proof against a root, starting from the leaf hash."""
+    node = bytes(leaf)
+    for sibling, sibling_is_left in proof:
+        pair = node_input(sibling, node) if sibling_is_left else node_input(node, sibling)
+        node = qhash_quantum_walk(bytearray(pair), engine=engine)
+    return node == bytes(root)
+
+
+def level_sizes(count: int) -> list:
+    """Number of nodes on each level of a tree with count leaves, leaves first."""
+    sizes = [count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+class MerkleTree:
+    """A Merkle tree over leaf_hash(item) for a list of items.
+
+    executor is any concurrent.futures executor; batches of more than one
+    hash are mapped over it, single path updates are hashed in this process.
+    The root does not depend on the executor or on the order of updates.
+    """
+
+    def __init__(self, items=(), engine: str = DEFAULT_ENGINE, executor=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {sorted(ENGINES)}")
+        self.engine = engine
+        self.executor = executor
+        self._count = 0
+        self._levels = [np.zeros((1, DIGEST_SIZE), dtype=np.uint8)]
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _hash_batch(self, inputs: list) -> list:
+        fn = functools.partial(qhash_quantum_walk, engine=self.engine)
+        if self.executor is None or len(inputs) < 2:
+            return [fn(x) for x in inputs]
+        chunksize = max(1, len(inputs) // TASKS_PER_LEVEL)
+        return list(self.executor.map(fn, inputs, chunksize=chunksize))
+
+    def _reserve(self, count: int) -> None:
+        # grow each level's array to at least the nodes it needs, doubling
+        for k, size in enumerate(level_sizes(count)):
+            if k == len(self._levels):
+                self._levels.append(np.zeros((1, DIGEST_SIZE), dtype=np.uint8))
+            level = self._levels[k]
+            if size > len(level):
+                grown = np.zeros((max(size, 2 * len(level)), DIGEST_SIZE), dtype=np.uint8)
+                grown[:len(level)] = level
+                self._levels[k] = grown
+
+    def _rehash(self, dirty) -> None:
+        """Recompute the ancestors of the dirty leaf indexes, a level at a time."""
+        sizes = level_sizes(self._count)
+        dirty = {i for i in dirty if i < self._count}
+        for k in range(1, len(sizes)):
+            below, level = self._levels[k - 1], self._levels[k]
+            dirty = sorted({i >> 1 for i in dirty})
+            pairs = [j for j in dirty if 2 * j + 1 < sizes[k - 1]]
+            for j in dirty:
+                if 2 * j + 1 >= sizes[k - 1]:
+                    level[j] = below[2 * j]
+            inputs = [bytearray(node_input(below[2 * j], below[2 * j + 1])) for j in pairs]
+            for j, digest in zip(pairs, self._hash_batch(inputs)):
+                level[j] = np.frombuffer(digest, dtype=np.uint8)
+
+    def extend(self, items) -> None:
+        """Append many items; leaves and each dirty level are hashed as batches."""
+        items = [bytearray(LEAF_TAG + bytes(x)) for x in items]
+        if not items:
+            return
+        start = self._count
+        self._reserve(start + len(items))
+        leaves = self._levels[0]
+        for i, digest in enumerate(self._hash_batch(items)):
+            leaves[start + i] = np.frombuffer(digest, dtype=np.uint8)
+        self._count += len(items)
+        # the old right edge is made of ancestors of the new leaves too
+        self._rehash(range(start, self._count))
+
+    def append(self, item) -> None:
+        self.extend([item])
+
+    def update(self, index: int, item) -> None:
+        """Replace the item at index; rehashes the leaf and its path to the root."""
+        index = self._check_index(index)
+        self._levels[0][index] = np.frombuffer(leaf_hash(item, self.engine), dtype=np.uint8)
+        self._rehash([index])
+
+    def pop(self) -> bytes:
+        """Drop the last item and return its leaf hash."""
+        if not self._count:
+            raise IndexError("pop from an empty MerkleTree")
+        self._count -= 1
+        self._rehash([self._count - 1])
+        return self._levels[0][self._count].tobytes()
+
+    def remove(self, index: int) -> bytes:
+        """Drop the item at index by moving the last item into its place.
+
+        Two paths are rehashed instead of every leaf after index; the order of
+        the remaining items changes. Returns the removed leaf hash.
+        """
+        index = self._check_index(index)
+        leaves = self._levels[0]
+        removed = leaves[index].tobytes()
+        leaves[index] = leaves[self._count - 1]
+        self._count -= 1
+        self._rehash([index, self._count - 1])
+        return removed
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("MerkleTree index out of range")
+        return index
+
+    def leaf(self, index: int) -> bytes:
+        return self._levels[0][self._check_index(index)].tobytes()
+
+    def root(self) -> bytes:
+        if not self._count:
+            raise ValueError("An empty MerkleTree has no root")
+        return self._levels[len(level_sizes(self._count)) - 1][0].tobytes()
+
+    def proof(self, index: int) -> list:
+        """Sibling hashes from the leaf up, as (hash, sibling_is_left) pairs.
+
+        Levels where the node moves up without a sibling are skipped; pass the
+        list to verify_proof with the leaf hash and the root.
+        """
+        index = self._check_index(index)
+        proof = []
+        for level, size in zip(self._levels, level_sizes(self._count)[:-1]):
+            sibling = index ^ 1
+            if sibling < size:
+                proof.append((level[sibling].tobytes(), sibling < index))
+            index >>= 1
+        return proof
@@ -0,0 +1,256 @@
+# Proof-of-work miner for the project's hash functions
+#
+# The nonce space is split across a pool of worker processes (worker k tries
+# nonces k, k + W, k + 2W, ...). A candidate is header_prefix + nonce and it
+# wins when its digest, read as a big-endian integer, is below the target.
+
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+SOLUTION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SOLUTION_DIR)
+
+# name -> (module, function, directory the module lives in)
+HASH_FUNCTIONS = {
+    "walk": ("main", "qhash_quantum_walk", SOLUTION_DIR),
+    "bonus": ("hash", "quantum_hash", os.path.join(SOLUTION_DIR, "bonus")),
+    "bonus256": ("Bonus", "qhash_quantum_walk", SOLUTION_DIR),
+    "qhash": ("qhash", "qhash", REPO_ROOT),
+}
+
+# hash functions with a fixed-size digest; the others match the input size
+FIXED_DIGEST_SIZES = {"qhash": 32, "bonus256": 32}
+
+BATCH_SIZE = 256  # nonces per worker between stop checks
+POLL_INTERVAL = 0.5  # seconds between checks for workers that died without reporting
+
+
+def load_hash_fn(name: str):
+    """Import one of the HASH_FUNCTIONS by name."""
+    if name not in HASH_FUNCTIONS:
+        raise ValueError(f"Unknown hash function {name!r}, expected one of {sorted(HASH_FUNCTIONS)}")
+    module_name, fn_name, directory = HASH_FUNCTIONS[name]
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return getattr(importlib.import_module(module_name), fn_name)
+
+
+def digest_size(name: str, input_size: int) -> int:
+    return FIXED_DIGEST_SIZES.get(name, input_size)
+
+
+def difficulty_target(zero_bits: int, digest_size: int) -> int:
+    """Target that needs zero_bits leading zero bits in a digest_size-byte digest."""
+    return 1 << (8 * digest_size - zero_bits)
+
+
+def meets_target(digest: bytes, target: int) -> bool:
+    return int.from_bytes(digest, "big") < target
+
+
+def _nonce_bytes(nonces: np.ndarray, nonce_size: int) -> np.ndarray:
+    """(N, nonce_size) little-endian byte rows for an array of nonces."""
+    shifts = 8 * np.arange(nonce_size, dtype=np.uint64)
+    return ((nonces.astype(np.uint64)[:, None] >> shifts) & 0xFF).astype(np.uint8)
+
+
+def search_batch(hash_fn, header_prefix, nonces, nonce_size, target):
+    """Hash one batch of nonces, returning the first winner as (nonce, digest) or None."""
+    if hash_fn == "walk":
+        # all candidates share the prefix, so resume from the cached midstate
+        from main import WalkHasher
+        key = (header_prefix, nonce_size)
+        if key not in search_batch.walk_hashers:
+            search_batch.walk_hashers[key] = WalkHasher(header_prefix, nonce_size)
+        digests = search_batch.walk_hashers[key].hash_many(_nonce_bytes(nonces, nonce_size))
+        for nonce, digest in zip(nonces, digests):
+            if meets_target(digest.tobytes(), target):
+                return int(nonce), digest.tobytes()
+        return None
+
+    fn = load_hash_fn(hash_fn) if isinstance(hash_fn, str) else hash_fn
+    for nonce in nonces:
+        candidate = bytearray(header_prefix + int(nonce).to_bytes(nonce_size, "little"))
+        digest = fn(candidate)
+        if meets_target(digest, target):
+            return int(nonce), digest
+    return None
+
+
+search_batch.walk_hashers = {}
+
+
+def _worker(worker_id, num_workers, hash_fn, header_prefix, nonce_size, target,
+            max_nonce, stop, results):
+    done = 0
+    start = time.perf_counter()
+    try:
+        if isinstance(hash_fn, str):
+            load_hash_fn(hash_fn)  # import once before the clock starts
+            start = time.perf_counter()
+        first = worker_id
+        while not stop.is_set() and first < max_nonce:
+            nonces = np.arange(first, min(first + BATCH_SIZE * num_workers, max_nonce), num_workers)
+            first += BATCH_SIZE * num_workers
+            found = search_batch(hash_fn, header_prefix, nonces, nonce_size, target)
+            if found is not None:
+                nonce, digest = found
+                done += int(np.searchsorted(nonces, nonce)) + 1
+                stop.set()
+                results.put(("found", worker_id, nonce, digest))
+                break
+            done += len(nonces)
+    except Exception as e:
+        stop.set()  # the other workers would fail the same way
+        results.put(("error", worker_id, f"{type(e).__name__}: {e}"))
+    finally:
+        # mine() waits for one stats message per worker, whatever happened
+        results.put(("stats", worker_id, done, time.perf_counter() - start))
+
+
+def mine(header_prefix: bytes, target: int, hash_fn="walk", workers: int = None,
+         nonce_size: int = 4, max_nonce: int = None, timeout: float = None) -> dict:
+    """Search for a nonce whose digest of header_prefix + nonce is below target.
+
+    hash_fn is a name from HASH_FUNCTIONS or a module-level function taking
+    a bytearray and returning bytes. All workers stop on the first solution,
+    when the nonce space is exhausted or after timeout seconds. Raises
+    RuntimeError if a worker fails or dies before reporting.
+
+    Returns a dict with the winning nonce and digest (None when nothing was
+    found), the total hash count, elapsed wall time and the hash rate of the
+    whole pool and of each worker.
+    """
+    workers = workers or os.cpu_count()
+    max_nonce = 1 << (8 * nonce_size) if max_nonce is None else max_nonce
+    header_prefix = bytes(header_prefix)
+    if isinstance(hash_fn, str):
+        load_hash_fn(hash_fn)  # import here so forked workers inherit it
+
+    ctx = mp.get_context()
+    stop = ctx.Event()
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(k, workers, hash_fn, header_prefix, nonce_size,
+                                          target, max_nonce, stop, results), daemon=True)
+        for k in range(workers)
+    ]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+
+    found = None
+    stats = {}
+    errors = {}
+    silent = set()  # workers seen dead without their stats on the last poll
+    deadline = None if timeout is None else start + timeout
+    while len(stats) < workers:
+        wait = POLL_INTERVAL if deadline is None else min(max(deadline - time.perf_counter(), 0.01),
+                                                          POLL_INTERVAL)
+        try:
+            message = results.get(timeout=wait)
+        except queue.Empty:
+            if deadline is not None and time.perf_counter() >= deadline:
+                stop.set()  # timed out, let the workers report and exit
+                deadline = None
+            # a worker that died without reporting (killed, crashed in C) never will;
+            # it must stay silent for a whole poll since its last message may be in flight
+            dead = {k for k, proc in enumerate(procs) if proc.exitcode is not None and k not in stats}
+            if dead & silent:
+                k = min(dead & silent)
+                stop.set()
+                for proc in procs:
+                    proc.join()
+                raise RuntimeError(f"Miner worker {k} exited with code {procs[k].exitcode} "
+                                   f"without reporting")
+            silent = dead
+            continue
+        if message[0] == "found":
+            if found is None:
+                found = message
+            stop.set()
+        elif message[0] == "error":
+            errors[message[1]] = message[2]
+        else:
+            stats[message[1]] = message[2:]
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    if errors:
+        k = min(errors)
+        raise RuntimeError(f"Miner worker {k} failed: {errors[k]}")
+
+    worker_rates = [stats[k][0] / stats[k][1] if stats[k][1] else 0.0 for k in range(workers)]
+    total = sum(count for count, _ in stats.values())
+    return {
+        "nonce": None if found is None else found[2],
+        "digest": None if found is None else found[3],
+        "worker": None if found is None else found[1],
+        "hashes": total,
+        "elapsed": elapsed,
+        "hash_rate": total / elapsed if elapsed else 0.0,
+        "worker_rates": worker_rates,
+    }
+
+
+def benchmark(hash_fn="walk", worker_counts=None, duration: float = 5.0,
+              prefix_size: int = 28, nonce_size: int = 4) -> list:
+    """Mine with an unreachable target for duration seconds per worker count.
+
+    Returns one (workers, total hashes/sec, per-worker hashes/sec) tuple per
+    entry of worker_counts, to see how throughput scales across cores.
+    """
+    cores = os.cpu_count()
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    header_prefix = bytes(range(prefix_size))
+    rows = []
+    for count in worker_counts:
+        result = mine(header_prefix, 0, hash_fn=hash_fn, workers=count,
+                      nonce_size=nonce_size, timeout=duration)
+        rows.append((count, result["hash_rate"], result["worker_rates"]))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-process proof-of-work miner")
+    parser.add_argument("--hash", default="walk", choices=sorted(HASH_FUNCTIONS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--zero-bits", type=int, default=8, help="leading zero bits required")
+    parser.add_argument("--prefix", default="00" * 28, help="header prefix as hex")
+    parser.add_argument("--nonce-size", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="measure throughput scaling instead")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per benchmark run")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(f"--- Benchmarking {args.hash} ---")
+        base = None
+        for count, rate, per_worker in benchmark(args.hash, duration=args.duration,
+                                                 nonce_size=args.nonce_size):
+            base = base or rate
+            print(f"{count:3d} workers: {rate:10.1f} H/s  (x{rate / base:.2f}, "
+                  f"per worker {min(per_worker):.1f}-{max(per_worker):.1f} H/s)")
+    else:
+        prefix = bytes.fromhex(args.prefix)
+        size = digest_size(args.hash, len(prefix) + args.nonce_size)
+        target = difficulty_target(args.zero_bits, size)
+        result = mine(prefix, target, hash_fn=args.hash, workers=args.workers,
+                      nonce_size=args.nonce_size, timeout=args.timeout)
+        if result["nonce"] is None:
+            print("No solution found")
+        else:
+            print(f"Nonce: {result['nonce']} (worker {result['worker']})")
+            print(f"Digest (hex): {result['digest'].hex()}")
+        print(f"{result['hashes']} hashes in {result['elapsed']:.2f}s "
+              f"= {result['hash_rate']:.1f} H/s")
+        for k, rate in enumerate(result["worker_rates"]):
+            print(f"  worker {k}: {rate:.1f} H/s")
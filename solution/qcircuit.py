@@ -1,6 +1,4 @@
-from qiskit import QuantumCircuit
-from main import NUM_WALK_STEPS, TOTAL_QUBITS, preprocess_input
-import math
+from main import preprocess_input, walk_angles, walk_schedule, walk_template
 from qiskit.quantum_info import Statevector
 
 
@@ -8,21 +6,8 @@ def qhash_quantum_walk(input_data: bytearray) -> bytes:
     original_size = len(input_data)
     data = preprocess_input(input_data)
 
-    qc = QuantumCircuit(TOTAL_QUBITS)
-    coin = 0
-    pos_qubits = list(range(1, TOTAL_QUBITS))
-
-    # Start walker roughly centered
-    center = len(pos_qubits) // 2
-    qc.x(pos_qubits[center])
-
-    for step in range(NUM_WALK_STEPS):
-        byte_val = sum([data[(step + i) % len(data)] for i in range(4)]) % 256
-        theta = (byte_val % 256) * math.pi / 128  # in [0, 2π]
-        qc.ry(theta, coin)
-
-        for i in reversed(range(len(pos_qubits))):
-            qc.cx(coin, pos_qubits[i])
+    # The walk circuit is built once in main.walk_template; only the angles are bound here
+    qc = walk_template().assign_parameters(walk_angles(walk_schedule(data)))
 
     sv = Statevector.from_instruction(qc)
     print(qc)
@@ -2,7 +2,9 @@
 
 import time
 import unittest
-from main import TOTAL_QUBITS, qhash_quantum_walk  # Replace with actual module name if needed
+import random
+import numpy as np
+from main import TOTAL_QUBITS, WalkHasher, hash_many, qhash_quantum_walk  # Replace with actual module name if needed
 
 class TestQuantumHashFunction(unittest.TestCase):
     
@@ -144,5 +146,181 @@ class TestQuantumHashFunction(unittest.TestCase):
                 # Ensure that the hashes are different for different inputs (collision resistance)
                 self.assertNotEqual(hash1, hash2, f"Collision detected between inputs: {input_data1} and {input_data2}")
 
+class TestNumpyEngine(unittest.TestCase):
+
+    def test_matches_qiskit_engine(self):
+        """The NumPy engines must produce exactly the same bytes as the Qiskit circuit."""
+        rng = random.Random(2025)
+        inputs = [bytearray(rng.randrange(256) for _ in range(rng.choice([6, 16, 32, 64])))
+                  for _ in range(100)]
+        inputs += [bytearray([v] * 32) for v in (0, 1, 64, 128, 255)]
+
+        for input_data in inputs:
+            reference = qhash_quantum_walk(input_data, engine="qiskit")
+            for engine in ("numpy", "table", "complex64", "deterministic"):
+                self.assertEqual(qhash_quantum_walk(input_data, engine=engine), reference,
+                                 f"{engine} engine mismatch for input: {input_data}")
+
+    def test_step_table_round_trip(self):
+        """A saved step table loads back unchanged and rejects other versions."""
+        import os
+        import tempfile
+        from main import build_step_table, load_step_table, save_step_table
+
+        coins, gather = build_step_table()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "walk_steps.npz")
+            save_step_table(path)
+            loaded_coins, loaded_gather = load_step_table(path)
+            np.testing.assert_array_equal(loaded_coins, coins)
+            np.testing.assert_array_equal(loaded_gather, gather)
+
+            np.savez(path, version=0, coins=coins, gather=gather)
+            with self.assertRaises(ValueError):
+                load_step_table(path)
+
+    def test_large_input_path(self):
+        """Folding views and tiling into a caller's buffer match the byte loops they replace."""
+        from main import preprocess_input
+
+        rng = np.random.default_rng(14)
+        for size in (33, 100, 4096, 1 << 16):
+            data = rng.integers(0, 256, size, dtype=np.uint8)
+            reduced = bytearray(32)
+            for i, byte in enumerate(data[:4096].tolist()):
+                reduced[i % 32] ^= byte
+            if size <= 4096:
+                self.assertEqual(preprocess_input(memoryview(data.tobytes())), reduced)
+            expected = qhash_quantum_walk(bytearray(data.tobytes()))
+            self.assertEqual(expected, expected[:8] * (size // 8) + expected[:size % 8])
+            out = np.zeros(size, dtype=np.uint8)
+            self.assertIs(qhash_quantum_walk(memoryview(data), out=out), out)
+            self.assertEqual(out.tobytes(), expected)
+        with self.assertRaises(ValueError):
+            qhash_quantum_walk(bytearray(64), out=bytearray(32))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            qhash_quantum_walk(bytearray(range(32)), engine="aer")
+
+
+class TestHashMany(unittest.TestCase):
+
+    def test_matrix_matches_scalar(self):
+        """Every row of a batched (N, L) input must hash exactly like the scalar function."""
+        rng = np.random.default_rng(7)
+        for length in (6, 32, 64):
+            batch = rng.integers(0, 256, size=(200, length), dtype=np.uint8)
+            digests = hash_many(batch)
+            self.assertEqual(digests.shape, batch.shape)
+            for row, digest in zip(batch, digests):
+                self.assertEqual(digest.tobytes(), qhash_quantum_walk(bytearray(row.tobytes())))
+
+    def test_deterministic_batches(self):
+        """Deterministic digests do not depend on how the inputs are batched."""
+        batch = np.random.default_rng(8).integers(0, 256, size=(40, 32), dtype=np.uint8)
+        digests = hash_many(batch, deterministic=True)
+        for size in (1, 7):
+            parts = [hash_many(batch[i:i + size], deterministic=True) for i in range(0, len(batch), size)]
+            np.testing.assert_array_equal(np.concatenate(parts), digests)
+        for row, digest in zip(batch[:5], digests):
+            self.assertEqual(digest.tobytes(), qhash_quantum_walk(bytearray(row.tobytes()), engine="deterministic"))
+
+    def test_list_keeps_order(self):
+        """Mixed-length lists are bucketed by length but returned in input order."""
+        inputs = [
+            bytearray([1, 2, 3, 4, 5, 8]),
+            bytearray(range(32)),
+            bytearray([255] * 16),
+            bytearray([1, 2, 3, 4, 5, 9]),
+            bytearray(range(100, 164)),
+        ]
+        self.assertEqual(hash_many(inputs), [qhash_quantum_walk(d) for d in inputs])
+
+
+class TestCircuitTemplates(unittest.TestCase):
+
+    def test_bound_template_matches_rebuilt_circuits(self):
+        """Binding the cached templates gives the circuits the hashes used to build per call."""
+        from bench_circuits import cases
+        from main import walk_template
+
+        rng = random.Random(10)
+        for size in (1, 6, 32, 40):
+            data = bytes(rng.randrange(256) for _ in range(size))
+            for name, (rebuild, bind) in cases(data).items():
+                self.assertEqual(bind(), rebuild(), f"{name} template mismatch for input: {data}")
+        self.assertEqual(len(walk_template().parameters), 32)  # binding leaves the template alone
+
+
+class TestBonusComplex64Engine(unittest.TestCase):
+
+    def test_matches_statevector(self):
+        """The single-precision Bonus walk gives the Statevector bytes."""
+        import Bonus
+
+        rng = random.Random(12)
+        for size in (6, 32, 64):
+            data = bytearray(rng.randrange(256) for _ in range(size))
+            self.assertEqual(Bonus.qhash_quantum_walk(data, engine="complex64"), Bonus.qhash_quantum_walk(data))
+
+
+class TestBonusHasher(unittest.TestCase):
+
+    def test_streaming_matches_whole_input(self):
+        """Chunked updates, copies and mmap'd files all give the one-shot digest."""
+        import os
+        import tempfile
+        from Bonus import BonusHasher, hash_file, preprocess_input, qhash_quantum_walk
+
+        rng = random.Random(13)
+        for size in (0, 5, 32, 33, 100, 1000):
+            data = bytes(rng.randrange(256) for _ in range(size))
+            reduced = bytearray(32)
+            for i, byte in enumerate(data):
+                reduced[i % 32] ^= byte
+            self.assertEqual(preprocess_input(bytearray(data)), reduced)  # padding is folding into zeros
+
+            hasher, pos = BonusHasher(), 0
+            while pos < size:
+                step = rng.randrange(1, 70)
+                hasher.update(memoryview(data)[pos:pos + step])
+                pos += step
+            self.assertEqual(hasher.length, size)
+            expected = qhash_quantum_walk(bytearray(data))
+            fork = hasher.copy()
+            fork.update(b"nonce")
+            self.assertEqual(hasher.digest(), expected)
+            self.assertEqual(fork.digest(), qhash_quantum_walk(bytearray(data + b"nonce")))
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "payload.bin")
+                with open(path, "wb") as f:
+                    f.write(data)
+                self.assertEqual(hash_file(path), expected)
+
+
+class TestWalkHasher(unittest.TestCase):
+
+    def test_midstate_matches_full_hash(self):
+        """Resuming from the cached prefix midstate must give the full-input digest."""
+        rng = np.random.default_rng(11)
+        for prefix_size, nonce_size in [(28, 4), (60, 4), (20, 8), (2, 4)]:
+            prefix = rng.integers(0, 256, prefix_size, dtype=np.uint8).tobytes()
+            hasher = WalkHasher(prefix, nonce_size)
+            nonces = rng.integers(0, 256, size=(50, nonce_size), dtype=np.uint8)
+            digests = hasher.hash_many(nonces)
+            for nonce, digest in zip(nonces, digests):
+                expected = qhash_quantum_walk(bytearray(prefix + nonce.tobytes()))
+                self.assertEqual(hasher.hash(nonce.tobytes()), expected)
+                self.assertEqual(digest.tobytes(), expected)
+
+    def test_shared_steps(self):
+        """A trailing 4-byte nonce in a 32-byte input leaves the first 25 steps shared."""
+        self.assertEqual(WalkHasher(bytes(28), 4).shared_steps, 25)
+        with self.assertRaises(ValueError):
+            WalkHasher(bytes(28), 4).hash(b"\x00")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+# Unit test for the shared-memory bulk hasher bulk_hash.py
+
+import os
+import random
+import sys
+import unittest
+import numpy as np
+from bulk_hash import REPO_ROOT, bulk_hash, load_variant, make_pool
+from main import qhash_quantum_walk
+
+
+class TestBulkHash(unittest.TestCase):
+
+    def test_walk_list_matches_scalar(self):
+        """Mixed-length inputs come back in order and match the single-input hash."""
+        rng = random.Random(8)
+        inputs = [bytes(rng.randrange(256) for _ in range(rng.randrange(1, 70))) for _ in range(200)]
+        digests = bulk_hash("walk", inputs, workers=2, chunk=16)
+        self.assertEqual(digests, [qhash_quantum_walk(bytearray(x)) for x in inputs])
+
+    def test_walk_matrix(self):
+        """An (N, L) array gives an (N, L) array of digests."""
+        data = np.random.default_rng(8).integers(0, 256, (3000, 32), dtype=np.uint8)
+        with make_pool(2, preload=["walk"]) as pool:
+            digests = bulk_hash("walk", data, executor=pool)
+            again = bulk_hash("walk", data[:10], executor=pool)
+        self.assertEqual(digests.shape, (3000, 32))
+        for i in (0, 1234, 2999):
+            self.assertEqual(digests[i].tobytes(), qhash_quantum_walk(bytearray(data[i].tobytes())))
+        np.testing.assert_array_equal(again, digests[:10])
+
+    def test_empty_matrix(self):
+        """An empty (0, L) array still has the digest size as its column count."""
+        empty = np.zeros((0, 32), np.uint8)
+        self.assertEqual(bulk_hash("walk", empty).shape, (0, 32))
+        self.assertEqual(bulk_hash("bonus256", empty[:, :8]).shape, (0, 32))
+        self.assertEqual(bulk_hash("walk", []), [])
+
+    def test_research_variants(self):
+        """Qiskit variants with fixed and input-sized digests go through the same buffers."""
+        inputs = [bytes([i] * 32) for i in range(3)] + [b"\x01\x02\x03\x04\x05\x08"]
+        for name in ("chunk", "v8", "bonus256"):
+            fn = load_variant(name)
+            self.assertEqual(bulk_hash(name, inputs, workers=2), [fn(bytearray(x)) for x in inputs])
+
+    def test_variants_with_one_file_name(self):
+        """Research's qhash.py, found next to hash4.py, does not shadow the root qhash.py."""
+        load_variant("v8")
+        qhash = load_variant("qhash")
+        self.assertEqual(sys.modules[qhash.__module__].__file__, os.path.join(REPO_ROOT, "qhash.py"))
+        inputs = [bytes(range(32)), bytes(32)]
+        self.assertEqual(bulk_hash("qhash", inputs, workers=2), [qhash(bytearray(x)) for x in inputs])
+
+    @unittest.skipUnless(os.environ.get("QHASH_SLOW_TESTS"), "set QHASH_SLOW_TESTS=1 to run")
+    def test_iterative_v5(self):
+        """qhash2's 20-qubit statevector hash; one block takes about half a minute."""
+        fn = load_variant("iterative_v5")
+        self.assertEqual(bulk_hash("iterative_v5", [b"ab"], workers=1), [fn(bytearray(b"ab"))])
+
+    def test_failures_are_reported(self):
+        with self.assertRaises(ValueError):
+            bulk_hash("nope", [b"abc"])
+        with self.assertRaises(RuntimeError):
+            bulk_hash("chunk", [b"abc", b""], workers=1)  # empty chunk divides by zero
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Unit test for the nonce-range coordinator coordinator.py
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from coordinator import Coordinator, run_local, run_worker
+from main import qhash_quantum_walk
+from miner import difficulty_target, meets_target
+
+
+def take_lease(address):
+    """Connect like a worker, take one lease and return the open socket."""
+    sock = socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET)
+    sock.connect(address)
+    sock.sendall(json.dumps({"op": "lease", "worker": "flaky"}).encode() + b"\n")
+    reply = json.loads(sock.makefile("rb").readline())
+    return sock, reply["lease"]
+
+
+class TestCoordinator(unittest.TestCase):
+
+    def test_local_workers_find_solution(self):
+        """Local worker processes over TCP find a nonce the coordinator can verify."""
+        prefix = bytes(range(28))
+        target = difficulty_target(6, 32)
+        result = run_local(prefix, target, workers=2, range_size=256, timeout=60)
+
+        self.assertIsNotNone(result["nonce"])
+        candidate = bytearray(prefix + result["nonce"].to_bytes(4, "little"))
+        self.assertEqual(result["digest"], qhash_quantum_walk(candidate))
+        self.assertTrue(meets_target(result["digest"], target))
+
+    def test_lost_worker_range_is_released(self):
+        """A range held by a worker that disconnects is searched by someone else."""
+        with tempfile.TemporaryDirectory() as tmp:
+            coordinator = Coordinator(bytes(28), 0, range_size=500, max_nonce=2000)
+            address = coordinator.serve(os.path.join(tmp, "coord.sock"))
+            sock, lease = take_lease(address)
+            sock.close()
+
+            worker = threading.Thread(target=run_worker, args=(address, "steady"))
+            worker.start()
+            result = coordinator.wait(timeout=60)
+            worker.join()
+            coordinator.shutdown()
+
+        self.assertIsNone(result["nonce"])
+        self.assertEqual(result["hashes"], 2000)
+        self.assertEqual(result["requeued"], 1)
+
+    def test_expired_lease_is_released(self):
+        """A range that is not reported in time is leased out again."""
+        coordinator = Coordinator(bytes(28), 0, range_size=500, max_nonce=1000, lease_timeout=0.2)
+        address = coordinator.serve(("127.0.0.1", 0))
+        sock, lease = take_lease(address)  # holds the connection but never reports
+        time.sleep(0.3)
+
+        worker = threading.Thread(target=run_worker, args=(address, "steady"))
+        worker.start()
+        result = coordinator.wait(timeout=60)
+        worker.join()
+        sock.close()
+        coordinator.shutdown()
+
+        self.assertEqual(result["hashes"], 1000)
+        self.assertGreaterEqual(result["requeued"], 1)
+
+    def test_late_and_malformed_reports(self):
+        """A result for an expired lease is not counted; bad requests get an error reply."""
+        coordinator = Coordinator(bytes(28), 0, range_size=500, max_nonce=1000, lease_timeout=0.2)
+        address = coordinator.serve(("127.0.0.1", 0))
+        sock, lease = take_lease(address)
+        time.sleep(0.3)
+        worker = threading.Thread(target=run_worker, args=(address, "steady"))
+        worker.start()
+        coordinator.wait(timeout=60)
+        worker.join()
+
+        stream = sock.makefile("rwb")
+        replies = []
+        for request in ({"worker": "flaky"}, {"op": "result", "worker": "flaky"}, [1, 2],
+                        {"op": "result", "worker": "flaky", "lease": lease["id"], "hashes": 500,
+                         "elapsed": 1.0, "nonce": None}):
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            replies.append(json.loads(stream.readline()))
+        sock.close()
+        coordinator.shutdown()
+
+        self.assertEqual(["error" in reply for reply in replies], [True, True, True, False])
+        self.assertEqual(coordinator.summary()["hashes"], 1000)
+        self.assertNotIn("flaky", coordinator.summary()["worker_rates"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# Unit test for the micro-batching hash service hash_service.py
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import tempfile
+import unittest
+from hash_service import HashService, load_test, open_client
+from main import qhash_quantum_walk
+
+
+async def request(address, messages):
+    """Send all messages on one connection and return the replies in arrival order."""
+    reader, writer = await open_client(address)
+    for message in messages:
+        writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in messages]
+    writer.close()
+    return replies
+
+
+class TestHashService(unittest.TestCase):
+
+    def run_service(self, body, **options):
+        async def main():
+            # threads keep the test quick; the CLI uses a process pool
+            executor = concurrent.futures.ThreadPoolExecutor(2)
+            service = HashService(executor=executor, workers=2, hash_names=("walk",), **options)
+            with tempfile.TemporaryDirectory() as tmp:
+                address = await service.start(os.path.join(tmp, "hash.sock"))
+                try:
+                    return await body(service, address)
+                finally:
+                    await service.stop()
+                    executor.shutdown(wait=False)
+        return asyncio.run(main())
+
+    def test_batched_digests_match(self):
+        """Pipelined requests are batched and each gets its own digest."""
+        inputs = [bytes([i] * 32) for i in range(20)] + [b"short"]
+
+        async def body(service, address):
+            replies = await request(address, [{"id": i, "hash": "walk", "data": data.hex()}
+                                              for i, data in enumerate(inputs)])
+            return replies, service.stats()
+
+        replies, stats = self.run_service(body, window_ms=20)
+        by_id = {reply["id"]: reply["digest"] for reply in replies}
+        for i, data in enumerate(inputs):
+            self.assertEqual(bytes.fromhex(by_id[i]), qhash_quantum_walk(bytearray(data)))
+        self.assertEqual(stats["requests"], len(inputs))
+        self.assertLess(stats["batches"], len(inputs))
+
+    def test_caller_executor_outlives_service(self):
+        """stop() leaves an executor passed in by the caller running."""
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+
+        async def main():
+            service = HashService(executor=executor, workers=1, hash_names=("walk",))
+            with tempfile.TemporaryDirectory() as tmp:
+                await service.start(os.path.join(tmp, "hash.sock"))
+                await service.stop()
+
+        asyncio.run(main())
+        self.assertEqual(executor.submit(sum, [1, 2]).result(), 3)
+        executor.shutdown()
+
+    def test_deadline_and_unknown_hash(self):
+        """An expired deadline and an unknown hash are reported as errors."""
+        async def body(service, address):
+            return await request(address, [
+                {"id": 1, "hash": "walk", "data": "00" * 32, "deadline_ms": 0},
+                {"id": 2, "hash": "nope", "data": "00"},
+                {"op": "stats"},
+            ])
+
+        replies = self.run_service(body, window_ms=20)
+        errors = {reply.get("id"): reply.get("error") for reply in replies}
+        self.assertEqual(errors[1], "deadline exceeded")
+        self.assertIn("unknown hash", errors[2])
+
+    def test_malformed_requests_keep_connection(self):
+        """Each bad request gets its own error; the good ones on the connection still answer."""
+        async def body(service, address):
+            reader, writer = await open_client(address)
+            writer.write(b"not json\n")
+            for message in ({"id": 1, "hash": "walk"}, {"id": 2, "data": "zz"},
+                            {"id": 3, "data": "00", "deadline_ms": "soon"}, [1, 2],
+                            {"id": 4, "data": "00" * 32}):
+                writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            replies = [json.loads(await reader.readline()) for _ in range(6)]
+            writer.close()
+            return replies
+
+        replies = self.run_service(body, window_ms=2)
+        errors = [reply for reply in replies if "error" in reply]
+        self.assertEqual(sorted(str(reply["id"]) for reply in errors), ["1", "2", "3", "None", "None"])
+        digest = next(reply["digest"] for reply in replies if "digest" in reply)
+        self.assertEqual(bytes.fromhex(digest), qhash_quantum_walk(bytearray(32)))
+
+    def test_load_test_reports_latency(self):
+        """The load generator gets every reply and reports p50 <= p99."""
+        async def body(service, address):
+            return await load_test(address, clients=4, requests=10)
+
+        result = self.run_service(body, window_ms=2, max_pending=8)
+        self.assertEqual(result["requests"], 40)
+        self.assertEqual(result["errors"], {})
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# Unit test for the incremental Merkle tree merkle.py
+
+import concurrent.futures
+import random
+import unittest
+from unittest import mock
+import merkle
+from merkle import MerkleTree, leaf_hash, node_input, verify_proof
+from Bonus import qhash_quantum_walk
+
+ENGINE = "complex64"  # same bytes as the Statevector engine, faster
+
+
+def reference_root(items) -> bytes:
+    """The root rebuilt from scratch, one level at a time."""
+    nodes = [leaf_hash(x, ENGINE) for x in items]
+    while len(nodes) > 1:
+        parents = [qhash_quantum_walk(bytearray(node_input(a, b)), engine=ENGINE)
+                   for a, b in zip(nodes[0::2], nodes[1::2])]
+        nodes = parents + nodes[len(nodes) - len(nodes) % 2:]
+    return nodes[0]
+
+
+class TestMerkleTree(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(21)
+        self.items = [bytes(rng.randrange(256) for _ in range(rng.randrange(1, 80))) for _ in range(13)]
+
+    def test_root_matches_rebuild(self):
+        for n in (1, 2, 3, 8, 13):
+            self.assertEqual(MerkleTree(self.items[:n], engine=ENGINE).root(), reference_root(self.items[:n]))
+        with self.assertRaises(ValueError):
+            MerkleTree(engine=ENGINE).root()
+
+    def test_child_order_matters(self):
+        a, b = self.items[:2]
+        self.assertNotEqual(MerkleTree([a, b], engine=ENGINE).root(), MerkleTree([b, a], engine=ENGINE).root())
+
+    def test_incremental_changes(self):
+        tree = MerkleTree(engine=ENGINE)
+        items = []
+        for x in self.items:
+            tree.append(x)
+            items.append(x)
+            self.assertEqual(tree.root(), reference_root(items))
+        tree.update(4, b"replaced")
+        items[4] = b"replaced"
+        self.assertEqual(tree.root(), reference_root(items))
+        self.assertEqual(tree.remove(2), leaf_hash(self.items[2], ENGINE))
+        items[2] = items.pop()
+        self.assertEqual(tree.root(), reference_root(items))
+        while len(tree) > 1:
+            tree.pop()
+            items.pop()
+            self.assertEqual(tree.root(), reference_root(items))
+
+    def test_update_rehashes_one_path(self):
+        items = [bytes([i]) for i in range(100)]
+        tree = MerkleTree(items, engine=ENGINE)
+        with mock.patch.object(merkle, "qhash_quantum_walk", wraps=qhash_quantum_walk) as hashed:
+            tree.update(37, b"new")
+            tree.append(b"more")
+        # each time the leaf plus at most one parent on each of the 7 levels above it
+        self.assertLessEqual(hashed.call_count, 16)
+        items[37:38] = [b"new"]
+        self.assertEqual(tree.root(), reference_root(items + [b"more"]))
+
+    def test_proofs(self):
+        tree = MerkleTree(self.items, engine=ENGINE)
+        root = tree.root()
+        for i in range(len(tree)):
+            self.assertTrue(verify_proof(tree.leaf(i), tree.proof(i), root, ENGINE))
+        self.assertFalse(verify_proof(tree.leaf(0), tree.proof(1), root, ENGINE))
+        swapped = [(sibling, not left) for sibling, left in tree.proof(5)]
+        self.assertFalse(verify_proof(tree.leaf(5), swapped, root, ENGINE))
+
+    def test_node_preimage_is_not_a_leaf(self):
+        """The bytes under an internal node, taken as they are, do not verify as an item."""
+        tree = MerkleTree(self.items[:4], engine=ENGINE)
+        forged = node_input(tree.leaf(0), tree.leaf(1))
+        self.assertFalse(verify_proof(leaf_hash(forged, ENGINE), tree.proof(0)[1:], tree.root(), ENGINE))
+        self.assertTrue(verify_proof(qhash_quantum_walk(bytearray(forged), engine=ENGINE),
+                                     tree.proof(0)[1:], tree.root(), ENGINE))
+
+    def test_executor_matches_serial(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as pool:
+            tree = MerkleTree(self.items, engine=ENGINE, executor=pool)
+            tree.extend([b"a", b"b", b"c"])
+        self.assertEqual(tree.root(), MerkleTree(self.items + [b"a", b"b", b"c"], engine=ENGINE).root())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# Unit test for the proof-of-work miner miner.py
+
+import os
+import unittest
+from main import qhash_quantum_walk
+from miner import difficulty_target, meets_target, mine
+
+
+def exit_hash(data):
+    os._exit(3)  # dies without unwinding, like a crash in native code
+
+
+class TestMiner(unittest.TestCase):
+
+    def test_solution_meets_target(self):
+        """The reported nonce must reproduce the digest and beat the target."""
+        prefix = bytes(range(28))
+        target = difficulty_target(6, 32)
+        result = mine(prefix, target, hash_fn="walk", workers=2)
+
+        self.assertIsNotNone(result["nonce"])
+        candidate = bytearray(prefix + result["nonce"].to_bytes(4, "little"))
+        self.assertEqual(result["digest"], qhash_quantum_walk(candidate))
+        self.assertTrue(meets_target(result["digest"], target))
+        self.assertEqual(len(result["worker_rates"]), 2)
+
+    def test_callable_hash_function(self):
+        """Any module-level hash function can be mined with."""
+        prefix = bytes(28)
+        target = difficulty_target(4, 32)
+        result = mine(prefix, target, hash_fn=qhash_quantum_walk, workers=2)
+        candidate = bytearray(prefix + result["nonce"].to_bytes(4, "little"))
+        self.assertEqual(result["digest"], qhash_quantum_walk(candidate))
+
+    def test_exhausted_nonce_space(self):
+        """With an unreachable target every nonce is tried once and nothing is found."""
+        result = mine(bytes(28), 0, hash_fn="walk", workers=2, max_nonce=1000)
+        self.assertIsNone(result["nonce"])
+        self.assertEqual(result["hashes"], 1000)
+
+    def test_worker_failures_raise(self):
+        """A worker that raises or dies is reported instead of hanging mine()."""
+        with self.assertRaisesRegex(RuntimeError, "needs at least 32 input bytes"):
+            mine(bytes(10), 0, hash_fn="qhash", workers=2)
+        with self.assertRaisesRegex(RuntimeError, "exited with code 3"):
+            mine(bytes(28), 0, hash_fn=exit_hash, workers=2, timeout=30)
+
+
+if __name__ == '__main__':
+    unittest.main()
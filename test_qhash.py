@@ -0,0 +1,73 @@
+# Unit test for the Qubitcoin qhash engines in qhash.py
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import qhash
+
+
+class TestQhashEngines(unittest.TestCase):
+
+    def inputs(self):
+        rng = np.random.default_rng(2025)
+        inputs = [bytes(rng.integers(0, 256, 32, dtype=np.uint8)) for _ in range(10)]
+        return inputs + [bytes([v] * 32) for v in (0x00, 0x44, 0x88, 0xff)]
+
+    def test_engines_match_qiskit(self):
+        """The compiled kernel, the product-state table and the MPS engine give the Qiskit digests."""
+        for x in self.inputs():
+            reference = qhash.qhash(x, engine="qiskit")
+            for engine in ("kernel", "table", "mps", "deterministic"):
+                self.assertEqual(qhash.qhash(x, engine=engine), reference, f"{engine} mismatch for input: {x.hex()}")
+
+    def test_edge_values_fall_back_to_kernel(self):
+        with mock.patch.object(qhash, "FIXED_MARGIN", 1.0), \
+                mock.patch.object(qhash, "_expectations_kernel", wraps=qhash._expectations_kernel) as exact:
+            for x in self.inputs()[:3]:
+                self.assertEqual(qhash.qhash(x, engine="table"), qhash.qhash(x, engine="qiskit"))
+        self.assertEqual(exact.call_count, 3)
+
+    def test_truncated_mps_falls_back_to_kernel(self):
+        with mock.patch.object(qhash, "MAX_BOND", 2), \
+                mock.patch.object(qhash, "_expectations_kernel", wraps=qhash._expectations_kernel) as exact:
+            x = self.inputs()[0]
+            self.assertEqual(qhash.qhash(x, engine="mps"), qhash.qhash(x, engine="qiskit"))
+        self.assertEqual(exact.call_count, 1)
+
+    def test_batch_matches_qhash(self):
+        """One Estimator job for all inputs gives the same digests as qhash, input by input."""
+        inputs = self.inputs()
+        self.assertEqual(qhash.qhash_batch(inputs), [qhash.qhash(x, engine="kernel") for x in inputs])
+        self.assertEqual(qhash.qhash_batch([]), [])
+
+    def test_stream_matches_qhash(self):
+        """Batched states give the qhash digests for any batch size, in input order."""
+        inputs = self.inputs()
+        expected = [qhash.qhash(x, engine="kernel") for x in inputs]
+        for batch_size in (1, 3, len(inputs) + 1):
+            self.assertEqual(list(qhash.qhash_stream(iter(inputs), batch_size)), expected)
+        self.assertEqual(list(qhash.qhash_stream(inputs, memory=0)), expected)
+        self.assertEqual(qhash.auto_batch_size(qhash.BATCH_COPIES << 22), 4)
+        with self.assertRaises(ValueError):
+            next(qhash.qhash_stream(inputs, batch_size=0))
+
+    def test_product_table_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "qhash_product.npz")
+            qhash.save_product_table(path)
+            np.testing.assert_array_equal(qhash.load_product_table(path), qhash.build_product_table())
+            np.savez(path, version=0, states=qhash.build_product_table())
+            with self.assertRaises(ValueError):
+                qhash.load_product_table(path)
+
+    def test_bad_input(self):
+        with self.assertRaises(ValueError):
+            qhash.qhash(bytes(31))
+        with self.assertRaises(ValueError):
+            qhash.qhash(bytes(32), engine="aer")
+
+
+if __name__ == "__main__":
+    unittest.main()